@@ -19,27 +19,30 @@ OUTPUT_LOG="$OUTPUT_PATH/output_$(date '+%Y-%m-%d_%H-%M-%S').log"
 # is intended to be automated by a proper tool like Airflow anyway.
 if [[ "$1" == "--daily" ]]; then
     django-admin send_slack_message ":rocket: lancement mise à jour de données C1 -> Metabase"
-    django-admin populate_metabase_emplois --mode=enums |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=analytics |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=siaes |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=job_descriptions |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=organizations |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=job_seekers |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=criteria |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=job_applications |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=selected_jobs |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=approvals |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=prolongations |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=prolongation_requests |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=institutions |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=evaluation_campaigns |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=evaluated_siaes |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=evaluated_job_applications |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=evaluated_criteria |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=users |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=memberships |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=dbt_daily |& tee -a "$OUTPUT_LOG"
-    django-admin populate_metabase_emplois --mode=data_inconsistencies |& tee -a "$OUTPUT_LOG"
+    # The modes run in parallel, `dbt_daily` waits for all the other ones to complete.
+    django-admin populate_metabase_emplois --jobs="${METABASE_POPULATE_JOBS:-4}" --mode \
+        enums \
+        analytics \
+        siaes \
+        job_descriptions \
+        organizations \
+        job_seekers \
+        criteria \
+        job_applications \
+        selected_jobs \
+        approvals \
+        prolongations \
+        prolongation_requests \
+        institutions \
+        evaluation_campaigns \
+        evaluated_siaes \
+        evaluated_job_applications \
+        evaluated_criteria \
+        users \
+        memberships \
+        dbt_daily \
+        data_inconsistencies \
+        |& tee -a "$OUTPUT_LOG"
     django-admin send_slack_message ":white_check_mark: succès mise à jour de données C1 -> Metabase"
 elif [[ "$1" == "--monthly" ]]; then
     django-admin send_slack_message ":rocket: lancement mise à jour de données peu fréquentes C1 -> Metabase"
@@ -478,10 +478,12 @@ ANYMAIL = {
 
 EMAIL_BACKEND = "itou.utils.tasks.AsyncEmailBackend"
 # This is the "real" email backend used by the async wrapper / email backend
-ASYNC_EMAIL_BACKEND = "anymail.backends.mailjet.EmailBackend"
+ASYNC_EMAIL_BACKEND = "itou.utils.tasks.MailjetBatchEmailBackend"
 
 SEND_EMAIL_DELAY_BETWEEN_RETRIES_IN_SECONDS = 5 * 60
 SEND_EMAIL_RETRY_TOTAL_TIME_IN_SECONDS = 24 * 3600
+# Messages sent within this window are grouped in the same Mailjet API calls.
+SEND_EMAIL_BATCH_WINDOW_IN_SECONDS = int(os.getenv("SEND_EMAIL_BATCH_WINDOW_IN_SECONDS", 10))
 
 REST_FRAMEWORK = {
     # Namespace versioning e.g. `GET /api/v1/something/`.
@@ -562,6 +564,10 @@ AWS_S3_FILE_OVERWRITE = False
 AWS_S3_REGION_NAME = "eu-west-3"
 AWS_S3_ENDPOINT_URL = f"https://{os.getenv('CELLAR_ADDON_HOST')}/"
 
+# Antivirus
+# ------------------------------------------------------------------------------
+CLAMD_SOCKET = os.getenv("CLAMD_SOCKET", "/var/run/clamav/clamd.ctl")
+
 HIJACK_PERMISSION_CHECK = "itou.utils.perms.user.has_hijack_perm"
 HIJACK_ALLOWED_USER_EMAILS = [s.lower() for s in os.getenv("HIJACK_ALLOWED_USER_EMAILS", "").split(",") if s]
 # Replaced by ACCOUNT_ADAPTER (see above) for general purpose. We still need it to redirect after hijack
@@ -0,0 +1,55 @@
+"""
+Minimal client for the clamd daemon INSTREAM command, see man clamd.
+
+Files are sent over the daemon socket chunk by chunk, which avoids writing them to disk and
+starting a new scanner process for every batch of files.
+"""
+
+import socket
+import struct
+
+from django.conf import settings
+
+
+class ClamdError(Exception):
+    pass
+
+
+def instream(chunks, socket_path=None, timeout=60):
+    """
+    Scan the data produced by the `chunks` iterable of bytes.
+
+    Returns the virus signature when the data is infected, None otherwise.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or settings.CLAMD_SOCKET)
+        # The `z` prefix means the command and its reply are null-terminated.
+        sock.sendall(b"zINSTREAM\0")
+        try:
+            for chunk in chunks:
+                if chunk:
+                    sock.sendall(struct.pack("!L", len(chunk)) + chunk)
+            sock.sendall(struct.pack("!L", 0))
+        except BrokenPipeError:
+            # clamd closes the connection when the stream exceeds StreamMaxLength,
+            # the reason is available in its reply.
+            pass
+        reply = b""
+        while not reply.endswith(b"\0"):
+            data = sock.recv(4096)
+            if not data:
+                break
+            reply += data
+    return parse_reply(reply.rstrip(b"\0").decode())
+
+
+def parse_reply(reply):
+    # stream: OK
+    # stream: Win.Test.EICAR_HDB-1 FOUND
+    # INSTREAM size limit exceeded. ERROR
+    if reply == "stream: OK":
+        return None
+    if reply.startswith("stream: ") and reply.endswith(" FOUND"):
+        return reply.removeprefix("stream: ").removesuffix(" FOUND")
+    raise ClamdError(reply)
@@ -1,5 +1,7 @@
 import concurrent.futures
+import contextlib
 import os
+import queue
 import shutil
 import stat
 import subprocess
@@ -10,10 +12,11 @@ from botocore.exceptions import ConnectionError as BotoConnectionError, HTTPClie
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.core.management.base import CommandError
-from django.db import transaction
+from django.db import connections, transaction
 from django.db.models import F
 from django.utils import timezone
 
+from itou.antivirus import clamd
 from itou.antivirus.models import Scan
 from itou.files.models import File
 from itou.utils.command import BaseCommand
@@ -25,13 +28,46 @@ class Command(BaseCommand):
     # Takes less than 10 seconds to run on a recent machine. Since crons can be
     # interrupted, prefer frequent and quick iterations.
     BATCH_SIZE = 200
+    CLAMD_CHUNK_SIZE = 64 * 1024
 
-    def handle(self, *args, **options):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clamd",
+            dest="use_clamd",
+            action="store_true",
+            help="Stream the files from S3 to the clamd daemon, without downloading them to a temporary directory.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=10,
+            help="Number of files streamed to clamd in parallel.",
+        )
+        parser.add_argument(
+            "--max-files",
+            type=int,
+            default=self.BATCH_SIZE,
+            help="Number of files streamed to clamd.",
+        )
+
+    def handle(self, *args, use_clamd, workers, max_files, **options):
         start = time.perf_counter()
         now = timezone.now()
-        files = File.objects.exclude(scan__clamav_completed_at__gt=now - relativedelta(months=1)).order_by(
-            F("scan__clamav_completed_at").asc(nulls_first=True)
-        )[: self.BATCH_SIZE]
+        if use_clamd:
+            scanned = self.stream_files_to_clamd(now, workers=workers, max_files=max_files)
+        else:
+            scanned = self.scan_batch(now)
+        elapsed = time.perf_counter() - start
+        self.stderr.write(f"Scanned {scanned} files in {elapsed:.2f}s.")
+
+    @staticmethod
+    def files_to_scan(now):
+        return File.objects.exclude(scan__clamav_completed_at__gt=now - relativedelta(months=1))
+
+    def scan_batch(self, now):
+        files = self.files_to_scan(now).order_by(F("scan__clamav_completed_at").asc(nulls_first=True))[
+            : self.BATCH_SIZE
+        ]
         # Indicate these files are being processed to concurrent scans.
         files = files.select_for_update(of=["self"], skip_locked=True, no_key=True)
         with tempfile.TemporaryDirectory() as workdir:
@@ -61,8 +97,88 @@ class Command(BaseCommand):
                     update_fields=["clamav_completed_at"],
                     unique_fields=["file_id"],
                 )
-        elapsed = time.perf_counter() - start
-        self.stderr.write(f"Scanned {len(files)} files in {elapsed:.2f}s.")
+        return len(files)
+
+    def stream_files_to_clamd(self, now, *, workers, max_files):
+        """
+        Scan files with a pool of workers, each file being locked only while it is scanned and its
+        result committed as soon as it is known. Interrupted runs keep the results of the scanned files.
+        """
+        keys = queue.SimpleQueue()
+        for key in (
+            self.files_to_scan(now)
+            .order_by(F("scan__clamav_completed_at").asc(nulls_first=True))
+            .values_list("pk", flat=True)[:max_files]
+        ):
+            keys.put(key)
+        # The client is thread safe, its connection pool is sized for 10 workers.
+        client = s3_client()
+        scanned_keys = []
+        failed_keys = []
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        key = keys.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        if self.scan_file_with_clamd(client, key, now):
+                            scanned_keys.append(key)
+                    except Exception:
+                        self.logger.exception("Could not scan file %s", key)
+                        failed_keys.append(key)
+            finally:
+                # Each thread opened its own database connection.
+                connections.close_all()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(worker) for _ in range(workers)]
+        for future in futures:
+            future.result()
+        if failed_keys:
+            raise CommandError(f"Could not scan {len(failed_keys)} files, {len(scanned_keys)} files were scanned.")
+        return len(scanned_keys)
+
+    def scan_file_with_clamd(self, client, key, now):
+        with transaction.atomic():
+            # Indicate this file is being processed to concurrent scans.
+            file = (
+                self.files_to_scan(now)
+                .filter(pk=key)
+                .select_for_update(of=["self"], skip_locked=True, no_key=True)
+                .first()
+            )
+            if file is None:
+                # Already scanned or being scanned by a concurrent scan.
+                return False
+            signature = self.stream_file_to_clamd(client, file.key)
+            Scan.objects.bulk_create(
+                [
+                    Scan(
+                        file=file,
+                        clamav_completed_at=now,
+                        clamav_signature=signature or "",
+                        # On conflict, the virus field is not updated. Assume legitimate files.
+                        infected=signature is not None,
+                    )
+                ],
+                update_conflicts=True,
+                update_fields=["clamav_completed_at", "clamav_signature"] if signature else ["clamav_completed_at"],
+                unique_fields=["file_id"],
+            )
+        return True
+
+    def stream_file_to_clamd(self, client, key, attempts=5):
+        for attempt in range(1, attempts + 1):
+            try:
+                body = client.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)["Body"]
+                with contextlib.closing(body):
+                    return clamd.instream(body.iter_chunks(self.CLAMD_CHUNK_SIZE))
+            except (BotoConnectionError, HTTPClientError):
+                if attempt == attempts:
+                    raise
 
     def download_files(self, files, workdir):
         client = s3_client()
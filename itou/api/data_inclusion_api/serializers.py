@@ -7,6 +7,14 @@ from itou.companies.enums import CompanyKind
 from itou.companies.models import Company
 from itou.prescribers.enums import PrescriberOrganizationKind
 from itou.prescribers.models import PrescriberOrganization
+from itou.utils.urls import get_absolute_url
+
+
+def build_absolute_uri(context, url):
+    # Snapshots are serialized outside of any request.
+    if request := context.get("request"):
+        return request.build_absolute_uri(url)
+    return get_absolute_url(url)
 
 
 class CompanySerializer(serializers.ModelSerializer):
@@ -117,7 +125,7 @@ class CompanySerializer(serializers.ModelSerializer):
         return dt.astimezone(timezone.get_current_timezone()).isoformat()
 
     def get_lien_source(self, obj) -> str:
-        return self.context["request"].build_absolute_uri(obj.get_card_url())
+        return build_absolute_uri(self.context, obj.get_card_url())
 
 
 class PrescriberOrgStructureSerializer(serializers.ModelSerializer):
@@ -198,4 +206,4 @@ class PrescriberOrgStructureSerializer(serializers.ModelSerializer):
 
     def get_lien_source(self, obj) -> str:
         url = obj.get_card_url()
-        return self.context["request"].build_absolute_uri(url) if url else None
+        return build_absolute_uri(self.context, url) if url else None
@@ -0,0 +1,91 @@
+"""
+Snapshots of the structures served by the data.inclusion API.
+
+Structures mostly change when the imports run, yet consumers crawl the whole feed on a regular basis:
+the serialized structures are stored after the imports (and on a schedule, for the changes made
+by the users), the API then serves them with a simple indexed query and supports conditional requests.
+"""
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.utils import timezone
+
+from itou.api.data_inclusion_api import enums, serializers
+from itou.api.models import DataInclusionSnapshot, DataInclusionSnapshotStructure
+from itou.companies.models import Company
+from itou.prescribers.models import PrescriberOrganization
+
+
+SERIALIZER_CLASSES = {
+    enums.StructureTypeStr.ORGA: serializers.PrescriberOrgStructureSerializer,
+    enums.StructureTypeStr.SIAE: serializers.CompanySerializer,
+}
+
+
+def get_structures_queryset(structure_type):
+    if structure_type == enums.StructureTypeStr.ORGA:
+        return PrescriberOrganization.objects.all()
+    return (
+        Company.objects.active()
+        .select_related("convention")
+        .annotate(
+            same_siret_count=Subquery(
+                Company.objects.filter(siret=OuterRef("siret"))
+                .values("siret")
+                .annotate(count=Count("pk"))
+                .values("count")
+            )
+        )
+    )
+
+
+def take_snapshot(structure_type):
+    """
+    Store the serialized structures of `structure_type`, only the changed ones are written.
+
+    The data also depends on related objects (the convention, the structures sharing the SIRET), so the
+    written structures are dated with the snapshot time rather than their own `updated_at`: the `since`
+    filter then returns every structure whose data changed. Deleted structures are only removed from
+    the snapshot.
+
+    Returns the number of created, updated and deleted structures.
+    """
+    serializer_class = SERIALIZER_CLASSES[structure_type]
+    structures = {}
+    for structure in get_structures_queryset(structure_type).order_by("pk").iterator(chunk_size=2000):
+        structures[structure.uid] = (structure.created_at, serializer_class(structure).data)
+
+    with transaction.atomic():
+        now = timezone.now()
+        snapshot, created = DataInclusionSnapshot.objects.select_for_update().get_or_create(
+            structure_type=structure_type.value, defaults={"updated_at": now}
+        )
+        existing = {uid: (pk, data) for pk, uid, data in snapshot.structures.values_list("pk", "uid", "data")}
+
+        to_create = []
+        to_update = []
+        for uid, (created_at, data) in structures.items():
+            if uid not in existing:
+                to_create.append(
+                    DataInclusionSnapshotStructure(
+                        snapshot=snapshot, uid=uid, created_at=created_at, updated_at=now, data=data
+                    )
+                )
+            elif existing[uid][1] != data:
+                to_update.append(
+                    DataInclusionSnapshotStructure(
+                        pk=existing[uid][0], created_at=created_at, updated_at=now, data=data
+                    )
+                )
+        to_delete = [pk for uid, (pk, _data) in existing.items() if uid not in structures]
+
+        DataInclusionSnapshotStructure.objects.bulk_create(to_create, batch_size=1000)
+        DataInclusionSnapshotStructure.objects.bulk_update(
+            to_update, fields=["created_at", "updated_at", "data"], batch_size=1000
+        )
+        DataInclusionSnapshotStructure.objects.filter(pk__in=to_delete).delete()
+        if not created and (to_create or to_update or to_delete):
+            snapshot.updated_at = now
+            snapshot.save(update_fields=["updated_at"])
+
+    return len(to_create), len(to_update), len(to_delete)
@@ -1,10 +1,15 @@
-from django.db.models import Count, OuterRef, Subquery
-from drf_spectacular.utils import PolymorphicProxySerializer, extend_schema
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, PolymorphicProxySerializer, extend_schema
 from rest_framework import authentication, exceptions, generics
 
 from itou.api.data_inclusion_api import enums, serializers
-from itou.companies.models import Company
-from itou.prescribers.models import PrescriberOrganization
+from itou.api.data_inclusion_api.snapshots import SERIALIZER_CLASSES, get_structures_queryset
+from itou.api.models import DataInclusionSnapshot
 
 
 @extend_schema(
@@ -16,7 +21,17 @@ from itou.prescribers.models import PrescriberOrganization
         },
         resource_type_field_name="type",
         many=True,
-    )
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="since",
+            type=OpenApiTypes.DATETIME,
+            description=(
+                "Ne retourne que les structures modifiées depuis cette date. "
+                "Les structures supprimées ne sont pas signalées."
+            ),
+        ),
+    ],
 )
 class DataInclusionStructureView(generics.ListAPIView):
     """
@@ -30,6 +45,14 @@ class DataInclusionStructureView(generics.ListAPIView):
     accessibles via le même point d'entrée. Il est nécessaire de préciser le paramètre
     `type` dans la requête, pour obtenir soit les SIAEs (`type=siae`), soit les
     organisations (`type=orga`).
+
+    Les données sont mises à jour toutes les heures : les en-têtes `ETag` et `Last-Modified`
+    permettent de ne les récupérer que lorsqu'elles ont changé, avec les en-têtes `If-None-Match`
+    et `If-Modified-Since`.
+
+    Le paramètre `since` ne retourne que les structures créées ou modifiées depuis cette date.
+    Les structures supprimées ou désactivées disparaissent simplement de la liste : pour les détecter,
+    il faut comparer les identifiants de la liste complète avec ceux déjà connus.
     """
 
     authentication_classes = [
@@ -45,37 +68,57 @@ class DataInclusionStructureView(generics.ListAPIView):
         elif unsafe_type_str not in list(enums.StructureTypeStr):
             raise exceptions.ValidationError("La valeur du paramètre `type` doit être `siae` ou `orga`.")
 
-        return super().list(request, *args, **kwargs)
+        snapshot = DataInclusionSnapshot.objects.filter(structure_type=unsafe_type_str).first()
+        if snapshot is None:
+            return super().list(request, *args, **kwargs)
+        return self.list_snapshot(request, snapshot)
+
+    def list_snapshot(self, request, snapshot):
+        etag = f'"{snapshot.structure_type}-{snapshot.updated_at.timestamp()}"'
+        last_modified = int(snapshot.updated_at.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            queryset = snapshot.structures.order_by("created_at", "pk")
+            if since := self.get_since():
+                queryset = queryset.filter(updated_at__gte=since)
+            page = self.paginate_queryset(queryset)
+            # JSON objects keys are not ordered in database.
+            fields = self.get_serializer_class().Meta.fields
+            response = self.get_paginated_response(
+                [{field: structure.data[field] for field in fields} for structure in page]
+            )
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def get_since(self):
+        unsafe_since = self.request.query_params.get("since")
+        if unsafe_since is None:
+            return None
+        try:
+            since = parse_datetime(unsafe_since)
+        except ValueError:
+            since = None
+        if since is None:
+            raise exceptions.ValidationError("La valeur du paramètre `since` doit être une date au format ISO 8601.")
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
 
     def get_queryset(self):
         valid_type_str = self.request.query_params.get("type")
 
-        qs_by_structure_type_str = {
-            enums.StructureTypeStr.ORGA: PrescriberOrganization.objects.all(),
-            enums.StructureTypeStr.SIAE: Company.objects.active()
-            .select_related("convention")
-            .annotate(
-                same_siret_count=Subquery(
-                    Company.objects.filter(siret=OuterRef("siret"))
-                    .values("siret")
-                    .annotate(count=Count("pk"))
-                    .values("count")
-                )
-            ),
-        }
+        queryset = get_structures_queryset(valid_type_str)
+        if since := self.get_since():
+            queryset = queryset.alias(date_maj=Coalesce("updated_at", "created_at")).filter(date_maj__gte=since)
 
         # * ordered by ascending creation date : if any instances are added during the querying
         # of the endpoint, they will appear in the last page.
         # * ordered by pk : given that some instances share the same creation date, it ensures
         # repeatable order between page evaluation
-        return qs_by_structure_type_str[valid_type_str].order_by("created_at", "pk")
+        return queryset.order_by("created_at", "pk")
 
     def get_serializer_class(self):
         valid_type_str = self.request.query_params.get("type")
 
-        serializer_class_by_structure_type_str = {
-            enums.StructureTypeStr.ORGA: serializers.PrescriberOrgStructureSerializer,
-            enums.StructureTypeStr.SIAE: serializers.CompanySerializer,
-        }
-
-        return serializer_class_by_structure_type_str[valid_type_str]
+        return SERIALIZER_CLASSES[valid_type_str]
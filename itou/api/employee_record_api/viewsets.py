@@ -97,7 +97,7 @@ class EmployeeRecordViewSet(AbstractEmployeeRecordViewSet):
         )
         try:
             return queryset.filter(job_application__to_company__id__in=companies).order_by(
-                "-created_at", "-updated_at"
+                "-created_at", "-updated_at", "-pk"
             )
         finally:
             # Tracking is currently done via user-agent header
@@ -165,7 +165,8 @@ Permet de récupérer les fiches salarié créées depuis date donnée en param
 
 
 class EmployeeRecordUpdateNotificationViewSet(AbstractEmployeeRecordViewSet):
-    queryset = EmployeeRecordUpdateNotification.objects.all()
+    # Ordered by primary key last, for the cursor pagination.
+    queryset = EmployeeRecordUpdateNotification.objects.order_by("-created_at", "-pk")
     serializer_class = EmployeeRecordUpdateNotificationAPISerializer
 
 
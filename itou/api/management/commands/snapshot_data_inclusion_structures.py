@@ -0,0 +1,18 @@
+import time
+
+from itou.api.data_inclusion_api import enums
+from itou.api.data_inclusion_api.snapshots import take_snapshot
+from itou.utils.command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = """Store the structures served by the data.inclusion API"""
+
+    def handle(self, **options):
+        for structure_type in enums.StructureTypeStr:
+            start = time.perf_counter()
+            created, updated, deleted = take_snapshot(structure_type)
+            self.stdout.write(
+                f"Snapshot of {structure_type.value} structures: {created} created, {updated} updated, "
+                f"{deleted} deleted in {time.perf_counter() - start:.3f} seconds"
+            )
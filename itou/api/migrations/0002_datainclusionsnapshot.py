@@ -0,0 +1,60 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataInclusionSnapshot",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "structure_type",
+                    models.CharField(
+                        choices=[("orga", "orga"), ("siae", "siae")],
+                        max_length=4,
+                        unique=True,
+                        verbose_name="type de structure",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(verbose_name="date de modification")),
+            ],
+            options={
+                "verbose_name": "instantané data.inclusion",
+                "verbose_name_plural": "instantanés data.inclusion",
+            },
+        ),
+        migrations.CreateModel(
+            name="DataInclusionSnapshotStructure",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("uid", models.UUIDField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("data", models.JSONField()),
+                (
+                    "snapshot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="structures",
+                        to="api.datainclusionsnapshot",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["snapshot", "created_at", "id"], name="di_structure_order_idx"),
+                    models.Index(fields=["snapshot", "updated_at"], name="di_structure_maj_idx"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        models.F("snapshot"), models.F("uid"), name="unique_datainclusionsnapshotstructure_uid"
+                    )
+                ],
+            },
+        ),
+    ]
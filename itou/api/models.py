@@ -3,6 +3,7 @@ import uuid
 from django.db import models
 from django.utils import timezone
 
+from itou.api.data_inclusion_api.enums import StructureTypeStr
 from itou.companies.models import Company
 
 
@@ -15,3 +16,40 @@ class CompanyApiToken(models.Model):
     class Meta:
         verbose_name = "jeton d'API SIAE"
         verbose_name_plural = "jetons d'API SIAE"
+
+
+class DataInclusionSnapshot(models.Model):
+    """
+    Serialized structures served by the data.inclusion API, see the `snapshot_data_inclusion_structures` command.
+    """
+
+    structure_type = models.CharField(
+        verbose_name="type de structure",
+        max_length=4,
+        choices=[(structure_type.value, structure_type.value) for structure_type in StructureTypeStr],
+        unique=True,
+    )
+    # Only changes when the serialized structures change, used for the conditional requests.
+    updated_at = models.DateTimeField(verbose_name="date de modification")
+
+    class Meta:
+        verbose_name = "instantané data.inclusion"
+        verbose_name_plural = "instantanés data.inclusion"
+
+
+class DataInclusionSnapshotStructure(models.Model):
+    snapshot = models.ForeignKey(DataInclusionSnapshot, on_delete=models.CASCADE, related_name="structures")
+    uid = models.UUIDField()
+    created_at = models.DateTimeField()
+    # When the serialized data last changed, for the `since` filter.
+    updated_at = models.DateTimeField()
+    data = models.JSONField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint("snapshot", "uid", name="unique_datainclusionsnapshotstructure_uid"),
+        ]
+        indexes = [
+            models.Index(fields=["snapshot", "created_at", "id"], name="di_structure_order_idx"),
+            models.Index(fields=["snapshot", "updated_at"], name="di_structure_maj_idx"),
+        ]
@@ -1,5 +1,8 @@
+import concurrent.futures
+import queue
 from time import sleep
 
+from django.db import connections
 from django.db.models import Q
 from django.utils import timezone
 
@@ -7,6 +10,7 @@ from itou.approvals import models as approvals_models
 from itou.job_applications.enums import JobApplicationState
 from itou.utils.apis import enums as api_enums
 from itou.utils.command import BaseCommand
+from itou.utils.throttling import TokenBucket
 
 
 # arbitrary value, set so that we don't run the cron for too long.
@@ -14,6 +18,12 @@ from itou.utils.command import BaseCommand
 # Since the cron runs every 5 minutes, it should be fine
 MAX_APPROVALS_PER_RUN = 140
 
+# With several workers, the batch size is derived from the PE API rate limit instead:
+# as many approvals as can be sent within a run at that rate.
+RUN_DURATION_SECONDS = 280
+# rechercheIndividuCertifie, then miseAJourPassIAE.
+REQUESTS_PER_NOTIFICATION = 2
+
 
 class Command(BaseCommand):
     help = "Regularly sends all 'pending' and 'should retry' approvals to PE"
@@ -21,8 +31,24 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--wet-run", dest="wet_run", action="store_true")
         parser.add_argument("--delay", action="store", dest="delay", default=0, type=int, choices=range(0, 5))
+        parser.add_argument(
+            "--workers",
+            action="store",
+            dest="workers",
+            default=1,
+            type=int,
+            help="Send the approvals concurrently, the delay is then replaced by the rate limit",
+        )
+        parser.add_argument(
+            "--rate",
+            action="store",
+            dest="rate",
+            default=3,
+            type=float,
+            help="Maximum number of requests per second to the PE API, when using several workers",
+        )
 
-    def handle(self, *, wet_run, delay, **options):
+    def handle(self, *, wet_run, delay, workers, rate, **options):
         today = timezone.localdate()
 
         # Check if approvals in ERROR on endpoint rech_individu are now linked to an user
@@ -61,20 +87,23 @@ class Command(BaseCommand):
             ],
         ).order_by("-start_at")
 
+        if workers > 1:
+            max_approvals_per_run = int(rate * RUN_DURATION_SECONDS / REQUESTS_PER_NOTIFICATION)
+        else:
+            max_approvals_per_run = MAX_APPROVALS_PER_RUN
+
         nb_approvals = queryset.count()
-        self.stdout.write(f"approvals needing to be sent count={nb_approvals}, batch count={MAX_APPROVALS_PER_RUN}")
-        nb_approvals_to_send = min(nb_approvals, MAX_APPROVALS_PER_RUN)
+        self.stdout.write(f"approvals needing to be sent count={nb_approvals}, batch count={max_approvals_per_run}")
+        nb_approvals_to_send = min(nb_approvals, max_approvals_per_run)
 
-        for approval in queryset[:nb_approvals_to_send]:
+        approvals = list(queryset[:nb_approvals_to_send])
+        for approval in approvals:
             self.stdout.write(
                 f"approvals={approval} start_at={approval.start_at} pe_state={approval.pe_notification_status}"
             )
-            if wet_run:
-                approval.notify_pole_emploi()
-                sleep(delay)
 
         # Send READY CancelledApprovals
-        batch_left = MAX_APPROVALS_PER_RUN - nb_approvals_to_send
+        batch_left = max_approvals_per_run - nb_approvals_to_send
         cancelled_queryset = approvals_models.CancelledApproval.objects.filter(
             pe_notification_status__in=[
                 api_enums.PEApiNotificationStatus.READY,
@@ -84,11 +113,43 @@ class Command(BaseCommand):
         self.stdout.write(
             f"cancelled approvals needing to be sent count={cancelled_queryset.count()}, batch count={batch_left}"
         )
-        for cancelled_approval in cancelled_queryset[:batch_left]:
+        cancelled_approvals = list(cancelled_queryset[:batch_left])
+        for cancelled_approval in cancelled_approvals:
             self.stdout.write(
                 f"cancelled_approval={cancelled_approval} start_at={cancelled_approval.start_at} "
                 f"pe_state={cancelled_approval.pe_notification_status}"
             )
-            if wet_run:
-                cancelled_approval.notify_pole_emploi()
-                sleep(delay)
+
+        if wet_run:
+            if workers > 1:
+                self.notify_concurrently(approvals + cancelled_approvals, workers=workers, rate=rate)
+            else:
+                for approval in approvals + cancelled_approvals:
+                    approval.notify_pole_emploi()
+                    sleep(delay)
+
+    @staticmethod
+    def notify_concurrently(approvals, *, workers, rate):
+        # The OAuth token is shared by the workers through the cache, see PoleEmploiApiClient.
+        rate_limiter = TokenBucket(rate, capacity=max(rate, REQUESTS_PER_NOTIFICATION))
+        pending = queue.SimpleQueue()
+        for approval in approvals:
+            pending.put(approval)
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        approval = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    rate_limiter.acquire(REQUESTS_PER_NOTIFICATION)
+                    approval.notify_pole_emploi()
+            finally:
+                # Each thread opened its own database connection.
+                connections.close_all()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(worker) for _ in range(workers)]
+        for future in futures:
+            future.result()
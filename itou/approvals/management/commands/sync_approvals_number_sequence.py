@@ -0,0 +1,11 @@
+from itou.approvals.models import Approval, CancelledApproval
+from itou.utils.command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Make the PASS IAE numbers restart after the last number found in the database, e.g. after loading data"
+
+    def handle(self, **options):
+        last_number = max(Approval.last_number(), CancelledApproval.last_number())
+        Approval.sync_number_sequence(last_number)
+        self.stdout.write(f"PASS IAE numbers restart after last_number={last_number}")
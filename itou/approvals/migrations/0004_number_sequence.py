@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def _seed_number_sequence(apps, schema_editor):
+    last_number = 0
+    for model_name in ["Approval", "CancelledApproval"]:
+        model = apps.get_model("approvals", model_name)
+        number = (
+            model.objects.filter(number__startswith=settings.ASP_ITOU_PREFIX)
+            .order_by("number")
+            .values_list("number", flat=True)
+            .last()
+        )
+        if number:
+            last_number = max(last_number, int(number.removeprefix(settings.ASP_ITOU_PREFIX)))
+    schema_editor.execute(
+        "SELECT setval('approvals_number_seq', %s, %s)",
+        [max(last_number, 1), last_number > 0],
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("approvals", "0003_alter_approval_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE SEQUENCE approvals_number_seq",
+            reverse_sql="DROP SEQUENCE approvals_number_seq",
+        ),
+        migrations.RunPython(_seed_number_sequence, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,95 @@
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("approvals", "0004_number_sequence"),
+        ("users", "0006_user_full_text"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobSeekerApprovalsSummary",
+            fields=[
+                (
+                    "job_seeker",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="approvals_summary",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="demandeur d'emploi",
+                    ),
+                ),
+                ("approval_start_at", models.DateField(null=True, verbose_name="date de début du dernier PASS IAE")),
+                ("approval_end_at", models.DateField(null=True, verbose_name="date de fin du dernier PASS IAE")),
+                (
+                    "pe_approval_start_at",
+                    models.DateField(null=True, verbose_name="date de début du dernier agrément Pôle emploi"),
+                ),
+                (
+                    "pe_approval_end_at",
+                    models.DateField(null=True, verbose_name="date de fin du dernier agrément Pôle emploi"),
+                ),
+                (
+                    "latest_approval",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="approvals.approval",
+                        verbose_name="dernier PASS IAE",
+                    ),
+                ),
+                (
+                    "latest_pe_approval",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="approvals.poleemploiapproval",
+                        verbose_name="dernier agrément Pôle emploi",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "résumé des PASS IAE du demandeur d'emploi",
+                "verbose_name_plural": "résumés des PASS IAE des demandeurs d'emploi",
+            },
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="approval",
+            trigger=pgtrigger.compiler.Trigger(
+                name="refresh_approvals_summary",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n                    IF (TG_OP = 'UPDATE' AND (OLD.user_id, OLD.number, OLD.start_at, OLD.end_at)\n                        IS NOT DISTINCT FROM (NEW.user_id, NEW.number, NEW.start_at, NEW.end_at)) THEN\n                        RETURN NULL;\n                    END IF;\n                    IF (TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.user_id <> NEW.user_id)) THEN\n                        \n        INSERT INTO approvals_jobseekerapprovalssummary (\n            job_seeker_id,\n            latest_approval_id,\n            approval_start_at,\n            approval_end_at,\n            latest_pe_approval_id,\n            pe_approval_start_at,\n            pe_approval_end_at\n        )\n        SELECT\n            users_user.id,\n            approval.id,\n            approval.start_at,\n            approval.end_at,\n            pe_approval.id,\n            pe_approval.start_at,\n            pe_approval.end_at\n        FROM users_user\n        LEFT JOIN users_jobseekerprofile AS profile ON profile.user_id = users_user.id\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_approval\n            WHERE approvals_approval.user_id = users_user.id\n            ORDER BY end_at DESC, start_at, created_at DESC\n            LIMIT 1\n        ) AS approval ON TRUE\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_poleemploiapproval\n            WHERE (\n                (profile.nir <> '' AND approvals_poleemploiapproval.nir = profile.nir)\n                OR (\n                    profile.pole_emploi_id <> ''\n                    AND approvals_poleemploiapproval.pole_emploi_id = profile.pole_emploi_id\n                    AND approvals_poleemploiapproval.birthdate = users_user.birthdate\n                )\n            )\n            AND NOT EXISTS (\n                SELECT FROM approvals_approval\n                WHERE approvals_approval.user_id = users_user.id\n                AND approvals_approval.number = approvals_poleemploiapproval.number\n            )\n            ORDER BY end_at DESC, start_at, number DESC\n            LIMIT 1\n        ) AS pe_approval ON TRUE\n        WHERE users_user.id = OLD.user_id AND users_user.kind = 'job_seeker'\n        ON CONFLICT (job_seeker_id) DO UPDATE SET\n            latest_approval_id = EXCLUDED.latest_approval_id,\n            approval_start_at = EXCLUDED.approval_start_at,\n            approval_end_at = EXCLUDED.approval_end_at,\n            latest_pe_approval_id = EXCLUDED.latest_pe_approval_id,\n            pe_approval_start_at = EXCLUDED.pe_approval_start_at,\n            pe_approval_end_at = EXCLUDED.pe_approval_end_at;\n    \n                    END IF;\n                    IF (TG_OP <> 'DELETE') THEN\n                        \n        INSERT INTO approvals_jobseekerapprovalssummary (\n            job_seeker_id,\n            latest_approval_id,\n            approval_start_at,\n            approval_end_at,\n            latest_pe_approval_id,\n            pe_approval_start_at,\n            pe_approval_end_at\n        )\n        SELECT\n            users_user.id,\n            approval.id,\n            approval.start_at,\n            approval.end_at,\n            pe_approval.id,\n            pe_approval.start_at,\n            pe_approval.end_at\n        FROM users_user\n        LEFT JOIN users_jobseekerprofile AS profile ON profile.user_id = users_user.id\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_approval\n            WHERE approvals_approval.user_id = users_user.id\n            ORDER BY end_at DESC, start_at, created_at DESC\n            LIMIT 1\n        ) AS approval ON TRUE\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_poleemploiapproval\n            WHERE (\n                (profile.nir <> '' AND approvals_poleemploiapproval.nir = profile.nir)\n                OR (\n                    profile.pole_emploi_id <> ''\n                    AND approvals_poleemploiapproval.pole_emploi_id = profile.pole_emploi_id\n                    AND approvals_poleemploiapproval.birthdate = users_user.birthdate\n                )\n            )\n            AND NOT EXISTS (\n                SELECT FROM approvals_approval\n                WHERE approvals_approval.user_id = users_user.id\n                AND approvals_approval.number = approvals_poleemploiapproval.number\n            )\n            ORDER BY end_at DESC, start_at, number DESC\n            LIMIT 1\n        ) AS pe_approval ON TRUE\n        WHERE users_user.id = NEW.user_id AND users_user.kind = 'job_seeker'\n        ON CONFLICT (job_seeker_id) DO UPDATE SET\n            latest_approval_id = EXCLUDED.latest_approval_id,\n            approval_start_at = EXCLUDED.approval_start_at,\n            approval_end_at = EXCLUDED.approval_end_at,\n            latest_pe_approval_id = EXCLUDED.latest_pe_approval_id,\n            pe_approval_start_at = EXCLUDED.pe_approval_start_at,\n            pe_approval_end_at = EXCLUDED.pe_approval_end_at;\n    \n                    END IF;\n                    RETURN NULL;\n                ",  # noqa: E501
+                    hash="e33e7c754578fd8ee727015052058f9a1955c029",
+                    operation='INSERT OR UPDATE OF "user_id", "number", "start_at", "end_at" OR DELETE',
+                    pgid="pgtrigger_refresh_approvals_summary_fd0df",
+                    table="approvals_approval",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="poleemploiapproval",
+            trigger=pgtrigger.compiler.Trigger(
+                name="refresh_approvals_summary",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    declare="DECLARE current_job_seeker_id INT;",
+                    func="\n                    -- Refresh the job seekers matching the PE approval before and after the change.\n                    FOR current_job_seeker_id IN\n                        SELECT profile.user_id\n                        FROM users_jobseekerprofile AS profile\n                        JOIN users_user ON users_user.id = profile.user_id\n                        WHERE (profile.nir <> '' AND profile.nir IN (OLD.nir, NEW.nir))\n                        OR (\n                            profile.pole_emploi_id <> ''\n                            AND (profile.pole_emploi_id, users_user.birthdate) IN (\n                                (OLD.pole_emploi_id, OLD.birthdate), (NEW.pole_emploi_id, NEW.birthdate)\n                            )\n                        )\n                        LOOP\n                            \n        INSERT INTO approvals_jobseekerapprovalssummary (\n            job_seeker_id,\n            latest_approval_id,\n            approval_start_at,\n            approval_end_at,\n            latest_pe_approval_id,\n            pe_approval_start_at,\n            pe_approval_end_at\n        )\n        SELECT\n            users_user.id,\n            approval.id,\n            approval.start_at,\n            approval.end_at,\n            pe_approval.id,\n            pe_approval.start_at,\n            pe_approval.end_at\n        FROM users_user\n        LEFT JOIN users_jobseekerprofile AS profile ON profile.user_id = users_user.id\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_approval\n            WHERE approvals_approval.user_id = users_user.id\n            ORDER BY end_at DESC, start_at, created_at DESC\n            LIMIT 1\n        ) AS approval ON TRUE\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_poleemploiapproval\n            WHERE (\n                (profile.nir <> '' AND approvals_poleemploiapproval.nir = profile.nir)\n                OR (\n                    profile.pole_emploi_id <> ''\n                    AND approvals_poleemploiapproval.pole_emploi_id = profile.pole_emploi_id\n                    AND approvals_poleemploiapproval.birthdate = users_user.birthdate\n                )\n            )\n            AND NOT EXISTS (\n                SELECT FROM approvals_approval\n                WHERE approvals_approval.user_id = users_user.id\n                AND approvals_approval.number = approvals_poleemploiapproval.number\n            )\n            ORDER BY end_at DESC, start_at, number DESC\n            LIMIT 1\n        ) AS pe_approval ON TRUE\n        WHERE users_user.id = current_job_seeker_id AND users_user.kind = 'job_seeker'\n        ON CONFLICT (job_seeker_id) DO UPDATE SET\n            latest_approval_id = EXCLUDED.latest_approval_id,\n            approval_start_at = EXCLUDED.approval_start_at,\n            approval_end_at = EXCLUDED.approval_end_at,\n            latest_pe_approval_id = EXCLUDED.latest_pe_approval_id,\n            pe_approval_start_at = EXCLUDED.pe_approval_start_at,\n            pe_approval_end_at = EXCLUDED.pe_approval_end_at;\n    \n                        END LOOP;\n                    RETURN NULL;\n                ",  # noqa: E501
+                    hash="e6010812c8af65abcc2789c852287a38b4b958b0",
+                    operation='INSERT OR UPDATE OF "number", "start_at", "end_at", "pole_emploi_id", "birthdate", '
+                    '"nir" OR DELETE',
+                    pgid="pgtrigger_refresh_approvals_summary_c8461",
+                    table="approvals_poleemploiapproval",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
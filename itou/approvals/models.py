@@ -10,9 +10,9 @@ from django.contrib.postgres.constraints import ExclusionConstraint
 from django.contrib.postgres.fields import ArrayField, RangeBoundary, RangeOperators
 from django.core.exceptions import ValidationError
 from django.core.validators import MinLengthValidator
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.db.models import Case, Count, F, OuterRef, Q, Subquery, When
-from django.db.models.functions import Now, TruncDate
+from django.db.models.functions import Coalesce, Now, TruncDate
 from django.utils import timezone
 from django.utils.functional import cached_property
 from unidecode import unidecode
@@ -23,6 +23,7 @@ from itou.companies import enums as companies_enums
 from itou.files.models import File
 from itou.job_applications import enums as job_application_enums
 from itou.prescribers import enums as prescribers_enums
+from itou.users.enums import UserKind
 from itou.utils.apis import enums as api_enums, pole_emploi_api_client
 from itou.utils.apis.pole_emploi import DATE_FORMAT, PoleEmploiAPIBadResponse, PoleEmploiAPIException
 from itou.utils.models import DateRange
@@ -33,6 +34,72 @@ from . import enums, notifications
 
 logger = logging.getLogger(__name__)
 
+# Postgres sequence issuing the PASS IAE numbers, see `Approval.get_next_number()`.
+NUMBER_SEQUENCE = "approvals_number_seq"
+
+
+def refresh_approvals_summary_sql(job_seeker_id):
+    """
+    SQL statement of the triggers computing the `JobSeekerApprovalsSummary` of a job seeker, `job_seeker_id`
+    being an SQL expression, e.g. `NEW.user_id`.
+
+    The approvals are selected by end date, and PE approvals are matched like in
+    `PoleEmploiApprovalManager.find_for()`.
+    """
+    return f"""
+        INSERT INTO approvals_jobseekerapprovalssummary (
+            job_seeker_id,
+            latest_approval_id,
+            approval_start_at,
+            approval_end_at,
+            latest_pe_approval_id,
+            pe_approval_start_at,
+            pe_approval_end_at
+        )
+        SELECT
+            users_user.id,
+            approval.id,
+            approval.start_at,
+            approval.end_at,
+            pe_approval.id,
+            pe_approval.start_at,
+            pe_approval.end_at
+        FROM users_user
+        LEFT JOIN users_jobseekerprofile AS profile ON profile.user_id = users_user.id
+        LEFT JOIN LATERAL (
+            SELECT id, start_at, end_at FROM approvals_approval
+            WHERE approvals_approval.user_id = users_user.id
+            ORDER BY end_at DESC, start_at, created_at DESC
+            LIMIT 1
+        ) AS approval ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT id, start_at, end_at FROM approvals_poleemploiapproval
+            WHERE (
+                (profile.nir <> '' AND approvals_poleemploiapproval.nir = profile.nir)
+                OR (
+                    profile.pole_emploi_id <> ''
+                    AND approvals_poleemploiapproval.pole_emploi_id = profile.pole_emploi_id
+                    AND approvals_poleemploiapproval.birthdate = users_user.birthdate
+                )
+            )
+            AND NOT EXISTS (
+                SELECT FROM approvals_approval
+                WHERE approvals_approval.user_id = users_user.id
+                AND approvals_approval.number = approvals_poleemploiapproval.number
+            )
+            ORDER BY end_at DESC, start_at, number DESC
+            LIMIT 1
+        ) AS pe_approval ON TRUE
+        WHERE users_user.id = {job_seeker_id} AND users_user.kind = '{UserKind.JOB_SEEKER}'
+        ON CONFLICT (job_seeker_id) DO UPDATE SET
+            latest_approval_id = EXCLUDED.latest_approval_id,
+            approval_start_at = EXCLUDED.approval_start_at,
+            approval_end_at = EXCLUDED.approval_end_at,
+            latest_pe_approval_id = EXCLUDED.latest_pe_approval_id,
+            pe_approval_start_at = EXCLUDED.pe_approval_start_at,
+            pe_approval_end_at = EXCLUDED.pe_approval_end_at;
+    """
+
 
 class CommonApprovalMixin(models.Model):
     """
@@ -77,10 +144,6 @@ class CommonApprovalMixin(models.Model):
 
     @classmethod
     def last_number(cls):
-        # Lock the table's first row until the end of the transaction, effectively acting as a
-        # poor man's semaphore.
-        cls.objects.order_by("pk").select_for_update().first()
-        # Now we can do a whole new SELECT that will take into account eventual new rows.
         number = (
             cls.objects.filter(number__startswith=Approval.ASP_ITOU_PREFIX)
             .order_by("number")
@@ -223,9 +286,8 @@ class ApprovalQuerySet(CommonApprovalQuerySet):
         return self.annotate(
             assigned_company=Subquery(
                 job_application_model.objects.accepted()
-                .with_accepted_at()
                 .filter(job_seeker=OuterRef("user"))
-                .order_by("-accepted_at", "-hiring_start_at")
+                .order_by(Coalesce("accepted_at", "created_at").desc(), "-hiring_start_at")
                 .values("to_company")[:1],
             )
         )
@@ -609,6 +671,27 @@ class Approval(PENotificationMixin, CommonApprovalMixin):
                     RETURN NEW;
                 """,
             ),
+            pgtrigger.Trigger(
+                name="refresh_approvals_summary",
+                when=pgtrigger.After,
+                # Suspensions and prolongations update the end date through their own triggers.
+                operation=pgtrigger.Insert
+                | pgtrigger.UpdateOf("user_id", "number", "start_at", "end_at")
+                | pgtrigger.Delete,
+                func=f"""
+                    IF (TG_OP = 'UPDATE' AND (OLD.user_id, OLD.number, OLD.start_at, OLD.end_at)
+                        IS NOT DISTINCT FROM (NEW.user_id, NEW.number, NEW.start_at, NEW.end_at)) THEN
+                        RETURN NULL;
+                    END IF;
+                    IF (TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.user_id <> NEW.user_id)) THEN
+                        {refresh_approvals_summary_sql("OLD.user_id")}
+                    END IF;
+                    IF (TG_OP <> 'DELETE') THEN
+                        {refresh_approvals_summary_sql("NEW.user_id")}
+                    END IF;
+                    RETURN NULL;
+                """,
+            ),
         ]
 
     def __str__(self):
@@ -617,7 +700,6 @@ class Approval(PENotificationMixin, CommonApprovalMixin):
     def save(self, *args, **kwargs):
         self.clean()
         if not self.number:
-            # `get_next_number` will lock rows until the end of the transaction.
             self.number = self.get_next_number()
         if not self.number.startswith(Approval.ASP_ITOU_PREFIX):
             # Override any existing origin as a PE Approval converted from the admin is still a PE Approval
@@ -862,31 +944,43 @@ class Approval(PENotificationMixin, CommonApprovalMixin):
             - A max of 99999 approvals could be issued by year
             - We would have gone beyond, we would never have thought we could go that far
 
-        For future reference:
-            An advisory lock would be safer than the dual select_for_update() performed here.
-            Code sample (courtesy of @ffreitag):
-
-            def acquire_lock(name):
-                if not connection.in_atomic_block:
-                    raise RuntimeError("Database is not in a transaction.")
+        Numbers are handed out by the NUMBER_SEQUENCE Postgres sequence, without locking any row:
+        concurrent transactions never get the same number, and never wait for each other.
+        The number of a rolled back transaction is lost, leaving a hole in the numbering.
 
-                key = zlib.crc32(name.encode())
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (key,))
-                    (acquired,) = cursor.fetchone()
-                return acquired
-
-            The difficult part would be to implement the tests properly, meaning to reproduce the
-            problems met in production (namely, deadlocks or holes/duplicate numbers)
+        The numbers already taken are skipped: the sequence may lag behind numbers issued by other means
+        since it was last synced, e.g. by the instances still running the previous code during a deploy.
+        """
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(
+                    f"""
+                    SELECT next_number, (
+                        NOT EXISTS (SELECT FROM {Approval._meta.db_table} WHERE number = candidate.number)
+                        AND NOT EXISTS (SELECT FROM {CancelledApproval._meta.db_table} WHERE number = candidate.number)
+                    )
+                    FROM nextval(%s) AS next_number,
+                        LATERAL (SELECT %s::text || lpad(next_number::text, 7, '0') AS number) AS candidate
+                    """,
+                    [NUMBER_SEQUENCE, Approval.ASP_ITOU_PREFIX],
+                )
+                next_number, is_available = cursor.fetchone()
+                if next_number > 9999999:
+                    raise RuntimeError("The maximum number of PASS IAE has been reached.")
+                if is_available:
+                    return f"{Approval.ASP_ITOU_PREFIX}{next_number:07d}"
 
-            Keep the "poor man's version" for now as it's probably enough (and tested) but keep an eye on:
-            - deadlocks (cancelling an approval never finishes and eventually fails)
-            - holes/duplicates in the combined sequence of Approval + CancelledApproval
+    @staticmethod
+    def sync_number_sequence(last_number=None):
+        """
+        Make `get_next_number()` restart after `last_number`, defaulting to the last number found in
+        both Approval and CancelledApproval. Needed when PASS IAE numbers are created by other means,
+        e.g. when loading fixtures, and not safe to run while PASS IAE are being issued.
         """
-        next_number = max(Approval.last_number(), CancelledApproval.last_number()) + 1
-        if next_number > 9999999:
-            raise RuntimeError("The maximum number of PASS IAE has been reached.")
-        return f"{Approval.ASP_ITOU_PREFIX}{next_number:07d}"
+        if last_number is None:
+            last_number = max(Approval.last_number(), CancelledApproval.last_number())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setval(%s, %s, %s)", [NUMBER_SEQUENCE, max(last_number, 1), last_number > 0])
 
     @staticmethod
     def get_default_end_date(start_at):
@@ -1888,6 +1982,34 @@ class PoleEmploiApproval(PENotificationMixin, CommonApprovalMixin):
             models.Index(fields=["nir"], name="nir_idx"),
             models.Index(fields=["pole_emploi_id", "birthdate"], name="pe_id_and_birthdate_idx"),
         ]
+        triggers = [
+            pgtrigger.Trigger(
+                name="refresh_approvals_summary",
+                when=pgtrigger.After,
+                operation=pgtrigger.Insert
+                | pgtrigger.UpdateOf("number", "start_at", "end_at", "pole_emploi_id", "birthdate", "nir")
+                | pgtrigger.Delete,
+                func=f"""
+                    -- Refresh the job seekers matching the PE approval before and after the change.
+                    FOR current_job_seeker_id IN
+                        SELECT profile.user_id
+                        FROM users_jobseekerprofile AS profile
+                        JOIN users_user ON users_user.id = profile.user_id
+                        WHERE (profile.nir <> '' AND profile.nir IN (OLD.nir, NEW.nir))
+                        OR (
+                            profile.pole_emploi_id <> ''
+                            AND (profile.pole_emploi_id, users_user.birthdate) IN (
+                                (OLD.pole_emploi_id, OLD.birthdate), (NEW.pole_emploi_id, NEW.birthdate)
+                            )
+                        )
+                        LOOP
+                            {refresh_approvals_summary_sql("current_job_seeker_id")}
+                        END LOOP;
+                    RETURN NULL;
+                """,
+                declare=[("current_job_seeker_id", "INT")],
+            ),
+        ]
 
     def __str__(self):
         return self.number
@@ -1924,6 +2046,63 @@ class PoleEmploiApproval(PENotificationMixin, CommonApprovalMixin):
             )
 
 
+class JobSeekerApprovalsSummary(models.Model):
+    """
+    The latest PASS IAE and PE approval of a job seeker with their validity windows, to avoid looking
+    for them on each read, see `User.latest_approval` and `User.latest_pe_approval`.
+
+    Rows are maintained by the `refresh_approvals_summary` triggers of the approvals, PE approvals, job seeker
+    profiles and users, never from Python: they stay up to date when suspensions and prolongations change
+    the end of an approval, and with bulk updates. The latest approval is the one ending last, whether or not
+    it is still valid: validity and waiting period depend on the current date and are checked on read.
+    """
+
+    job_seeker = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        verbose_name="demandeur d'emploi",
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="approvals_summary",
+    )
+    latest_approval = models.ForeignKey(
+        Approval,
+        verbose_name="dernier PASS IAE",
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    approval_start_at = models.DateField(verbose_name="date de début du dernier PASS IAE", null=True)
+    approval_end_at = models.DateField(verbose_name="date de fin du dernier PASS IAE", null=True)
+    latest_pe_approval = models.ForeignKey(
+        PoleEmploiApproval,
+        verbose_name="dernier agrément Pôle emploi",
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    pe_approval_start_at = models.DateField(verbose_name="date de début du dernier agrément Pôle emploi", null=True)
+    pe_approval_end_at = models.DateField(verbose_name="date de fin du dernier agrément Pôle emploi", null=True)
+
+    class Meta:
+        verbose_name = "résumé des PASS IAE du demandeur d'emploi"
+        verbose_name_plural = "résumés des PASS IAE des demandeurs d'emploi"
+
+    def __str__(self):
+        return str(self.job_seeker_id)
+
+    @property
+    def approval_waiting_period_end(self):
+        if self.approval_end_at is None:
+            return None
+        return self.approval_end_at + relativedelta(years=CommonApprovalMixin.WAITING_PERIOD_YEARS)
+
+    @property
+    def pe_approval_waiting_period_end(self):
+        if self.pe_approval_end_at is None:
+            return None
+        return self.pe_approval_end_at + relativedelta(years=CommonApprovalMixin.WAITING_PERIOD_YEARS)
+
+
 class OriginalPoleEmploiApproval(CommonApprovalMixin):
     """
     This table contains the original, "unmerged" PEApprovals: in particular it may have
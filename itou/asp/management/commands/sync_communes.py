@@ -10,6 +10,7 @@ from django.db.models.deletion import RestrictedError
 
 from itou.asp.models import Commune
 from itou.cities.models import City
+from itou.common_apps.address.names_index import invalidate_names_index
 from itou.users.models import JobSeekerProfile
 from itou.utils.command import BaseCommand
 from itou.utils.sync import DiffItemKind, yield_sync_diff
@@ -139,6 +140,8 @@ class Command(BaseCommand):
 
                 objs = Commune.objects.bulk_create(communes_added_by_csv)
                 self.stdout.write(f"> successfully created count={len(objs)} new communes")
+                # Bulk operations do not send signals.
+                transaction.on_commit(invalidate_names_index)
 
                 if profiles_to_remap:
                     has_raised = False
@@ -8,6 +8,7 @@ from django.db import transaction
 from django.template.defaultfilters import slugify
 
 from itou.cities.models import City, EditionModeChoices
+from itou.common_apps.address.names_index import invalidate_names_index
 from itou.utils.command import BaseCommand
 from itou.utils.sync import DiffItemKind, yield_sync_diff
 
@@ -113,3 +114,5 @@ class Command(BaseCommand):
                     batch_size=1000,
                 )
                 self.stdout.write(f"> successfully updated count={n_objs} cities")
+                # Bulk operations do not send signals.
+                transaction.on_commit(invalidate_names_index)
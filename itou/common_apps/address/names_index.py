@@ -0,0 +1,196 @@
+"""
+In-process indexes of the cities and communes names, used by the autocomplete endpoints.
+
+Both tables are reference data only changed by the `sync_cities` and `sync_communes` commands (or by hand
+in the admin), yet every keystroke in an address or birth place field used to run an unaccented substring
+search on them. Each worker now keeps the normalised names in memory and rebuilds them when the version
+stored in cache changes.
+"""
+
+import bisect
+import threading
+import uuid
+from typing import NamedTuple
+
+from django.core.cache import caches
+from django.db import transaction
+from unidecode import unidecode
+
+from itou.asp.models import Commune
+from itou.cities.models import City
+
+
+NAMES_INDEX_VERSION_KEY = "autocomplete:names_index:version"
+# Cannot be typed in a search term, used to separate the names.
+SEPARATOR = "\0"
+
+
+class CityEntry(NamedTuple):
+    pk: int
+    name: str
+    slug: str
+    department: str
+    post_codes: tuple
+
+    @property
+    def display_name(self):
+        return f"{self.name} ({self.department})"
+
+    def autocomplete_display(self):
+        return self.display_name
+
+
+class CommuneEntry(NamedTuple):
+    pk: int
+    code: str
+    name: str
+    start_date: object
+    end_date: object
+
+    @property
+    def department_code(self):
+        # See Commune.department_code
+        if self.code.startswith("97") or self.code.startswith("98"):
+            return self.code[0:3]
+        return f"0{self.code[0:2]}"
+
+    def autocomplete_display(self):
+        return f"{self.name} ({self.department_code})"
+
+    def is_active(self, date):
+        return self.start_date <= date and (self.end_date is None or self.end_date > date)
+
+
+def normalize(name):
+    return unidecode(name.lower()).replace(SEPARATOR, "")
+
+
+class NamesIndex:
+    """
+    Substring search over the names of `entries`, which are expected to be sorted in the order of
+    the results with the same match position (by name, then by department or code).
+    """
+
+    def __init__(self, entries, codes):
+        self.entries = entries
+        names = [normalize(entry.name) for entry in entries]
+        self.text = SEPARATOR.join(names)
+        # Start of each name in `text`.
+        self.offsets = []
+        offset = 0
+        for name in names:
+            self.offsets.append(offset)
+            offset += len(name) + len(SEPARATOR)
+        # Sorted (code, position) pairs, to find the entries by code prefix.
+        self.codes = sorted((code, position) for position, entry in enumerate(entries) for code in codes(entry))
+
+    def _match_positions(self, term):
+        """Return {entry position: index of the first match of `term` in its name}"""
+        positions = {}
+        start = self.text.find(term)
+        while start != -1:
+            position = bisect.bisect_right(self.offsets, start) - 1
+            positions[position] = start - self.offsets[position]
+            # Only the first match in each name is relevant, skip to the next one.
+            if position + 1 == len(self.offsets):
+                break
+            start = self.text.find(term, self.offsets[position + 1])
+        return positions
+
+    def search_name(self, term):
+        """
+        Entries whose name contains `term`, the ones where it appears first coming first.
+        """
+        # We started with a trigram similarity and word similarity approach. It is disappointing
+        # since it does return results that are not expected, for instance results containing
+        # letters not present in the search.
+        # It has been decided with the UX to use the simplest approach. It seems that most
+        # people look for a city by "the start of the name", not by "any word within the name"
+        # so the substring search, ordered by index of the matching string, feels more natural.
+        # The hyphenated/unhyphenated thing has been added considering the mess that hyphens
+        # represent in french city names. It should be improved in the future to handle cases
+        # such as search terms “La Chapelle du” not finding La Chapelle-du-Châtelard.
+        term = normalize(term)
+        best_indexes = {}
+        for variant in {term.replace("-", " "), term.replace(" ", "-")}:
+            for position, index in self._match_positions(variant).items():
+                best_indexes[position] = min(index, best_indexes.get(position, index))
+        return [self.entries[position] for position in sorted(best_indexes, key=lambda p: (best_indexes[p], p))]
+
+    def search_code(self, code, prefix=False):
+        """Entries with `code`, or a code starting with `code` when `prefix` is set."""
+        start = bisect.bisect_left(self.codes, (code,))
+        if prefix:
+            end = bisect.bisect_left(self.codes, (code + "\uffff",))
+        else:
+            end = bisect.bisect_right(self.codes, (code, len(self.entries)))
+        return [self.entries[position] for position in sorted({position for _code, position in self.codes[start:end]})]
+
+
+def _build_cities_index():
+    entries = [
+        CityEntry(pk, name, slug, department, tuple(post_codes))
+        for pk, name, slug, department, post_codes in City.objects.order_by("name", "department", "pk").values_list(
+            "pk", "name", "slug", "department", "post_codes"
+        )
+    ]
+    return NamesIndex(entries, codes=lambda entry: entry.post_codes)
+
+
+def _build_communes_index():
+    entries = [
+        CommuneEntry(*values)
+        for values in Commune.objects.order_by("name", "code", "pk").values_list(
+            "pk", "code", "name", "start_date", "end_date"
+        )
+    ]
+    return NamesIndex(entries, codes=lambda entry: [entry.code])
+
+
+class _Indexes:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.indexes = {}
+
+    def get(self, name, build):
+        cache = caches["failsafe"]
+        version = cache.get(NAMES_INDEX_VERSION_KEY)
+        if version is None:
+            cache.add(NAMES_INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+            # Still None when the cache is unavailable, keep using the current indexes then.
+            version = cache.get(NAMES_INDEX_VERSION_KEY) or self.version
+        with self.lock:
+            if version != self.version:
+                self.version = version
+                self.indexes = {}
+            if name not in self.indexes:
+                self.indexes[name] = build()
+            return self.indexes[name]
+
+
+_indexes = _Indexes()
+
+
+def get_cities_index():
+    return _indexes.get("cities", _build_cities_index)
+
+
+def get_communes_index():
+    return _indexes.get("communes", _build_communes_index)
+
+
+def invalidate_names_index(*args, **kwargs):
+    """
+    Make the indexes of every worker outdated, called by the commands synchronizing the cities and communes
+    once their changes are committed.
+    """
+    caches["failsafe"].set(NAMES_INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_names_index_on_commit(*args, **kwargs):
+    """
+    Cities and communes signals handler: invalidate the indexes once the change is committed, otherwise
+    a worker could rebuild them from the previous names and keep them until the next change.
+    """
+    transaction.on_commit(invalidate_names_index)
@@ -1,7 +1,7 @@
 from django.apps import AppConfig
 from django.conf import settings
 from django.db import OperationalError, ProgrammingError, transaction
-from django.db.models.signals import post_migrate
+from django.db.models.signals import m2m_changed, post_delete, post_migrate
 
 
 class CommunicationsConfig(AppConfig):
@@ -12,6 +12,17 @@ class CommunicationsConfig(AppConfig):
         self.module.autodiscover()
         post_migrate.connect(post_communications_migrate_handler, sender=self)
 
+        from itou.communications.cache import (
+            invalidate_disabled_notifications_cache,
+            invalidate_notification_settings_cache,
+        )
+
+        NotificationSettings = self.get_model("NotificationSettings")
+        m2m_changed.connect(
+            invalidate_disabled_notifications_cache, sender=NotificationSettings.disabled_notifications.through
+        )
+        post_delete.connect(invalidate_notification_settings_cache, sender=NotificationSettings)
+
 
 def post_communications_migrate_handler(sender, app_config, **kwargs):
     sync_notifications(app_config.get_model("NotificationRecord"))
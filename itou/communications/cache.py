@@ -0,0 +1,89 @@
+"""
+Short lived cache of the notifications disabled by each user, for each of their structures.
+
+Notifications are usually sent to all the members of an organization at once: the disabled notifications
+of all the recipients are resolved with a single query, and kept in cache for the next events.
+"""
+
+import functools
+import operator
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db.models import Q
+
+from itou.communications.models import NotificationSettings
+from itou.utils.cache import invalidate_now_and_on_commit
+
+
+DISABLED_NOTIFICATIONS_CACHE_TIMEOUT = 60 * 5
+
+
+def get_settings_key(user, structure=None):
+    if structure is None:
+        return (user.pk, None, None)
+    return (user.pk, ContentType.objects.get_for_model(structure).pk, structure.pk)
+
+
+def get_disabled_notifications_cache_key(settings_key):
+    user_pk, structure_type_pk, structure_pk = settings_key
+    return f"disabled_notifications:{user_pk}:{structure_type_pk}:{structure_pk}"
+
+
+def get_disabled_notifications(settings_keys):
+    """
+    Return the names of the notification classes disabled for each of the `settings_keys`, as returned by
+    `get_settings_key()`: {settings_key: {notification_class, ...}}
+    """
+    cache = caches["failsafe"]
+    cache_keys = {get_disabled_notifications_cache_key(settings_key): settings_key for settings_key in settings_keys}
+    cached = cache.get_many(list(cache_keys)) or {}
+    disabled_notifications = {cache_keys[cache_key]: set(value) for cache_key, value in cached.items()}
+
+    missing_keys = set(settings_keys) - disabled_notifications.keys()
+    if missing_keys:
+        for settings_key in missing_keys:
+            disabled_notifications[settings_key] = set()
+        filters = functools.reduce(
+            operator.or_,
+            [
+                Q(user_id=user_pk, structure_type_id=structure_type_pk, structure_pk=structure_pk)
+                for user_pk, structure_type_pk, structure_pk in missing_keys
+            ],
+        )
+        for *settings_key, notification_class in NotificationSettings.objects.filter(filters).values_list(
+            "user_id", "structure_type_id", "structure_pk", "disabled_notifications__notification_class"
+        ):
+            if notification_class is not None:
+                disabled_notifications[tuple(settings_key)].add(notification_class)
+        cache.set_many(
+            {
+                get_disabled_notifications_cache_key(settings_key): sorted(disabled_notifications[settings_key])
+                for settings_key in missing_keys
+            },
+            DISABLED_NOTIFICATIONS_CACHE_TIMEOUT,
+        )
+    return disabled_notifications
+
+
+def _invalidate_settings(notification_settings):
+    cache_keys = [
+        get_disabled_notifications_cache_key((settings.user_id, settings.structure_type_id, settings.structure_pk))
+        for settings in notification_settings
+    ]
+    invalidate_now_and_on_commit(lambda: caches["failsafe"].delete_many(cache_keys))
+
+
+def invalidate_disabled_notifications_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # `instance` is a NotificationRecord and `pk_set` holds NotificationSettings primary keys.
+        if action == "pre_clear":
+            _invalidate_settings(NotificationSettings.objects.filter(disabled_notifications=instance))
+        elif action in ("post_add", "post_remove"):
+            _invalidate_settings(NotificationSettings.objects.filter(pk__in=pk_set))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        _invalidate_settings([instance])
+
+
+def invalidate_notification_settings_cache(sender, instance, **kwargs):
+    _invalidate_settings([instance])
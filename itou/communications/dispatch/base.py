@@ -1,3 +1,6 @@
+from itou.communications.cache import get_disabled_notifications, get_settings_key
+
+
 class BaseNotification:
     REQUIRED = ["can_be_disabled", "name", "category"]
 
@@ -7,6 +10,7 @@ class BaseNotification:
         self.user = user
         self.structure = structure
         self.context = kwargs
+        self._disabled_notifications = None
 
     def __repr__(self):
         return f"<{self.__class__.__name__} {self.user.email}: {self.name}>"
@@ -21,11 +25,9 @@ class BaseNotification:
         if not self.is_applicable():
             return False
         if self.is_manageable_by_user():
-            return not (
-                self.user.notification_settings.for_structure(self.structure)
-                .filter(disabled_notifications__notification_class=self.__class__.__name__)
-                .exists()
-            )
+            if self._disabled_notifications is None:
+                prefetch_disabled_notifications([self])
+            return self.__class__.__name__ not in self._disabled_notifications
         return True
 
     def get_context(self):
@@ -33,3 +35,19 @@ class BaseNotification:
 
     def validate_context(self):
         return self.context
+
+
+def prefetch_disabled_notifications(notifications):
+    """
+    Resolve the notifications disabled by the recipients of `notifications` at once,
+    instead of a query per recipient in `should_send()`.
+    """
+    notifications = [notification for notification in notifications if notification.is_manageable_by_user()]
+    if not notifications:
+        return
+    settings_keys = {
+        notification: get_settings_key(notification.user, notification.structure) for notification in notifications
+    }
+    disabled_notifications = get_disabled_notifications(set(settings_keys.values()))
+    for notification, settings_key in settings_keys.items():
+        notification._disabled_notifications = disabled_notifications[settings_key]
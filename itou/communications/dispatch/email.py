@@ -1,6 +1,6 @@
-from itou.utils.emails import get_email_message
+from itou.utils.emails import get_email_message, send_email_messages
 
-from .base import BaseNotification
+from .base import BaseNotification, prefetch_disabled_notifications
 
 
 class EmailNotification(BaseNotification):
@@ -17,3 +17,14 @@ class EmailNotification(BaseNotification):
     def send(self):
         if self.should_send():
             return self.build().send()
+
+
+def send_email_notifications(notifications):
+    """
+    Send `notifications`, e.g. to all the members of an organization, with a single query for the
+    notifications they disabled and a single call to the email backend.
+    """
+    prefetch_disabled_notifications(notifications)
+    email_messages = [notification.build() for notification in notifications if notification.should_send()]
+    if email_messages:
+        send_email_messages(email_messages)
@@ -3,12 +3,14 @@ Various helpers shared by the import_siae, import_geiq and import_ea_eatt script
 
 """
 
+import contextlib
 import csv
 import os
 import shutil
 import tempfile
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from django.conf import settings
 from django.utils import timezone
@@ -295,18 +297,10 @@ def anonymize_fluxiae_df(df):
     return df
 
 
-def get_fluxiae_df(
-    vue_name,
-    converters=None,
-    description=None,
-    parse_dates=None,
-    skip_first_row=True,
-    anonymize_sensitive_data=True,
-    infer_datetime_format=True,
-):
+@contextlib.contextmanager
+def extract_fluxiae_file(vue_name, description=None):
     """
-    Load fluxIAE CSV file as a dataframe.
-    Any sensitive data will be dropped and/or anonymized.
+    Extract the fluxIAE CSV file in a temporary directory and yield its path.
     """
     filename = get_filename(
         filename_prefix=vue_name,
@@ -314,24 +308,6 @@ def get_fluxiae_df(
         description=description,
     )
 
-    # Prepare parameters for pandas.read_csv method.
-    kwargs = {}
-
-    if skip_first_row:
-        # Some fluxIAE exports have a leading "DEB***" row, some don't.
-        kwargs["skiprows"] = 1
-
-    # All fluxIAE exports have a final "FIN***" row which should be ignored. The most obvious way to do this is
-    # to use `skipfooter=1` option in `pd.read_csv` however this causes several issues:
-    # - it forces the use of the 'python' engine instead of the default 'c' engine
-    # - the 'python' engine is much slower than the 'c' engine
-    # - the 'python' engine does not play well when faced with special characters (e.g. `"`) inside a row value,
-    #   it will break or require the `error_bad_lines=False` option to ignore all those rows
-
-    # Thus we decide to always use the 'c' engine and implement the `skipfooter=1` option ourselves by counting
-    # the rows in the CSV file beforehands instead. Always using the 'c' engine is proven to significantly reduce
-    # the duration and frequency of the developer's headaches.
-
     with tempfile.TemporaryDirectory() as d:
         expected_exceptions = (
             shutil.ReadError,
@@ -352,8 +328,65 @@ def get_fluxiae_df(
                 raise ValueError(f"Unable to extract “{filename}”.")
 
         [extracted] = Path(d).iterdir()
+        yield extracted
+
+
+def get_fluxiae_read_csv_kwargs(extracted, skip_first_row):
+    """
+    Prepare parameters for pandas.read_csv method.
+    """
+    kwargs = {}
+
+    if skip_first_row:
+        # Some fluxIAE exports have a leading "DEB***" row, some don't.
+        kwargs["skiprows"] = 1
+
+    # All fluxIAE exports have a final "FIN***" row which should be ignored. The most obvious way to do this is
+    # to use `skipfooter=1` option in `pd.read_csv` however this causes several issues:
+    # - it forces the use of the 'python' engine instead of the default 'c' engine
+    # - the 'python' engine is much slower than the 'c' engine
+    # - the 'python' engine does not play well when faced with special characters (e.g. `"`) inside a row value,
+    #   it will break or require the `error_bad_lines=False` option to ignore all those rows
+
+    # Thus we decide to always use the 'c' engine and implement the `skipfooter=1` option ourselves by counting
+    # the rows in the CSV file beforehands instead. Always using the 'c' engine is proven to significantly reduce
+    # the duration and frequency of the developer's headaches.
+    with open(extracted) as f:
         # Ignore 3 rows: the `DEB*` first row, the headers row, and the `FIN*` last row.
-        nrows = len(extracted.read_text().splitlines()) - 3
+        kwargs["nrows"] = sum(len(line.splitlines()) for line in f) - 3
+
+    return kwargs
+
+
+def read_fluxiae_csv(extracted, **kwargs):
+    return pd.read_csv(
+        extracted,
+        sep="|",
+        # Some rows have a single `"` in a field, for example in fluxIAE_Mission the mission_descriptif field of
+        # the mission id 1003399237 is `"AIEHPAD` (no closing double quote). This screws CSV parsing big time
+        # as the parser will read many rows until the next `"` and consider all of them as part of the
+        # initial mission_descriptif field value o_O. Let's just disable quoting alltogether to avoid that.
+        quoting=csv.QUOTE_NONE,
+        **kwargs,
+    )
+
+
+def get_fluxiae_df(
+    vue_name,
+    converters=None,
+    description=None,
+    parse_dates=None,
+    skip_first_row=True,
+    anonymize_sensitive_data=True,
+    infer_datetime_format=True,
+):
+    """
+    Load fluxIAE CSV file as a dataframe.
+    Any sensitive data will be dropped and/or anonymized.
+    """
+    with extract_fluxiae_file(vue_name, description=description) as extracted:
+        kwargs = get_fluxiae_read_csv_kwargs(extracted, skip_first_row=skip_first_row)
+        nrows = kwargs["nrows"]
 
         print(f"Loading {nrows} rows for {vue_name} ...")
 
@@ -372,15 +405,8 @@ def get_fluxiae_df(
         # in ASP files
         kwargs["dayfirst"] = True
 
-        df = pd.read_csv(
+        df = read_fluxiae_csv(
             extracted,
-            sep="|",
-            # Some rows have a single `"` in a field, for example in fluxIAE_Mission the mission_descriptif field of
-            # the mission id 1003399237 is `"AIEHPAD` (no closing double quote). This screws CSV parsing big time
-            # as the parser will read many rows until the next `"` and consider all of them as part of the
-            # initial mission_descriptif field value o_O. Let's just disable quoting alltogether to avoid that.
-            quoting=csv.QUOTE_NONE,
-            nrows=nrows,
             **kwargs,
             # Fix DtypeWarning (Columns have mixed types) and avoid error when field value in later rows contradicts
             # the field data format guessed on first rows.
@@ -397,3 +423,80 @@ def get_fluxiae_df(
             df = anonymize_fluxiae_df(df)
 
         return df
+
+
+def widen_dtype(dtype, other_dtype):
+    """
+    Smallest dtype able to hold the values of both dtypes, as pandas would infer it on the whole column.
+    """
+    if dtype is None or dtype == other_dtype:
+        return other_dtype
+    if {dtype.kind, other_dtype.kind} <= {"i", "f"}:
+        return np.dtype("float64")
+    return np.dtype("object")
+
+
+@contextlib.contextmanager
+def get_fluxiae_df_chunks(vue_name, chunk_size, description=None, skip_first_row=True, anonymize_sensitive_data=True):
+    """
+    Streaming counterpart of `get_fluxiae_df` for files too large to be loaded in memory at once.
+
+    Yield the first non null value of each (anonymized) column, as `get_fluxiae_df` would give them,
+    and an iterator over dataframes of at most `chunk_size` rows.
+
+    The file is read twice: a column can look like integers in the first rows and contain empty values
+    or text in later ones, so a first pass infers the dtype of each column on the whole file and the
+    second one reads the chunks with these dtypes.
+    """
+    with extract_fluxiae_file(vue_name, description=description) as extracted:
+        kwargs = get_fluxiae_read_csv_kwargs(extracted, skip_first_row=skip_first_row)
+        print(f"Streaming {kwargs['nrows']} rows for {vue_name} by chunks of {chunk_size} ...")
+
+        raw_dtypes, first_values = {}, {}
+        numeric_columns_with_values = set()
+        for df in read_fluxiae_csv(extracted, chunksize=chunk_size, **kwargs):
+            # If there is only one column, something went wrong, let's break early.
+            # Most likely an incorrect skip_first_row value.
+            assert len(df.columns.tolist()) >= 2
+            for column_name, dtype in df.dtypes.items():
+                raw_dtypes[column_name] = widen_dtype(raw_dtypes.get(column_name), dtype)
+                if dtype.kind in "if" and df[column_name].notna().any():
+                    numeric_columns_with_values.add(column_name)
+                if first_values.get(column_name) is None:
+                    first_values[column_name] = df[column_name].get(df[column_name].first_valid_index())
+
+        dtypes = raw_dtypes
+        if anonymize_sensitive_data:
+            # The whole file is only anonymized when yielding the chunks: the columns kept and produced
+            # by the anonymization are given by a single row made of the first values.
+            sample = anonymize_fluxiae_df(pd.DataFrame([first_values]))
+            dtypes = {column_name: raw_dtypes.get(column_name, dtype) for column_name, dtype in sample.dtypes.items()}
+            first_values = {
+                column_name: first_values.get(column_name, sample[column_name].iloc[0])
+                for column_name in sample.columns
+            }
+
+        # Numbers are read as strings when the whole column is not numeric, other columns
+        # of the `object` dtype (e.g. booleans with empty values) are left to pandas.
+        forced_raw_dtypes = {}
+        for column_name, dtype in raw_dtypes.items():
+            if dtype.kind in "if":
+                forced_raw_dtypes[column_name] = dtype
+            elif column_name in numeric_columns_with_values:
+                forced_raw_dtypes[column_name] = str
+
+        for column_name, value in first_values.items():
+            if value is None:
+                continue
+            if dtypes[column_name].kind in "if":
+                first_values[column_name] = dtypes[column_name].type(value)
+            elif forced_raw_dtypes.get(column_name) is str:
+                first_values[column_name] = str(value)
+
+        def df_chunks():
+            for df in read_fluxiae_csv(extracted, chunksize=chunk_size, dtype=forced_raw_dtypes, **kwargs):
+                if anonymize_sensitive_data:
+                    df = anonymize_fluxiae_df(df)
+                yield df
+
+        yield first_values, df_chunks()
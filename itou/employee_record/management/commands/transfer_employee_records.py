@@ -1,10 +1,12 @@
 import paramiko
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from rest_framework.renderers import JSONRenderer
 from sentry_sdk.crons import monitor
 
-from itou.approvals.models import Approval
+from itou.approvals.models import Approval, Prolongation, Suspension
 from itou.employee_record.enums import MovementType, Status
 from itou.employee_record.exceptions import SerializationError
 from itou.employee_record.mocks.fake_serializers import TestEmployeeRecordBatchSerializer
@@ -15,6 +17,17 @@ from itou.utils.iterators import chunks
 from ...common_management import EmployeeRecordTransferCommand
 
 
+SENT_FIELDS = ["status", "asp_batch_file", "asp_batch_line_number", "archived_json"]
+PROCESSING_FIELDS = [
+    "status",
+    "processed_at",
+    "processed_as_duplicate",
+    "asp_processing_code",
+    "asp_processing_label",
+    "archived_json",
+]
+
+
 class Command(EmployeeRecordTransferCommand):
     def _upload_batch_file(self, sftp: paramiko.SFTPClient, employee_records: list[EmployeeRecord], dry_run: bool):
         """
@@ -53,10 +66,22 @@ class Command(EmployeeRecordTransferCommand):
             # Now that file is transferred, update employee records status (SENT)
             # and store in which file they have been sent
             renderer = JSONRenderer()
-            for idx, employee_record in enumerate(employee_records, 1):
-                employee_record.update_as_sent(
-                    remote_path, idx, renderer.render(batch_data["lignesTelechargement"][idx - 1])
-                )
+            sent_employee_records = []
+            try:
+                for idx, employee_record in enumerate(employee_records, 1):
+                    employee_record.update_as_sent(
+                        remote_path, idx, renderer.render(batch_data["lignesTelechargement"][idx - 1]), commit=False
+                    )
+                    sent_employee_records.append(employee_record)
+            finally:
+                # Like saving them one by one, keep the ones sent before an error.
+                self._bulk_update(sent_employee_records, SENT_FIELDS)
+
+    def _bulk_update(self, employee_records, fields):
+        now = timezone.now()
+        for employee_record in employee_records:
+            employee_record.updated_at = now
+        EmployeeRecord.objects.bulk_update(employee_records, fields=[*fields, "updated_at"], batch_size=1000)
 
     def _parse_feedback_file(self, feedback_file: str, batch: dict, dry_run: bool) -> int:
         """
@@ -88,6 +113,15 @@ class Command(EmployeeRecordTransferCommand):
             )
             return 1
 
+        # Load all the employee records of the batch at once, their status is updated in memory
+        # and saved at the end of the file.
+        employee_records = {
+            str(employee_record.asp_batch_line_number): employee_record
+            for employee_record in EmployeeRecord.objects.full_fetch().filter(asp_batch_file=batch_filename)
+        }
+        updated_employee_records = []
+        duplicate_employee_records = []
+
         for idx, raw_employee_record in enumerate(records, 1):
             line_number = raw_employee_record.get("numLigne")
             processing_code = raw_employee_record.get("codeTraitement")
@@ -101,24 +135,27 @@ class Command(EmployeeRecordTransferCommand):
                 continue
 
             # Now we must find the matching FS
-            employee_record = EmployeeRecord.objects.find_by_batch(batch_filename, line_number).first()
+            employee_record = employee_records.get(str(line_number))
 
             if not employee_record:
                 self.stdout.write(f"Could not get existing employee record data: {batch_filename=}, {line_number=}")
                 # Do not count as an error
                 continue
 
-            archived_json = JSONRenderer().render(raw_employee_record)
+            # Archive a JSON copy of employee record (with processing code and label)
+            archived_json = raw_employee_record
             # Employee record successfully processed by ASP :
             if processing_code == EmployeeRecord.ASP_PROCESSING_SUCCESS_CODE:
-                # Archive a JSON copy of employee record (with processing code and label)
                 employee_record.asp_processing_code = processing_code
                 employee_record.asp_processing_label = processing_label
 
                 if not dry_run:
                     try:
                         if employee_record.status != Status.PROCESSED:
-                            employee_record.update_as_processed(processing_code, processing_label, archived_json)
+                            employee_record.update_as_processed(
+                                processing_code, processing_label, archived_json, commit=False
+                            )
+                            updated_employee_records.append(employee_record)
                         else:
                             self.stdout.write(f"Already accepted: {employee_record=}")
                     except Exception as ex:
@@ -141,37 +178,57 @@ class Command(EmployeeRecordTransferCommand):
                     if processing_code == EmployeeRecord.ASP_DUPLICATE_ERROR_CODE:
                         employee_record.status = Status.REJECTED
                         employee_record.asp_processing_code = EmployeeRecord.ASP_DUPLICATE_ERROR_CODE
-                        employee_record.update_as_processed_as_duplicate(archived_json)
-
-                        # If the ASP mark the employee record as duplicate,
-                        # and there is a suspension or a prolongation for the associated approval,
-                        # then we create a notification to be sure the ASP has the correct end date.
-                        try:
-                            approval = Approval.objects.get(number=employee_record.approval_number)
-                        except Approval.DoesNotExist:
-                            pass  # No point to send a notification about an approval if it doesn't exist
-                        else:
-                            if approval.suspension_set.exists() or approval.prolongation_set.exists():
-                                # Mimic the SQL trigger function "create_employee_record_notification()"
-                                EmployeeRecordUpdateNotification.objects.update_or_create(
-                                    status=Status.NEW,
-                                    employee_record=employee_record,
-                                    defaults={"updated_at": timezone.now},
-                                )
-
+                        employee_record.update_as_processed_as_duplicate(archived_json, commit=False)
+                        updated_employee_records.append(employee_record)
+                        duplicate_employee_records.append(employee_record)
                         continue
 
                     # Fixes unexpected stop on multiple pass on the same file
                     if employee_record.status != Status.REJECTED:
                         # Standard error / rejection processing
-                        employee_record.update_as_rejected(processing_code, processing_label, archived_json)
+                        employee_record.update_as_rejected(
+                            processing_code, processing_label, archived_json, commit=False
+                        )
+                        updated_employee_records.append(employee_record)
                     else:
                         self.stdout.write(f"Already rejected: {employee_record=}")
                 else:
                     self.stdout.write(f"DRY-RUN: Rejected {employee_record=}, {processing_code=}, {processing_label=}")
 
+        with transaction.atomic():
+            self._bulk_update(updated_employee_records, PROCESSING_FIELDS)
+            self._notify_duplicates(duplicate_employee_records)
+
         return record_errors
 
+    def _notify_duplicates(self, employee_records):
+        """
+        If the ASP mark the employee record as duplicate,
+        and there is a suspension or a prolongation for the associated approval,
+        then we create a notification to be sure the ASP has the correct end date.
+        """
+        if not employee_records:
+            return
+        # No point to send a notification about an approval if it doesn't exist
+        extended_approval_numbers = set(
+            Approval.objects.filter(
+                number__in=[employee_record.approval_number for employee_record in employee_records]
+            )
+            .filter(
+                Exists(Suspension.objects.filter(approval=OuterRef("pk")))
+                | Exists(Prolongation.objects.filter(approval=OuterRef("pk")))
+            )
+            .values_list("number", flat=True)
+        )
+        for employee_record in employee_records:
+            if employee_record.approval_number in extended_approval_numbers:
+                # Mimic the SQL trigger function "create_employee_record_notification()"
+                EmployeeRecordUpdateNotification.objects.update_or_create(
+                    status=Status.NEW,
+                    employee_record=employee_record,
+                    defaults={"updated_at": timezone.now},
+                )
+
     @monitor(monitor_slug="transfer-employee-records-download")
     def download(self, sftp: paramiko.SFTPClient, dry_run: bool):
         """Fetch and process feedback ASP files for employee records"""
@@ -183,7 +240,7 @@ class Command(EmployeeRecordTransferCommand):
         Upload a file composed of all ready employee records
         """
         self.stdout.write("Starting UPLOAD of employee records")
-        ready_employee_records = EmployeeRecord.objects.filter(status=Status.READY)
+        ready_employee_records = EmployeeRecord.objects.full_fetch().filter(status=Status.READY)
         for batch in chunks(
             ready_employee_records, EmployeeRecordBatch.MAX_EMPLOYEE_RECORDS, max_chunk=self.MAX_UPLOADED_FILES
         ):
@@ -78,7 +78,7 @@ class ASPExchangeInformation(models.Model):
         ordering = ["-created_at"]
 
     def _set_archived_json(self, archive):
-        if archive is not None:
+        if isinstance(archive, str | bytes):
             with contextlib.suppress(json.JSONDecodeError):
                 archive = json.loads(archive)
         self.archived_json = archive
@@ -300,7 +300,7 @@ class EmployeeRecord(ASPExchangeInformation):
         self.status = Status.READY
         self.save()
 
-    def update_as_sent(self, asp_filename, line_number, archive):
+    def update_as_sent(self, asp_filename, line_number, archive, *, commit=True):
         """
         An employee record is sent to ASP via a JSON file,
         The file name is stored for further feedback processing (also done via a file)
@@ -314,9 +314,10 @@ class EmployeeRecord(ASPExchangeInformation):
         self.status = Status.SENT
         self.set_asp_batch_information(asp_filename, line_number, archive)
 
-        self.save()
+        if commit:
+            self.save()
 
-    def update_as_rejected(self, code, label, archive):
+    def update_as_rejected(self, code, label, archive, *, commit=True):
         """
         Update status after an ASP rejection of the employee record
 
@@ -329,9 +330,10 @@ class EmployeeRecord(ASPExchangeInformation):
         self.status = Status.REJECTED
         self.set_asp_processing_information(code, label, archive)
 
-        self.save()
+        if commit:
+            self.save()
 
-    def update_as_processed(self, code, label, archive):
+    def update_as_processed(self, code, label, archive, *, commit=True):
         if not self.status == Status.SENT:
             raise InvalidStatusError(self.ERROR_EMPLOYEE_RECORD_INVALID_STATE)
 
@@ -340,7 +342,8 @@ class EmployeeRecord(ASPExchangeInformation):
         self.processed_at = timezone.now()
         self.set_asp_processing_information(code, label, archive)
 
-        self.save()
+        if commit:
+            self.save()
 
     def update_as_disabled(self):
         if not self.can_be_disabled:
@@ -385,7 +388,7 @@ class EmployeeRecord(ASPExchangeInformation):
 
         self.save(update_fields=["status"])
 
-    def update_as_processed_as_duplicate(self, archive):
+    def update_as_processed_as_duplicate(self, archive, *, commit=True):
         """
         Force status to `PROCESSED` if the employee record has been marked
         as duplicate by ASP (error code 3436).
@@ -405,7 +408,8 @@ class EmployeeRecord(ASPExchangeInformation):
         self.processed_as_duplicate = True
         self.set_asp_processing_information(self.ASP_DUPLICATE_ERROR_CODE, "Statut forcé suite à doublon ASP", archive)
 
-        self.save()
+        if commit:
+            self.save()
 
     @property
     def can_be_disabled(self):
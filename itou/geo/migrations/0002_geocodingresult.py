@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("geo", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeocodingResult",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("query", models.TextField(unique=True, verbose_name="requête normalisée")),
+                ("result", models.JSONField(null=True, verbose_name="résultat")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="date de modification")),
+            ],
+            options={
+                "verbose_name": "résultat de géocodage",
+                "verbose_name_plural": "résultats de géocodage",
+            },
+        ),
+    ]
@@ -1,6 +1,9 @@
+import datetime
+
 import django.contrib.gis.geos as gis_geos
 from django.contrib.gis.db import models as gis_models
 from django.db import models
+from django.utils import timezone
 
 import itou.geo.enums as enums
 
@@ -102,3 +105,32 @@ class ZRR(models.Model):
 
     def __repr__(self) -> str:
         return f"<pk={self.pk}, insee_code={self.insee_code},  status={self.status}>"
+
+
+# BAN results are reused for that long, so that improvements of the BAN are eventually taken into account.
+GEOCODING_RESULT_TTL = datetime.timedelta(days=90)
+
+
+class GeocodingResultQuerySet(models.QuerySet):
+    def fresh(self):
+        return self.filter(updated_at__gte=timezone.now() - GEOCODING_RESULT_TTL)
+
+
+class GeocodingResult(models.Model):
+    """
+    Results of the BAN geocoding API, by normalized query: see `itou.utils.apis.geocoding`.
+    """
+
+    query = models.TextField(verbose_name="requête normalisée", unique=True)
+    # NULL when the BAN has no result for the query.
+    result = models.JSONField(verbose_name="résultat", null=True)
+    updated_at = models.DateTimeField(verbose_name="date de modification", auto_now=True)
+
+    objects = GeocodingResultQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "résultat de géocodage"
+        verbose_name_plural = "résultats de géocodage"
+
+    def __str__(self) -> str:
+        return self.query
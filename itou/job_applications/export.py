@@ -1,5 +1,11 @@
+from django.db.models import Prefetch
+
+from itou.companies.models import JobDescription
+from itou.eligibility.enums import AuthorKind
+from itou.eligibility.models import EligibilityDiagnosis
 from itou.job_applications.enums import SenderKind
 from itou.users.enums import Title
+from itou.users.models import prefetch_latest_approvals
 from itou.utils.export import to_streaming_response
 
 
@@ -32,6 +38,9 @@ JOB_APPLICATION_CSV_HEADERS = [
 
 DATE_FMT = "%d/%m/%Y"
 
+# Job applications are fetched and serialized by batches of this size.
+EXPORT_BATCH_SIZE = 1000
+
 
 def _format_date(dt):
     return dt.strftime(DATE_FMT) if dt else ""
@@ -58,15 +67,34 @@ def _get_selected_jobs(job_application):
     return selected_jobs
 
 
-def _get_eligibility_status(job_application):
+def _get_eligibility_status(job_application, job_seekers_with_valid_diagnosis):
     eligibility = "non"
     # Eligibility diagnoses made by SIAE are ignored.
-    if job_application.job_seeker.has_valid_diagnosis():
+    # Same as `job_seeker.has_valid_diagnosis()`, with the diagnoses fetched for the whole batch.
+    job_seeker = job_application.job_seeker
+    if job_seeker.has_valid_common_approval or job_seeker.pk in job_seekers_with_valid_diagnosis:
         eligibility = "oui"
 
     return eligibility
 
 
+def _prefetch_job_seekers_data(job_applications):
+    """
+    Fetch the approvals, PE approvals and eligibility diagnoses of the job seekers of a batch of job
+    applications with a fixed number of queries, instead of several queries per job application.
+
+    Returns the primary keys of the job seekers with a valid eligibility diagnosis made by a prescriber.
+    """
+    job_seekers = [job_application.job_seeker for job_application in job_applications]
+    prefetch_latest_approvals(job_seekers)
+
+    return set(
+        EligibilityDiagnosis.objects.filter(job_seeker__in=job_seekers, author_kind=AuthorKind.PRESCRIBER)
+        .valid()
+        .values_list("job_seeker", flat=True)
+    )
+
+
 def _get_readable_sender_kind(job_application):
     """
     Converts itou internal prescriber kinds into something readable
@@ -92,7 +120,7 @@ def _resolve_title(title, nir):
     return ""
 
 
-def _serialize_job_application(job_application):
+def _serialize_job_application(job_application, job_seekers_with_valid_diagnosis):
     job_seeker = job_application.job_seeker
     company = job_application.to_company
 
@@ -126,7 +154,7 @@ def _serialize_job_application(job_application):
         _format_date(job_application.hiring_start_at),
         _format_date(job_application.hiring_end_at),
         job_application.get_refusal_reason_display(),
-        _get_eligibility_status(job_application),
+        _get_eligibility_status(job_application, job_seekers_with_valid_diagnosis),
         numero_pass_iae,
         _format_date(approval_start_date),
         _format_date(approval_end_date),
@@ -134,18 +162,34 @@ def _serialize_job_application(job_application):
     ]
 
 
-def _job_applications_serializer(queryset):
-    return [_serialize_job_application(job_application) for job_application in queryset]
+def _job_applications_serializer(job_applications):
+    job_seekers_with_valid_diagnosis = _prefetch_job_seekers_data(job_applications)
+    return [
+        _serialize_job_application(job_application, job_seekers_with_valid_diagnosis)
+        for job_application in job_applications
+    ]
 
 
 def stream_xlsx_export(job_applications, filename):
     """
-    Takes a list of job application, converts them to XLSX and writes them in the provided stream
+    Takes a queryset of job applications, converts them to XLSX and writes them in the provided stream
     The stream can be for instance an http response, a string (io.StringIO()) or a file
+
+    Job applications are read through a server-side cursor and serialized by batches, each batch
+    running the same few queries for its related data: memory and queries per row stay constant.
     """
+    job_applications = job_applications.select_related(
+        "job_seeker__jobseeker_profile",
+        "sender",
+        "sender_prescriber_organization",
+        "to_company",
+    ).prefetch_related(
+        Prefetch("selected_jobs", queryset=JobDescription.objects.select_related("appellation")),
+    )
     return to_streaming_response(
-        job_applications,
+        job_applications.iterator(chunk_size=EXPORT_BATCH_SIZE),
         filename,
         JOB_APPLICATION_CSV_HEADERS,
         _job_applications_serializer,
+        batch_size=EXPORT_BATCH_SIZE,
     )
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("job_applications", "0003_workaround_clever_dangerous_domain_ms"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobapplication",
+            name="accepted_at",
+            field=models.DateTimeField(editable=False, null=True, verbose_name="date d'acceptation"),
+        ),
+        migrations.AddField(
+            model_name="jobapplication",
+            name="last_change_at",
+            field=models.DateTimeField(editable=False, null=True, verbose_name="date du dernier changement d'état"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("job_applications", "0004_jobapplication_last_change_at_accepted_at"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="jobapplication",
+            index=models.Index(fields=["to_company", "-created_at", "id"], name="job_app_company_list_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="jobapplication",
+            index=models.Index(fields=["to_company", "state", "-created_at", "id"], name="job_app_company_state_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="jobapplication",
+            index=models.Index(
+                fields=["sender_prescriber_organization", "-created_at", "id"], name="job_app_prescriber_list_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="jobapplication",
+            index=models.Index(fields=["sender", "-created_at", "id"], name="job_app_sender_list_idx"),
+        ),
+    ]
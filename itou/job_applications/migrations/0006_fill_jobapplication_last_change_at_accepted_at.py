@@ -0,0 +1,62 @@
+import time
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.models import Case, F, Max, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce, Greatest
+
+
+def _fill_last_change_at_accepted_at(apps, schema_editor):
+    JobApplication = apps.get_model("job_applications", "JobApplication")
+    JobApplicationTransitionLog = apps.get_model("job_applications", "JobApplicationTransitionLog")
+
+    last_transition_at = Subquery(
+        JobApplicationTransitionLog.objects.filter(job_application=OuterRef("pk"))
+        .values("job_application")
+        .annotate(timestamp=Max("timestamp"))
+        .values("timestamp")
+    )
+    last_accept_at = Subquery(
+        JobApplicationTransitionLog.objects.filter(job_application=OuterRef("pk"), transition="accept")
+        .order_by("-timestamp")
+        .values("timestamp")[:1]
+    )
+    # Same values as the former JobApplicationQuerySet.with_accepted_at() annotation.
+    accepted_at = Case(
+        When(origin="ai_stock", then=F("hiring_start_at")),
+        When(origin="pe_approval", then=F("created_at")),
+        # A job application created at the accepted status will not have transitions logs
+        When(state="accepted", then=Coalesce(last_accept_at, F("created_at"))),
+        default=last_accept_at,
+        output_field=models.DateTimeField(),
+    )
+
+    job_applications_nb = 0
+    start = time.perf_counter()
+    while pks := list(JobApplication.objects.filter(last_change_at=None).values_list("pk", flat=True)[:10_000]):
+        job_applications_nb += JobApplication.objects.filter(pk__in=pks).update(
+            # Greatest() ignores NULL values in PostgreSQL.
+            last_change_at=Greatest("created_at", last_transition_at),
+            accepted_at=accepted_at,
+        )
+        print(f"{job_applications_nb} job applications migrated in {time.perf_counter() - start:.2f} sec")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("job_applications", "0005_jobapplication_list_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(_fill_last_change_at_accepted_at, migrations.RunPython.noop, elidable=True),
+        AddIndexConcurrently(
+            model_name="jobapplication",
+            index=models.Index(fields=["last_change_at"], name="job_app_last_change_at_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="jobapplication",
+            index=models.Index(fields=["accepted_at"], name="job_app_accepted_at_idx"),
+        ),
+    ]
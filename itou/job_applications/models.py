@@ -5,14 +5,15 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import Case, Count, Exists, F, Max, OuterRef, Prefetch, Q, Subquery, When
-from django.db.models.functions import Coalesce, Greatest, TruncMonth
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce, TruncMonth
 from django.urls import reverse
 from django.utils import timezone
 from django_xworkflows import models as xwf_models
 
 from itou.approvals.models import Approval, Prolongation, Suspension
 from itou.approvals.notifications import PassAcceptedEmployerNotification
+from itou.communications.dispatch.email import send_email_notifications
 from itou.companies.enums import SIAE_WITH_CONVENTION_KINDS, CompanyKind, ContractType
 from itou.companies.models import Company
 from itou.eligibility.enums import AuthorKind
@@ -118,6 +119,13 @@ class JobApplicationWorkflow(xwf_models.Workflow):
 
     log_model = "job_applications.JobApplicationTransitionLog"
 
+    def log_transition(self, transition, from_state, instance, *args, **kwargs):
+        # Keep the denormalized dates up to date, they are saved along with the new state.
+        instance.last_change_at = timezone.now()
+        if transition.name == self.TRANSITION_ACCEPT and instance.origin not in (Origin.AI_STOCK, Origin.PE_APPROVAL):
+            instance.accepted_at = instance.last_change_at
+        super().log_transition(transition, from_state, instance, *args, **kwargs)
+
 
 class JobApplicationQuerySet(models.QuerySet):
     def is_active_company_member(self, user):
@@ -184,38 +192,6 @@ class JobApplicationQuerySet(models.QuerySet):
         has_suspended_approval = Suspension.objects.filter(approval=OuterRef("approval")).in_progress()
         return self.annotate(has_suspended_approval=Exists(has_suspended_approval))
 
-    # We should store this in dedicated field and update it at each model.save()
-    def with_last_change(self):
-        return self.annotate(last_change=Greatest("created_at", Max("logs__timestamp")))
-
-    def with_accepted_at(self):
-        created_at_from_transition = Subquery(
-            JobApplicationTransitionLog.objects.filter(
-                job_application=OuterRef("pk"),
-                transition=JobApplicationWorkflow.TRANSITION_ACCEPT,
-            )
-            .order_by("-timestamp")
-            .values("timestamp")[0:1],
-        )
-        return self.annotate(
-            accepted_at=Case(
-                # Mega Super duper special case to handle job applications created to generate AI's PASS IAE
-                When(
-                    origin=Origin.AI_STOCK,
-                    then=F("hiring_start_at"),
-                ),
-                When(origin=Origin.PE_APPROVAL, then=F("created_at")),
-                When(
-                    state=JobApplicationState.ACCEPTED,
-                    # A job_application created at the accepted status will
-                    # not have transitions logs, fallback on created_at
-                    then=Coalesce(created_at_from_transition, F("created_at")),
-                ),
-                default=created_at_from_transition,
-                output_field=models.DateTimeField(),
-            )
-        )
-
     def with_jobseeker_eligibility_diagnosis(self):
         """
         Gives the "eligibility_diagnosis" linked to the job application or if none is found
@@ -276,7 +252,7 @@ class JobApplicationQuerySet(models.QuerySet):
             Prefetch("job_seeker__approvals", queryset=Approval.objects.order_by("-start_at")),
         )
 
-        qs = qs.with_last_change().with_jobseeker_eligibility_diagnosis()
+        qs = qs.with_jobseeker_eligibility_diagnosis()
 
         # Adding an annotation by selected criterion
         for criterion in criteria:
@@ -632,6 +608,9 @@ class JobApplication(xwf_models.WorkflowEnabled, models.Model):
 
     created_at = models.DateTimeField(verbose_name="date de création", default=timezone.now, db_index=True)
     updated_at = models.DateTimeField(verbose_name="date de modification", auto_now=True, db_index=True)
+    # Denormalized from the transition logs, see JobApplicationWorkflow.log_transition().
+    last_change_at = models.DateTimeField(verbose_name="date du dernier changement d'état", null=True, editable=False)
+    accepted_at = models.DateTimeField(verbose_name="date d'acceptation", null=True, editable=False)
 
     # GEIQ only
     prehiring_guidance_days = models.PositiveSmallIntegerField(
@@ -693,6 +672,17 @@ class JobApplication(xwf_models.WorkflowEnabled, models.Model):
     class Meta:
         verbose_name = "candidature"
         ordering = ["-created_at"]
+        # Match the filters and the ordering of the lists, see with_list_related_data().
+        indexes = [
+            models.Index(fields=["to_company", "-created_at", "id"], name="job_app_company_list_idx"),
+            models.Index(fields=["to_company", "state", "-created_at", "id"], name="job_app_company_state_idx"),
+            models.Index(
+                fields=["sender_prescriber_organization", "-created_at", "id"], name="job_app_prescriber_list_idx"
+            ),
+            models.Index(fields=["sender", "-created_at", "id"], name="job_app_sender_list_idx"),
+            models.Index(fields=["last_change_at"], name="job_app_last_change_at_idx"),
+            models.Index(fields=["accepted_at"], name="job_app_accepted_at_idx"),
+        ]
         constraints = [
             models.CheckConstraint(
                 name="geiq_fields_coherence",
@@ -753,9 +743,25 @@ class JobApplication(xwf_models.WorkflowEnabled, models.Model):
                 raise ValidationError("Un contrat associé à une VAE inversée n'est possible que pour les GEIQ")
 
     def save(self, *args, **kwargs):
+        if self._state.adding:
+            if self.last_change_at is None:
+                self.last_change_at = self.created_at
+            if self.accepted_at is None:
+                self.accepted_at = self.get_initial_accepted_at()
         self.full_clean()
         return super().save(*args, **kwargs)
 
+    def get_initial_accepted_at(self):
+        # Mega Super duper special case to handle job applications created to generate AI's PASS IAE
+        if self.origin == Origin.AI_STOCK:
+            if self.hiring_start_at is None:
+                return None
+            return datetime.datetime.combine(self.hiring_start_at, datetime.time(), tzinfo=datetime.UTC)
+        # A job application created at the accepted status will not have transitions logs
+        if self.origin == Origin.PE_APPROVAL or self.state == JobApplicationState.ACCEPTED:
+            return self.created_at
+        return None
+
     @property
     def is_pending(self):
         return self.state in JobApplicationWorkflow.PENDING_STATES
@@ -933,8 +939,12 @@ class JobApplication(xwf_models.WorkflowEnabled, models.Model):
         }
 
         # Always send notifications to original SIAE members
-        for previous_employer in self.transferred_from.active_members.all():
-            self.notifications_transfer_for_previous_employer(previous_employer, notification_context).send()
+        send_email_notifications(
+            [
+                self.notifications_transfer_for_previous_employer(previous_employer, notification_context)
+                for previous_employer in self.transferred_from.active_members.all()
+            ]
+        )
 
         # Always send notification to job seeker
         self.notifications_transfer_for_job_seeker(notification_context).send()
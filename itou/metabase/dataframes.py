@@ -3,12 +3,20 @@ Helper methods for manipulating dataframes used by both populate_metabase_emploi
 populate_metabase_fluxiae scripts.
 """
 
+import contextlib
+
 import numpy as np
 import pandas as pd
 from psycopg import sql
 from tqdm import tqdm
 
-from itou.metabase.db import MetabaseDatabaseCursor, create_table, get_new_table_name, rename_table_atomically
+from itou.metabase.db import (
+    MetabaseDatabaseCursor,
+    create_table,
+    get_new_table_name,
+    get_table_rows_count,
+    rename_table_atomically,
+)
 
 
 PANDA_DATAFRAME_TO_PSQL_TYPES_MAPPING = {
@@ -19,11 +27,9 @@ PANDA_DATAFRAME_TO_PSQL_TYPES_MAPPING = {
 }
 
 
-def infer_columns_from_df(df):
-    # Generate a dataframe with the same headers a the first non null value for each column
-    df_columns = [df[column_name] for column_name in df.columns]
-    non_null_values = [df_column.get(df_column.first_valid_index()) for df_column in df_columns]
-    initial_line = pd.DataFrame([non_null_values], columns=df.columns)
+def infer_columns_from_first_values(first_values):
+    # Generate a dataframe with the first non null value for each column as its only line
+    initial_line = pd.DataFrame([list(first_values.values())], columns=list(first_values))
 
     # Generate table sql definition from np types
     return [
@@ -32,55 +38,107 @@ def infer_columns_from_df(df):
     ]
 
 
-def store_df(df, table_name, max_attempts=5):
+def infer_columns_from_df(df):
+    return infer_columns_from_first_values(
+        {column_name: df[column_name].get(df[column_name].first_valid_index()) for column_name in df.columns}
+    )
+
+
+def get_df_rows(df):
+    # Python objects with None instead of NaN, as psycopg can neither adapt numpy scalars nor NaN to NULL.
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def copy_df(cursor, table_name, columns, df):
+    with cursor.copy(
+        sql.SQL("COPY {table_name} ({fields}) FROM STDIN WITH (FORMAT BINARY)").format(
+            table_name=sql.Identifier(table_name),
+            fields=sql.SQL(",").join(
+                [sql.Identifier(col[0]) for col in columns],
+            ),
+        )
+    ) as copy:
+        copy.set_types([col[1] for col in columns])
+        for row in get_df_rows(df):
+            copy.write_row(row)
+
+
+def _store_chunks(new_table_name, columns, df_chunks, max_attempts):
+    """
+    Store `df_chunks` in `new_table_name`, committing them one by one on the same connection.
+
+    When storing a chunk fails, try up to `max_attempts` times with a new connection.
+
+    Return the number of stored rows.
+    """
+    stored_rows = 0
+    with contextlib.ExitStack() as connection_stack:
+        conn = None
+        for df_chunk in df_chunks:
+            attempts = 0
+            while True:
+                try:
+                    if conn is None:
+                        cursor, conn = connection_stack.enter_context(MetabaseDatabaseCursor())
+                        # The table only ever holds whole chunks: the rows it holds tell whether this chunk was
+                        # committed, even when the connection broke after a COMMIT was sent but before it was
+                        # acknowledged.
+                        if get_table_rows_count(cursor, new_table_name) > stored_rows:
+                            break
+                    copy_df(cursor, new_table_name, columns, df_chunk)
+                    conn.commit()
+                    break
+                except Exception as e:
+                    # Catching all exceptions is generally a code smell but we eventually reraise it so it's ok.
+                    connection_stack.close()
+                    conn = None
+                    attempts += 1
+                    print(f"Attempt #{attempts} failed with exception {repr(e)}.")
+                    if attempts == max_attempts:
+                        print("No more attemps left, giving up and raising the exception.")
+                        raise
+                    print("New attempt started...")
+            stored_rows += len(df_chunk)
+    return stored_rows
+
+
+def store_df(df, table_name, max_attempts=5, rows_per_chunk=10 * 1000):
     """
     Store dataframe in database.
 
     Do this chunk by chunk to solve
     psycopg.OperationalError "server closed the connection unexpectedly" error.
 
-    Try up to `max_attempts` times.
+    Chunks are committed one by one on the same connection. When it fails, try up to `max_attempts` times
+    with a new connection, resuming after the last committed chunk instead of starting over.
     """
-    # Recipe from https://stackoverflow.com/questions/44729727/pandas-slice-large-dataframe-in-chunks
-    rows_per_chunk = 10 * 1000
-    df_chunks = [df[i : i + rows_per_chunk] for i in range(0, df.shape[0], rows_per_chunk)]
+    chunks_count = -(-len(df) // rows_per_chunk)
+    print(f"Storing {table_name} in {chunks_count} chunks of (max) {rows_per_chunk} rows each ...")
+
+    new_table_name = get_new_table_name(table_name)
+    columns = infer_columns_from_df(df)
+    create_table(new_table_name, columns, reset=True)
+    df_chunks = (df[start : start + rows_per_chunk] for start in range(0, len(df), rows_per_chunk))
+    _store_chunks(new_table_name, columns, tqdm(df_chunks, total=chunks_count), max_attempts)
+
+    rename_table_atomically(new_table_name, table_name)
+    print(f"Stored {table_name} in database ({len(df)} rows).")
+    print("")
 
-    print(f"Storing {table_name} in {len(df_chunks)} chunks of (max) {rows_per_chunk} rows each ...")
 
-    attempts = 0
+def store_df_chunks(df_chunks, columns, table_name, max_attempts=5):
+    """
+    Streaming counterpart of `store_df`: store dataframes chunks of the same table as they come,
+    so that only one chunk at a time is held in memory.
+    """
+    print(f"Storing {table_name} chunk by chunk ...")
 
     new_table_name = get_new_table_name(table_name)
-    while attempts < max_attempts:
-        try:
-            columns = infer_columns_from_df(df)
-            create_table(new_table_name, columns, reset=True)
-            for df_chunk in tqdm(df_chunks):
-                rows = df_chunk.replace({np.nan: None}).to_dict(orient="split")["data"]
-                with MetabaseDatabaseCursor() as (cursor, conn):
-                    with cursor.copy(
-                        sql.SQL("COPY {table_name} FROM STDIN WITH (FORMAT BINARY)").format(
-                            table_name=sql.Identifier(new_table_name),
-                            Fields=sql.SQL(",").join(
-                                [sql.Identifier(col[0]) for col in columns],
-                            ),
-                        )
-                    ) as copy:
-                        copy.set_types([col[1] for col in columns])
-                        for row in rows:
-                            copy.write_row(row)
-                    conn.commit()
-            break
-        except Exception as e:
-            # Catching all exceptions is a generally a code smell but we eventually reraise it so it's ok.
-            attempts += 1
-            print(f"Attempt #{attempts} failed with exception {repr(e)}.")
-            if attempts == max_attempts:
-                print("No more attemps left, giving up and raising the exception.")
-                raise
-            print("New attempt started...")
+    create_table(new_table_name, columns, reset=True)
+    stored_rows = _store_chunks(new_table_name, columns, tqdm(df_chunks), max_attempts)
 
     rename_table_atomically(new_table_name, table_name)
-    print(f"Stored {table_name} in database ({len(df)} rows).")
+    print(f"Stored {table_name} in database ({stored_rows} rows).")
     print("")
 
 
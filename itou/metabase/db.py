@@ -4,18 +4,26 @@ Helper methods for manipulating tables used by both populate_metabase_emplois an
 
 import copy
 import gc
+import hashlib
 import os
 import urllib
 
 import httpx
 import psycopg
 from django.conf import settings
+from django.db.models import DateField, IntegerField, Value
+from django.db.models.functions import Cast
 from django.utils import timezone
 from psycopg import sql
 
 from itou.metabase.utils import chunked_queryset, compose, convert_boolean_to_int
 
 
+# Name of the table holding the last successful run of `update_table` for each table.
+WATERMARKS_TABLE_NAME = "z_watermarks"
+DEFAULT_FULL_REBUILD_EVERY = timezone.timedelta(days=7)
+
+
 class MetabaseDatabaseCursor:
     def __init__(self):
         self.cursor = None
@@ -55,6 +63,14 @@ def get_old_table_name(table_name):
     return f"z_old_{table_name}"
 
 
+def get_delta_table_name(table_name):
+    return f"z_delta_{table_name}"
+
+
+def get_ids_table_name(table_name):
+    return f"z_ids_{table_name}"
+
+
 def rename_table_atomically(from_table_name, to_table_name):
     """
     Rename from_table_name to to_table_name.
@@ -106,6 +122,12 @@ def create_table(table_name: str, columns: list[str, str], reset=False):
         conn.commit()
 
 
+def get_table_rows_count(cursor, table_name):
+    cursor.execute(sql.SQL("SELECT COUNT(*) FROM {table_name}").format(table_name=sql.Identifier(table_name)))
+    [count] = cursor.fetchone()
+    return count
+
+
 def build_dbt_daily():
     # FIXME(vperron): this has to be moved to DBT seeds.
     create_unversioned_tables_if_needed()
@@ -249,23 +271,11 @@ def create_unversioned_tables_if_needed():
         print("Done.")
 
 
-def populate_table(table, batch_size, querysets=None, extra_object=None):
-    """
-    About commits: a single final commit freezes the itou-metabase-db temporarily, making
-    our GUI unable to connect to the db during this commit.
-
-    This is why we instead do small and frequent commits, so that the db stays available
-    throughout the script.
-
-    Note that psycopg will always automatically open a new transaction when none is open.
-    Thus it will open a new one after each such commit.
-    """
-
-    table_name = table.name
-
-    total_rows = sum([queryset.count() for queryset in querysets])
-
+def get_table_with_metadata_columns(table):
     table = copy.deepcopy(table)
+    # As metabase daily updates run typically every night after midnight, the last day with
+    # complete data is yesterday, not today.
+    update_date = (timezone.now() + timezone.timedelta(days=-1)).date()
     # because of tenacity, we can't just add the last column to the global variable
     table.add_columns(
         [
@@ -273,9 +283,8 @@ def populate_table(table, batch_size, querysets=None, extra_object=None):
                 "name": "date_mise_à_jour_metabase",
                 "type": "date",
                 "comment": "Date de dernière mise à jour de Metabase",
-                # As metabase daily updates run typically every night after midnight, the last day with
-                # complete data is yesterday, not today.
-                "fn": lambda o: timezone.now() + timezone.timedelta(days=-1),
+                "fn": lambda o: update_date,
+                "expression": Value(update_date, output_field=DateField()),
             },
         ]
     )
@@ -286,6 +295,73 @@ def populate_table(table, batch_size, querysets=None, extra_object=None):
         if c["type"] == "boolean":
             c["type"] = "integer"
             c["fn"] = compose(convert_boolean_to_int, c["fn"])
+            if "expression" in c:
+                c["expression"] = Cast(c["expression"], output_field=IntegerField())
+
+    return table
+
+
+def get_rows(table_columns, queryset, batch_size):
+    """
+    Yield the rows of the queryset by chunks of `batch_size`.
+
+    Columns having an `expression` are computed by the database in the source query. When all
+    of them do, rows come straight from `values_list()` without any per-row Python code,
+    otherwise the `fn` of the remaining columns is called on each object.
+    """
+    expressions = {f"metabase_column_{i}": c["expression"] for i, c in enumerate(table_columns) if "expression" in c}
+    if len(expressions) == len(table_columns):
+        # Prefetched objects would only be used by the `fn` of the columns.
+        queryset = queryset.prefetch_related(None).annotate(**expressions).values_list(*expressions)
+        yield from chunked_queryset(queryset, chunk_size=batch_size)
+        return
+
+    queryset = queryset.annotate(**expressions)
+    getters = [
+        get_annotation_getter(f"metabase_column_{i}") if "expression" in c else c["fn"]
+        for i, c in enumerate(table_columns)
+    ]
+    for chunk in chunked_queryset(queryset, chunk_size=batch_size):
+        yield [[getter(o) for getter in getters] for o in chunk]
+
+
+def get_annotation_getter(name):
+    # Querysets using `values()` give dicts instead of objects.
+    return lambda o: o[name] if isinstance(o, dict) else getattr(o, name)
+
+
+def inject_chunk(cur, conn, table_columns, rows, table_name):
+    with cur.copy(
+        sql.SQL("COPY {table_name} ({fields}) FROM STDIN WITH (FORMAT BINARY)").format(
+            table_name=sql.Identifier(table_name),
+            fields=sql.SQL(",").join(
+                [sql.Identifier(c["name"]) for c in table_columns],
+            ),
+        )
+    ) as copy:
+        copy.set_types([c["type"] for c in table_columns])
+        for row in rows:
+            copy.write_row(row)
+    conn.commit()
+
+
+def populate_table(table, batch_size, querysets=None, extra_object=None):
+    """
+    About commits: a single final commit freezes the itou-metabase-db temporarily, making
+    our GUI unable to connect to the db during this commit.
+
+    This is why we instead do small and frequent commits, so that the db stays available
+    throughout the script.
+
+    Note that psycopg will always automatically open a new transaction when none is open.
+    Thus it will open a new one after each such commit.
+    """
+
+    table_name = table.name
+
+    total_rows = sum([queryset.count() for queryset in querysets])
+
+    table = get_table_with_metadata_columns(table)
 
     print(f"Injecting {total_rows} rows with {len(table.columns)} columns into table {table_name}:")
 
@@ -293,25 +369,11 @@ def populate_table(table, batch_size, querysets=None, extra_object=None):
     create_table(new_table_name, [(c["name"], c["type"]) for c in table.columns], reset=True)
 
     with MetabaseDatabaseCursor() as (cur, conn):
-
-        def inject_chunk(table_columns, chunk, new_table_name):
-            rows = [[c["fn"](row) for c in table_columns] for row in chunk]
-            with cur.copy(
-                sql.SQL("COPY {new_table_name} ({fields}) FROM STDIN WITH (FORMAT BINARY)").format(
-                    new_table_name=sql.Identifier(new_table_name),
-                    fields=sql.SQL(",").join(
-                        [sql.Identifier(c["name"]) for c in table_columns],
-                    ),
-                )
-            ) as copy:
-                copy.set_types([c["type"] for c in table_columns])
-                for row in rows:
-                    copy.write_row(row)
-            conn.commit()
-
         # Add comments on table columns.
         for c in table.columns:
-            assert set(c.keys()) == {"name", "type", "comment", "fn"}
+            assert (
+                {"name", "type", "comment", "fn"} <= set(c.keys()) <= {"name", "type", "comment", "fn", "expression"}
+            )
             column_name = c["name"]
             column_comment = c["comment"]
             comment_query = sql.SQL("comment on column {new_table_name}.{column_name} is {column_comment}").format(
@@ -324,19 +386,171 @@ def populate_table(table, batch_size, querysets=None, extra_object=None):
         conn.commit()
 
         if extra_object:
-            inject_chunk(table_columns=table.columns, chunk=[extra_object], new_table_name=new_table_name)
+            inject_chunk(
+                cur,
+                conn,
+                table_columns=table.columns,
+                rows=[[c["fn"](extra_object) for c in table.columns]],
+                table_name=new_table_name,
+            )
 
         written_rows = 0
         for queryset in querysets:
             # Insert rows by batch of batch_size.
             # A bigger number makes the script faster until a certain point,
             # but it also increases RAM usage.
-            for chunk_qs in chunked_queryset(queryset, chunk_size=batch_size):
-                inject_chunk(table_columns=table.columns, chunk=chunk_qs, new_table_name=new_table_name)
-                written_rows += chunk_qs.count()
+            for rows in get_rows(table.columns, queryset, batch_size=batch_size):
+                inject_chunk(cur, conn, table_columns=table.columns, rows=rows, table_name=new_table_name)
+                written_rows += len(rows)
                 print(f"count={written_rows} of total={total_rows} written")
 
             # Trigger garbage collection to optimize memory use.
             gc.collect()
 
     rename_table_atomically(new_table_name, table_name)
+
+
+def get_columns_signature(table):
+    columns = [(c["name"], c["type"]) for c in get_table_with_metadata_columns(table).columns]
+    return hashlib.sha256(repr(columns).encode()).hexdigest()
+
+
+def create_watermarks_table_if_needed(cur):
+    cur.execute(
+        sql.SQL(
+            "CREATE TABLE IF NOT EXISTS {watermarks_table_name} ("
+            "table_name varchar PRIMARY KEY, "
+            "last_run_at timestamp with time zone NOT NULL, "
+            "last_full_run_at timestamp with time zone NOT NULL, "
+            "columns_signature varchar NOT NULL"
+            ")"
+        ).format(watermarks_table_name=sql.Identifier(WATERMARKS_TABLE_NAME))
+    )
+
+
+def get_watermark(table_name):
+    """
+    Return the (last_run_at, last_full_run_at, columns_signature) watermark of `table_name`,
+    or None when the table was never populated by `update_table` or does not exist anymore.
+    """
+    with MetabaseDatabaseCursor() as (cur, conn):
+        create_watermarks_table_if_needed(cur)
+        cur.execute("SELECT to_regclass(%s)", [sql.Identifier(table_name).as_string(cur)])
+        [table_exists] = cur.fetchone()
+        watermark = None
+        if table_exists:
+            cur.execute(
+                sql.SQL(
+                    "SELECT last_run_at, last_full_run_at, columns_signature FROM {watermarks_table_name} "
+                    "WHERE table_name = %s"
+                ).format(watermarks_table_name=sql.Identifier(WATERMARKS_TABLE_NAME)),
+                [table_name],
+            )
+            watermark = cur.fetchone()
+        conn.commit()
+    return watermark
+
+
+def set_watermark(cur, table_name, last_run_at, last_full_run_at, columns_signature):
+    create_watermarks_table_if_needed(cur)
+    cur.execute(
+        sql.SQL(
+            "INSERT INTO {watermarks_table_name} (table_name, last_run_at, last_full_run_at, columns_signature) "
+            "VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (table_name) DO UPDATE SET "
+            "last_run_at = EXCLUDED.last_run_at, "
+            "last_full_run_at = EXCLUDED.last_full_run_at, "
+            "columns_signature = EXCLUDED.columns_signature"
+        ).format(watermarks_table_name=sql.Identifier(WATERMARKS_TABLE_NAME)),
+        [table_name, last_run_at, last_full_run_at, columns_signature],
+    )
+
+
+def update_table(table, batch_size, querysets, changed_since, full_rebuild_every=DEFAULT_FULL_REBUILD_EVERY):
+    """
+    Incremental counterpart of `populate_table`.
+
+    Only the rows matching the `changed_since(watermark)` Q object are extracted and upserted
+    into the existing table, and the rows which are not part of the querysets anymore are deleted.
+    The table must have an `id` column holding the queryset primary key.
+
+    The watermark is the start date of the last successful run. It is stored in the metabase database
+    and updated in the same transaction as the upserted rows, so that a failed run is simply replayed.
+
+    Only the upserted rows get the current `date_mise_à_jour_metabase`, the other rows are left untouched:
+    the date of the last run of the whole table is the `last_run_at` of the watermarks table.
+
+    Changes on related objects (e.g. the name of a company) are not tracked: we fall back on a full
+    `populate_table` when there is no watermark yet, when the columns of the table changed or when
+    the last full rebuild is older than `full_rebuild_every`.
+    """
+    started_at = timezone.now()
+    table_name = table.name
+    columns_signature = get_columns_signature(table)
+    watermark = get_watermark(table_name)
+
+    if watermark is None or watermark[2] != columns_signature or watermark[1] < started_at - full_rebuild_every:
+        print(f"Full rebuild of table {table_name}.")
+        populate_table(table, batch_size=batch_size, querysets=querysets)
+        with MetabaseDatabaseCursor() as (cur, conn):
+            set_watermark(cur, table_name, started_at, started_at, columns_signature)
+            conn.commit()
+        return
+
+    last_run_at, last_full_run_at, _ = watermark
+    table = get_table_with_metadata_columns(table)
+    [id_column] = [c for c in table.columns if c["name"] == "id"]
+
+    delta_table_name = get_delta_table_name(table_name)
+    ids_table_name = get_ids_table_name(table_name)
+    create_table(delta_table_name, [(c["name"], c["type"]) for c in table.columns], reset=True)
+    create_table(ids_table_name, [("id", id_column["type"])], reset=True)
+
+    with MetabaseDatabaseCursor() as (cur, conn):
+        written_rows = 0
+        for queryset in querysets:
+            changed_pks = queryset.model.objects.filter(changed_since(last_run_at)).values("pk")
+            for rows in get_rows(table.columns, queryset.filter(pk__in=changed_pks), batch_size=batch_size):
+                inject_chunk(cur, conn, table_columns=table.columns, rows=rows, table_name=delta_table_name)
+                written_rows += len(rows)
+            print(f"count={written_rows} changed rows extracted since {last_run_at}")
+
+            # Keep track of all the current ids to delete the rows removed from the querysets.
+            with cur.copy(
+                sql.SQL("COPY {ids_table_name} (id) FROM STDIN WITH (FORMAT BINARY)").format(
+                    ids_table_name=sql.Identifier(ids_table_name)
+                )
+            ) as copy:
+                copy.set_types([id_column["type"]])
+                for pk in queryset.prefetch_related(None).values_list("pk", flat=True).iterator(chunk_size=batch_size):
+                    copy.write_row([pk])
+            conn.commit()
+
+            gc.collect()
+
+        # Apply the delta in a single transaction so that the table is never seen half updated.
+        cur.execute(
+            sql.SQL(
+                "DELETE FROM {table_name} t "
+                "WHERE EXISTS (SELECT 1 FROM {delta_table_name} d WHERE d.id = t.id) "
+                "OR NOT EXISTS (SELECT 1 FROM {ids_table_name} i WHERE i.id = t.id)"
+            ).format(
+                table_name=sql.Identifier(table_name),
+                delta_table_name=sql.Identifier(delta_table_name),
+                ids_table_name=sql.Identifier(ids_table_name),
+            )
+        )
+        print(f"count={cur.rowcount} rows deleted or replaced")
+        cur.execute(
+            sql.SQL("INSERT INTO {table_name} ({fields}) SELECT {fields} FROM {delta_table_name}").format(
+                table_name=sql.Identifier(table_name),
+                delta_table_name=sql.Identifier(delta_table_name),
+                fields=sql.SQL(",").join([sql.Identifier(c["name"]) for c in table.columns]),
+            )
+        )
+        set_watermark(cur, table_name, started_at, last_full_run_at, columns_signature)
+        conn.commit()
+
+        for tmp_table_name in [delta_table_name, ids_table_name]:
+            cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(tmp_table_name)))
+        conn.commit()
@@ -11,7 +11,9 @@ french speaking only users, and injects the result into metabase.
 
 The itou production database is never modified, only read.
 
-The metabase database tables are trashed and recreated every time.
+The metabase database tables are trashed and recreated every time, except with the `--incremental`
+option where the tables supporting it only receive the rows changed since the last successful run
+(and are still fully rebuilt once in a while).
 
 The data is heavily denormalized among tables so that the metabase user
 has all the fields needed and thus never needs to perform joining two tables.
@@ -20,11 +22,14 @@ We maintain a google sheet with extensive documentation about all tables and fie
 Its name is "Documentation ITOU METABASE [Master doc]". No direct link here for safety reasons.
 """
 
+import concurrent.futures
+import multiprocessing
 from collections import OrderedDict
 
 import tenacity
 from django.contrib.postgres.aggregates import ArrayAgg
-from django.db.models import Count, Max, Min, Prefetch, Q
+from django.db import connections
+from django.db.models import Count, Exists, Max, Min, OuterRef, Prefetch, Q
 from django.utils import timezone
 from sentry_sdk.crons import monitor
 
@@ -38,10 +43,10 @@ from itou.eligibility.enums import AdministrativeCriteriaLevel
 from itou.eligibility.models import AdministrativeCriteria, EligibilityDiagnosis
 from itou.institutions.models import Institution, InstitutionMembership
 from itou.job_applications.enums import JobApplicationState, Origin, SenderKind
-from itou.job_applications.models import JobApplication
+from itou.job_applications.models import JobApplication, JobApplicationTransitionLog
 from itou.jobs.models import Rome
 from itou.metabase.dataframes import get_df_from_rows, store_df
-from itou.metabase.db import build_dbt_daily, populate_table
+from itou.metabase.db import build_dbt_daily, populate_table, update_table
 from itou.metabase.tables import (
     analytics,
     approvals,
@@ -79,10 +84,34 @@ from itou.utils.command import BaseCommand
 from itou.utils.python import timeit
 
 
+# Modes which only run once all the other modes selected in the same invocation have completed.
+# `data_inconsistencies` only reads the itou database and can run at any time.
+MODES_RUN_LAST = {"dbt_daily"}
+INDEPENDENT_MODES = {"data_inconsistencies"}
+
+
 def log_retry_attempt(retry_state):
     print(f"attempt failed with outcome={retry_state.outcome}")
 
 
+def get_modes_dependencies(modes):
+    return {
+        mode: (
+            {other_mode for other_mode in modes if other_mode not in MODES_RUN_LAST | INDEPENDENT_MODES}
+            if mode in MODES_RUN_LAST
+            else set()
+        )
+        for mode in modes
+    }
+
+
+def run_mode_in_worker(mode, incremental):
+    # Each worker process opens its own connections to the itou and metabase databases.
+    command = Command()
+    command.incremental = incremental
+    command.run_mode(mode)
+
+
 class Command(BaseCommand):
     help = "Populate metabase database."
 
@@ -117,7 +146,34 @@ class Command(BaseCommand):
         }
 
     def add_arguments(self, parser):
-        parser.add_argument("--mode", action="store", dest="mode", type=str, choices=self.MODE_TO_OPERATION.keys())
+        parser.add_argument(
+            "--mode",
+            action="store",
+            dest="mode",
+            type=str,
+            nargs="+",
+            choices=self.MODE_TO_OPERATION.keys(),
+            help="Several modes can be given, `dbt_daily` then waits for all the others to complete.",
+        )
+        parser.add_argument(
+            "--jobs",
+            action="store",
+            dest="jobs",
+            type=int,
+            default=1,
+            help="Number of modes run at the same time, each one in its own process.",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only inject the rows changed since the last run, for the modes supporting it.",
+        )
+
+    def populate_or_update_table(self, table, batch_size, querysets, changed_since):
+        if self.incremental:
+            update_table(table, batch_size=batch_size, querysets=querysets, changed_since=changed_since)
+        else:
+            populate_table(table, batch_size=batch_size, querysets=querysets)
 
     def populate_analytics(self):
         populate_table(analytics.AnalyticsTable, batch_size=10_000, querysets=[Datum.objects.all()])
@@ -345,7 +401,24 @@ class Command(BaseCommand):
             .all()
         )
 
-        populate_table(job_applications.TABLE, batch_size=1000, querysets=[queryset])
+        self.populate_or_update_table(
+            job_applications.TABLE,
+            batch_size=1000,
+            querysets=[queryset],
+            changed_since=lambda since: (
+                Q(updated_at__gte=since)
+                | Q(last_change_at__gte=since)
+                # Not filled yet, fallback on the transition logs.
+                | Q(
+                    Exists(
+                        JobApplicationTransitionLog.objects.filter(
+                            job_application=OuterRef("pk"), timestamp__gte=since
+                        )
+                    ),
+                    last_change_at=None,
+                )
+            ),
+        )
 
     def populate_selected_jobs(self):
         """
@@ -379,14 +452,28 @@ class Command(BaseCommand):
 
     def populate_prolongations(self):
         queryset = Prolongation.objects.all()
-        populate_table(prolongations.TABLE, batch_size=1000, querysets=[queryset])
+        self.populate_or_update_table(
+            prolongations.TABLE,
+            batch_size=1000,
+            querysets=[queryset],
+            changed_since=lambda since: Q(updated_at__gte=since),
+        )
 
     def populate_prolongation_requests(self):
         queryset = ProlongationRequest.objects.select_related(
             "prolongation",
             "deny_information",
         ).all()
-        populate_table(prolongation_requests.TABLE, batch_size=1000, querysets=[queryset])
+        self.populate_or_update_table(
+            prolongation_requests.TABLE,
+            batch_size=1000,
+            querysets=[queryset],
+            changed_since=lambda since: (
+                Q(updated_at__gte=since)
+                | Q(deny_information__updated_at__gte=since)
+                | Q(prolongation__created_at__gte=since)
+            ),
+        )
 
     def populate_institutions(self):
         queryset = Institution.objects.all()
@@ -507,13 +594,68 @@ class Command(BaseCommand):
     def build_dbt_daily(self):
         build_dbt_daily()
 
-    @timeit
-    @monitor(monitor_slug="populate-metabase-emplois")
     @tenacity.retry(
         retry=tenacity.retry_if_not_exception_type(RuntimeError),
         stop=tenacity.stop_after_attempt(3),
         wait=tenacity.wait_fixed(5),
         after=log_retry_attempt,
     )
-    def handle(self, mode, **options):
+    def run_mode(self, mode):
         self.MODE_TO_OPERATION[mode]()
+
+    def run_modes(self, modes, jobs):
+        """
+        Run the modes as soon as their dependencies completed, at most `jobs` at a time.
+
+        The modes of a failed mode dependents are skipped, the other ones still run and
+        the failures are reported at the end.
+        """
+        dependencies = get_modes_dependencies(modes)
+        pending, completed, failed = list(modes), set(), set()
+
+        # Forked processes must not share the parent connection to the itou database.
+        connections.close_all()
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            running = {}
+            while pending or running:
+                for mode in list(pending):
+                    if dependencies[mode] & failed:
+                        self.stdout.write(f"Skipping mode={mode} as one of its dependencies failed.")
+                        pending.remove(mode)
+                        failed.add(mode)
+                    elif dependencies[mode] <= completed:
+                        self.stdout.write(f"Starting mode={mode}.")
+                        running[executor.submit(run_mode_in_worker, mode, self.incremental)] = mode
+                        pending.remove(mode)
+                if not running:
+                    continue
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    mode = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # The other modes keep running, the failure is raised once they are all done.
+                        self.stdout.write(f"Mode={mode} failed with exception {repr(e)}.")
+                        failed.add(mode)
+                    else:
+                        self.stdout.write(f"Mode={mode} completed.")
+                        completed.add(mode)
+
+        if failed:
+            raise RuntimeError(f"The following modes failed or were skipped: {', '.join(sorted(failed))}")
+
+    @timeit
+    @monitor(monitor_slug="populate-metabase-emplois")
+    def handle(self, mode, incremental=False, jobs=1, **options):
+        self.incremental = incremental
+        # `call_command(mode="...")` gives a single mode.
+        modes = [mode] if isinstance(mode, str) else mode
+        if jobs > 1 and len(modes) > 1:
+            self.run_modes(modes, jobs)
+        else:
+            dependencies = get_modes_dependencies(modes)
+            for mode in sorted(modes, key=lambda mode: len(dependencies[mode])):
+                self.run_mode(mode)
@@ -9,7 +9,8 @@ It manipulates large dataframes in memory (~10M rows) and thus is not optimized
 
 This script takes ~2 hours to complete.
 
-Refactoring it for low memory use would make it even longer and is actually not trivial. It might be attempted though.
+Use `--chunk-size` to stream each file chunk by chunk instead: memory use is then bounded by the chunk size,
+at the cost of reading each file twice.
 
 1) Vocabulary.
 
@@ -63,8 +64,12 @@ An EMI does not necessarily have a mission.
 # It would make a lot more sense, to avoid eventual circular imports, to move everything
 # related to the fluxiae logic in its own application. Some architecture still needs to be thought of there.
 # Another way to do it would be to rationalize our import (to Itou) & export (to Metabase) logic.
-from itou.companies.management.commands._import_siae.utils import get_fluxiae_df, get_fluxiae_referential_filenames
-from itou.metabase.dataframes import store_df
+from itou.companies.management.commands._import_siae.utils import (
+    get_fluxiae_df,
+    get_fluxiae_df_chunks,
+    get_fluxiae_referential_filenames,
+)
+from itou.metabase.dataframes import infer_columns_from_first_values, store_df, store_df_chunks
 from itou.metabase.db import build_dbt_weekly
 from itou.utils.command import BaseCommand
 from itou.utils.python import timeit
@@ -74,8 +79,21 @@ from itou.utils.slack import send_slack_message
 class Command(BaseCommand):
     help = "Populate metabase database with fluxIAE data."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Stream fluxIAE files by chunks of this many rows instead of loading them in memory at once",
+        )
+
     @timeit
     def populate_fluxiae_view(self, vue_name, skip_first_row=True):
+        if self.chunk_size:
+            with get_fluxiae_df_chunks(
+                vue_name=vue_name, chunk_size=self.chunk_size, skip_first_row=skip_first_row
+            ) as (first_values, df_chunks):
+                store_df_chunks(df_chunks, infer_columns_from_first_values(first_values), table_name=vue_name)
+            return
         df = get_fluxiae_df(vue_name=vue_name, skip_first_row=skip_first_row)
         store_df(df=df, table_name=vue_name)
 
@@ -113,5 +131,6 @@ class Command(BaseCommand):
             " dernières données FluxIAE :white_check_mark:"
         )
 
-    def handle(self, **options):
+    def handle(self, *, chunk_size=None, **options):
+        self.chunk_size = chunk_size
         self.populate_metabase_fluxiae()
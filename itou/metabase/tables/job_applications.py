@@ -1,6 +1,15 @@
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce
+
 from itou.job_applications.enums import JobApplicationState, Origin, SenderKind
 from itou.job_applications.models import JobApplicationWorkflow
-from itou.metabase.tables.utils import MetabaseTable, get_choice, get_department_and_region_columns
+from itou.metabase.tables.utils import (
+    MetabaseTable,
+    get_choice,
+    get_choice_expression,
+    get_column_from_lookup,
+    get_department_and_region_columns,
+)
 from itou.prescribers.enums import PrescriberOrganizationKind
 
 
@@ -117,24 +126,28 @@ TABLE.add_columns(
             "type": "uuid",
             "comment": "ID C1 de la candidature",
             "fn": lambda o: o.pk,
+            "expression": F("pk"),
         },
         {
             "name": "date_candidature",
             "type": "date",
             "comment": "Date de la candidature",
             "fn": lambda o: o.created_at,
+            "expression": F("created_at"),
         },
         {
             "name": "date_début_contrat",
             "type": "date",
             "comment": "Date de début du contrat",
             "fn": lambda o: o.hiring_start_at,
+            "expression": F("hiring_start_at"),
         },
         {
             "name": "état",
             "type": "varchar",
             "comment": "Etat de la candidature",
             "fn": lambda o: get_choice(choices=JobApplicationState.choices, key=o.state),
+            "expression": get_choice_expression("state", JobApplicationState.choices),
         },
         {
             "name": "origine",
@@ -159,6 +172,7 @@ TABLE.add_columns(
                 "(Normale, reprise de stock AI, import agrément PE, action support...)"
             ),
             "fn": lambda o: o.origin,
+            "expression": F("origin"),
         },
         {
             "name": "délai_prise_en_compte",
@@ -188,19 +202,21 @@ TABLE.add_columns(
             "type": "integer",
             "comment": "ID C1 du candidat",
             "fn": lambda o: o.job_seeker_id,
+            "expression": F("job_seeker_id"),
         },
         {
             "name": "id_structure",
             "type": "integer",
             "comment": "ID de la structure destinaire de la candidature",
             "fn": lambda o: o.to_company_id,
+            "expression": F("to_company_id"),
         },
-        {
-            "name": "type_structure",
-            "type": "varchar",
-            "comment": "Type de la structure destinaire de la candidature",
-            "fn": lambda o: o.to_company.kind,
-        },
+        get_column_from_lookup(
+            "to_company__kind",
+            name="type_structure",
+            type="varchar",
+            comment="Type de la structure destinaire de la candidature",
+        ),
         {
             "name": "nom_structure",
             "type": "varchar",
@@ -261,6 +277,7 @@ TABLE.add_columns(
             "type": "boolean",
             "comment": "Provient des injections AI",
             "fn": lambda o: o.origin == Origin.AI_STOCK,
+            "expression": ExpressionWrapper(Q(origin=Origin.AI_STOCK), output_field=BooleanField()),
         },
         {
             "name": "mode_attribution_pass_iae",
@@ -273,6 +290,7 @@ TABLE.add_columns(
             "type": "varchar",
             "comment": "Type de contrat",
             "fn": lambda o: o.contract_type if o.contract_type else "",
+            "expression": Coalesce("contract_type", Value("")),
         },
     ]
 )
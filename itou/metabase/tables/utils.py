@@ -3,7 +3,7 @@ import hashlib
 from operator import attrgetter
 
 from django.conf import settings
-from django.db.models import JSONField
+from django.db.models import Case, F, JSONField, Value, When
 from django.db.models.fields import (
     AutoField,
     BooleanField,
@@ -30,6 +30,12 @@ from itou.users.models import User
 
 
 class MetabaseTable:
+    """
+    Each column is a dict with a `name`, a `type`, a `comment` and a `fn` computing its value from
+    an object of the querysets. Columns which can be expressed in SQL also have an `expression`:
+    they are then computed by the database in the source query instead of calling `fn` on each row.
+    """
+
     def __init__(self, name):
         self.name = name
         self.columns = []
@@ -81,9 +87,42 @@ def get_column_from_field(field, name):
         "type": get_field_type_from_field(field),
         "comment": field.verbose_name,
         "fn": lambda o: getattr(o, field_name),
+        "expression": F(field_name),
     }
 
 
+def get_value_from_lookup(o, lookup):
+    for attr in lookup.split("__"):
+        if o is None:
+            return None
+        o = getattr(o, attr)
+    return o
+
+
+def get_column_from_lookup(lookup, name, type, comment):
+    """
+    Column holding a field of the object or of a related object, e.g. `to_company__kind`.
+    """
+    return {
+        "name": name,
+        "type": type,
+        "comment": comment,
+        "fn": lambda o: get_value_from_lookup(o, lookup),
+        "expression": F(lookup),
+    }
+
+
+def get_choice_expression(lookup, choices):
+    """
+    SQL counterpart of `get_choice`.
+    """
+    return Case(
+        *[When(**{lookup: key}, then=Value(label)) for key, label in choices],
+        default=None,
+        output_field=CharField(),
+    )
+
+
 def get_choice(choices, key):
     choices = dict(choices)
     # Gettext fixes `can't adapt type '__proxy__'` error
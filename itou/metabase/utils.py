@@ -1,3 +1,6 @@
+import itertools
+
+
 def convert_boolean_to_int(b):
     # True => 1, False => 0, None => None.
     return None if b is None else int(b)
@@ -14,22 +17,12 @@ def compose(f, g):
 
 def chunked_queryset(queryset, chunk_size=10000):
     """
-    Slice a queryset into chunks. This is useful to avoid memory issues when
-    iterating through large querysets.
-    Credits go to:
-    https://medium.com/@rui.jorge.rei/today-i-learned-django-memory-leak-and-the-sql-query-cache-1c152f62f64
-    Code initially adapted from https://djangosnippets.org/snippets/10599/
+    Stream a queryset chunk by chunk, each chunk being a list of at most `chunk_size` objects.
+
+    Rows are fetched through a single server-side cursor instead of paginating the queryset,
+    which would cost extra queries (and ever slower OFFSET scans) for each chunk. Prefetches are
+    resolved chunk by chunk by `QuerySet.iterator()` so that memory use stays bounded.
     """
-    queryset = queryset.order_by("pk")
-    pks = queryset.values_list("pk", flat=True)
-    if not pks:
-        return
-    start_pk = pks[0]
-    while True:
-        try:
-            end_pk = pks.filter(pk__gte=start_pk)[chunk_size]
-        except IndexError:
-            break
-        yield queryset.filter(pk__gte=start_pk, pk__lt=end_pk)
-        start_pk = end_pk
-    yield queryset.filter(pk__gte=start_pk)
+    iterator = queryset.order_by("pk").iterator(chunk_size=chunk_size)
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        yield chunk
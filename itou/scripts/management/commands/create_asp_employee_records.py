@@ -3,6 +3,7 @@ import csv
 
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from itou.approvals.models import Approval
@@ -78,7 +79,7 @@ class Command(BaseCommand):
                     # - In multiple SIAE → get first hiring in the matching Siret, the "mother" (SOURCE_ASP)
                     if len(siaes) > 1:
                         job_applications_qs = job_applications_qs.filter(to_company__siret=siret)
-                    job_application = job_applications_qs.with_accepted_at().earliest("accepted_at")
+                    job_application = job_applications_qs.earliest(Coalesce("accepted_at", "created_at"))
             try:
                 er = EmployeeRecord.from_job_application(job_application, clean=False)
             except ValidationError:
@@ -12,6 +12,7 @@ from django.db.models import Q
 
 from itou.users.enums import UserKind
 from itou.users.models import User
+from itou.utils.apis import geocoding
 from itou.utils.command import BaseCommand
 
 
@@ -113,10 +114,11 @@ class Command(BaseCommand):
             return []
 
         try:
-            r = httpx.post(
+            r = geocoding.get_client().post(
                 settings.API_BAN_BASE_URL + "/search/csv",
                 data=params,
                 files={"data": csv_bytes.encode("utf-8")},
+                timeout=None,  # Thousands of addresses are geocoded at once.
             )
         except httpx.RequestError as error:
             self.stdout.write(f" ! ERROR: {error}")
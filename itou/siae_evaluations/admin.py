@@ -197,6 +197,7 @@ class EvaluationCampaignAdmin(ItouModelAdmin):
         "created_at",
         "percent_set_at",
         "evaluations_asked_at",
+        "selection_seed",
         "ended_at",
     )
     list_filter = (
@@ -0,0 +1,178 @@
+import datetime
+import random
+import time
+import uuid
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from itou.approvals.models import Approval
+from itou.companies.models import Company
+from itou.eligibility.enums import AuthorKind
+from itou.eligibility.models import EligibilityDiagnosis
+from itou.institutions.enums import InstitutionKind
+from itou.institutions.models import Institution
+from itou.job_applications.enums import JobApplicationState, SenderKind
+from itou.job_applications.models import JobApplication
+from itou.siae_evaluations import enums as evaluation_enums
+from itou.siae_evaluations.models import EvaluatedJobApplication, EvaluatedSiae, EvaluationCampaign
+from itou.users.enums import UserKind
+from itou.users.models import User
+from itou.utils.command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = """
+        Time the population of an evaluation campaign for every DDETS IAE, as done nationally each year.
+        Fake SIAEs with self-approved hirings can be added in each department for the run, everything is rolled
+        back in the end and no email is sent.
+    """
+
+    def add_arguments(self, parser):
+        last_year = timezone.localdate().year - 1
+        parser.add_argument(
+            "--evaluated-period-start-at",
+            type=datetime.date.fromisoformat,
+            default=datetime.date(last_year, 1, 1),
+            help="Start of the evaluated period, defaults to the beginning of last year",
+        )
+        parser.add_argument(
+            "--evaluated-period-end-at",
+            type=datetime.date.fromisoformat,
+            default=datetime.date(last_year, 12, 31),
+            help="End of the evaluated period, defaults to the end of last year",
+        )
+        parser.add_argument(
+            "--fake-siaes-per-department",
+            type=int,
+            default=0,
+            help="Number of fake SIAEs to create in the department of each DDETS IAE, e.g. 50",
+        )
+        parser.add_argument(
+            "--fake-job-applications-per-siae",
+            type=int,
+            default=30,
+            help="Number of self-approved hirings of each fake SIAE",
+        )
+
+    def create_fake_siaes(self, institutions, siaes_count, job_applications_count, start_at, end_at):
+        rng = random.Random(0)
+        employer = User.objects.create(
+            username=uuid.uuid4().hex, email="benchmark-employer@example.com", kind=UserKind.EMPLOYER
+        )
+        departments = sorted({institution.department for institution in institutions})
+        companies = Company.objects.bulk_create(
+            Company(
+                siret=f"0000{index:010d}",
+                kind=rng.choice(evaluation_enums.EvaluationSiaesKind.Evaluable),
+                name=f"Benchmark {index}",
+                department=department,
+            )
+            for index, department in enumerate(department for department in departments for _ in range(siaes_count))
+        )
+        job_seekers = User.objects.bulk_create(
+            User(
+                username=uuid.uuid4().hex,
+                email=f"benchmark-{company.siret}@example.com",
+                kind=UserKind.JOB_SEEKER,
+            )
+            for company in companies
+        )
+        now = timezone.now()
+        diagnoses = EligibilityDiagnosis.objects.bulk_create(
+            EligibilityDiagnosis(
+                job_seeker=job_seeker,
+                author=employer,
+                author_kind=AuthorKind.EMPLOYER,
+                author_siae=company,
+                expires_at=now + relativedelta(months=EligibilityDiagnosis.EXPIRATION_DELAY_MONTHS),
+            )
+            for company, job_seeker in zip(companies, job_seekers)
+        )
+        last_number = Approval.last_number()
+        approvals = Approval.objects.bulk_create(
+            Approval(
+                user=diagnosis.job_seeker,
+                number=f"{Approval.ASP_ITOU_PREFIX}{last_number + index:07d}",
+                start_at=start_at,
+                end_at=Approval.get_default_end_date(start_at),
+                eligibility_diagnosis=diagnosis,
+            )
+            for index, diagnosis in enumerate(diagnoses, start=1)
+        )
+        period_days = (end_at - start_at).days
+        for company, diagnosis, approval in zip(companies, diagnoses, approvals):
+            JobApplication.objects.bulk_create(
+                JobApplication(
+                    job_seeker=diagnosis.job_seeker,
+                    to_company=company,
+                    sender=employer,
+                    sender_kind=SenderKind.EMPLOYER,
+                    sender_company=company,
+                    state=JobApplicationState.ACCEPTED,
+                    eligibility_diagnosis=diagnosis,
+                    approval=approval,
+                    hiring_start_at=start_at + datetime.timedelta(days=rng.randint(0, period_days)),
+                )
+                for _ in range(job_applications_count)
+            )
+        self.stdout.write(
+            f"Created {len(companies)} fake SIAEs with {len(companies) * job_applications_count} job applications"
+        )
+        with connection.cursor() as cursor:
+            for model in [Company, JobApplication]:
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def handle(
+        self,
+        *,
+        evaluated_period_start_at,
+        evaluated_period_end_at,
+        fake_siaes_per_department,
+        fake_job_applications_per_siae,
+        **options,
+    ):
+        with (
+            override_settings(EMAIL_BACKEND="django.core.mail.backends.dummy.EmailBackend"),
+            transaction.atomic(),
+        ):
+            institutions = Institution.objects.filter(kind=InstitutionKind.DDETS_IAE).order_by("department")
+            if fake_siaes_per_department:
+                self.create_fake_siaes(
+                    institutions,
+                    fake_siaes_per_department,
+                    fake_job_applications_per_siae,
+                    evaluated_period_start_at,
+                    evaluated_period_end_at,
+                )
+
+            total_duration = total_queries = 0
+            for institution in institutions:
+                campaign = EvaluationCampaign.objects.create(
+                    name="benchmark",
+                    institution=institution,
+                    evaluated_period_start_at=evaluated_period_start_at,
+                    evaluated_period_end_at=evaluated_period_end_at,
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    campaign.populate(timezone.now())
+                    duration = (time.perf_counter() - start) * 1000
+                total_duration += duration
+                total_queries += len(queries)
+                evaluated_siaes = EvaluatedSiae.objects.filter(evaluation_campaign=campaign).count()
+                evaluated_job_applications = EvaluatedJobApplication.objects.filter(
+                    evaluated_siae__evaluation_campaign=campaign
+                ).count()
+                self.stdout.write(
+                    f"{institution.department}: {evaluated_siaes} SIAEs and {evaluated_job_applications} "
+                    f"job applications selected in {duration:.1f}ms with {len(queries)} queries"
+                )
+            self.stdout.write(
+                f"{len(institutions)} campaigns populated in {total_duration:.1f}ms with {total_queries} queries"
+            )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("siae_evaluations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="evaluationcampaign",
+            name="selection_seed",
+            field=models.BigIntegerField(
+                editable=False,
+                help_text="Permet de reproduire la sélection des SIAE et des candidatures à contrôler",
+                null=True,
+                verbose_name="graine du tirage au sort",
+            ),
+        ),
+    ]
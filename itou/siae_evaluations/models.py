@@ -1,4 +1,7 @@
+import collections
 import datetime
+import random
+import secrets
 from pathlib import Path
 
 from django.conf import settings
@@ -25,14 +28,12 @@ from itou.utils.validators import validate_html
 from .constants import CAMPAIGN_VIEWABLE_DURATION
 
 
-def select_min_max_job_applications(job_applications):
+def get_min_max_job_applications_limit(job_applications_count):
     # select SELECTION_PERCENTAGE % max, within bounds
     # minimum MIN job_applications, maximum MAX job_applications
 
     limit = int(
-        job_applications.count()
-        * evaluation_enums.EvaluationJobApplicationsBoundariesNumber.SELECTION_PERCENTAGE
-        / 100
+        job_applications_count * evaluation_enums.EvaluationJobApplicationsBoundariesNumber.SELECTION_PERCENTAGE / 100
     )
 
     if limit < evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MIN:
@@ -40,7 +41,7 @@ def select_min_max_job_applications(job_applications):
     elif limit > evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MAX:
         limit = evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MAX
 
-    return job_applications.order_by("?")[:limit]
+    return limit
 
 
 def validate_institution(institution_id):
@@ -202,6 +203,12 @@ class EvaluationCampaign(models.Model):
         verbose_name="calendrier",
         null=True,
     )
+    selection_seed = models.BigIntegerField(
+        verbose_name="graine du tirage au sort",
+        help_text="Permet de reproduire la sélection des SIAE et des candidatures à contrôler",
+        null=True,
+        editable=False,
+    )
 
     objects = EvaluationCampaignQuerySet.as_manager()
 
@@ -241,44 +248,62 @@ class EvaluationCampaign(models.Model):
             .filter(to_company_count__gte=evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MIN)
         )
 
-    def number_of_siaes_to_select(self):
-        eligible_count = self.eligible_siaes().count()
+    def number_of_siaes_to_select(self, eligible_count=None):
+        if eligible_count is None:
+            eligible_count = self.eligible_siaes().count()
         if eligible_count:
             return max(round(eligible_count * self.chosen_percent / 100), 1)
         return 0
 
-    def eligible_siaes_under_ratio(self):
-        return (
-            self.eligible_siaes()
-            .values_list("to_company", flat=True)
-            .order_by("?")[: self.number_of_siaes_to_select()]
-        )
+    def populate(self, set_at, seed=None):
+        """
+        Select the SIAEs to evaluate and their job applications.
 
-    def populate(self, set_at):
+        The eligible job applications are fetched at once and sampled in memory. The `seed` of the
+        sampling is stored in `selection_seed`, to reproduce the selection if needed.
+        """
         if self.evaluations_asked_at:
             raise CampaignAlreadyPopulatedException()
 
+        if seed is None:
+            seed = secrets.randbits(63)
+        rng = random.Random(seed)
         with transaction.atomic():
             if not self.percent_set_at:
                 self.percent_set_at = set_at
             self.evaluations_asked_at = set_at
-
-            self.save(update_fields=["percent_set_at", "evaluations_asked_at"])
+            self.selection_seed = seed
+
+            self.save(update_fields=["percent_set_at", "evaluations_asked_at", "selection_seed"])
+
+            job_applications_by_siae = collections.defaultdict(list)
+            for job_application_pk, siae_pk in (
+                self.eligible_job_applications().order_by("pk").values_list("pk", "to_company_id")
+            ):
+                job_applications_by_siae[siae_pk].append(job_application_pk)
+            eligible_siae_pks = sorted(
+                siae_pk
+                for siae_pk, job_application_pks in job_applications_by_siae.items()
+                if len(job_application_pks) >= evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MIN
+            )
+            selected_siae_pks = rng.sample(
+                eligible_siae_pks, self.number_of_siaes_to_select(eligible_count=len(eligible_siae_pks))
+            )
+            siaes = Company.objects.select_related("convention").in_bulk(selected_siae_pks)
 
             evaluated_siaes = EvaluatedSiae.objects.bulk_create(
-                EvaluatedSiae(evaluation_campaign=self, siae=Company.objects.get(pk=pk))
-                for pk in self.eligible_siaes_under_ratio()
+                EvaluatedSiae(evaluation_campaign=self, siae=siaes[pk]) for pk in selected_siae_pks
             )
 
-            EvaluatedJobApplication.objects.bulk_create(
-                [
-                    EvaluatedJobApplication(evaluated_siae=evaluated_siae, job_application=job_application)
-                    for evaluated_siae in evaluated_siaes
-                    for job_application in select_min_max_job_applications(
-                        self.eligible_job_applications().filter(to_company=evaluated_siae.siae)
-                    )
-                ]
-            )
+            evaluated_job_applications = []
+            for evaluated_siae in evaluated_siaes:
+                job_application_pks = job_applications_by_siae[evaluated_siae.siae_id]
+                limit = min(get_min_max_job_applications_limit(len(job_application_pks)), len(job_application_pks))
+                evaluated_job_applications.extend(
+                    EvaluatedJobApplication(evaluated_siae=evaluated_siae, job_application_id=job_application_pk)
+                    for job_application_pk in rng.sample(job_application_pks, limit)
+                )
+            EvaluatedJobApplication.objects.bulk_create(evaluated_job_applications)
 
             emails = [SIAEEmailFactory(evaluated_siae).selected() for evaluated_siae in evaluated_siaes]
             emails += [CampaignEmailFactory(self).selected_siae()]
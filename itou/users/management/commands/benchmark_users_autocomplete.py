@@ -0,0 +1,89 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection, transaction
+
+from itou.users.enums import UserKind
+from itou.users.models import User
+from itou.utils.command import BaseCommand
+
+
+SEARCH_STRINGS = ["m", "ma", "mart", "martin", "jean", "jean mar", "dupont", "le bihan", "nguyen t", "zzz"]
+# Syllables of the fake names, to get a realistic spread of prefixes.
+SYLLABLES = "ma rt in du po nt je an le bi ha ng uy en lo ri sa ch".split()
+
+
+class Command(BaseCommand):
+    help = """
+        Time the job seekers autocomplete with the stored search vector, and with the vector computed on the fly
+        it replaced. Fake job seekers can be added for the run, everything is rolled back in the end.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fake-users",
+            type=int,
+            default=0,
+            help="Number of fake job seekers to create before the benchmark, e.g. 3000000",
+        )
+        parser.add_argument("--repeat", type=int, default=20, help="Number of runs of each search")
+
+    def create_fake_users(self, count):
+        fake_name = random.Random(0)
+
+        def name():
+            return "".join(fake_name.choices(SYLLABLES, k=fake_name.randint(2, 5))).capitalize()
+
+        batch_size = 10_000
+        for start in range(0, count, batch_size):
+            User.objects.bulk_create(
+                User(
+                    username=uuid.uuid4().hex,
+                    email=f"benchmark-{start + i}@example.com",
+                    first_name=name(),
+                    last_name=name(),
+                    kind=UserKind.JOB_SEEKER,
+                )
+                for i in range(min(batch_size, count - start))
+            )
+            self.stdout.write(f"Created {min(start + batch_size, count)}/{count} fake job seekers")
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {User._meta.db_table}")
+
+    def time_search(self, get_results, repeat):
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            get_results()
+            durations.append((time.perf_counter() - start) * 1000)
+        return statistics.median(durations), max(durations)
+
+    def handle(self, *, fake_users, repeat, **options):
+        with transaction.atomic():
+            if fake_users:
+                self.create_fake_users(fake_users)
+            self.stdout.write(f"{User.objects.filter(kind=UserKind.JOB_SEEKER).count()} job seekers")
+
+            for search_string in SEARCH_STRINGS:
+                stored_median, stored_max = self.time_search(
+                    lambda: list(User.objects.autocomplete(search_string)), repeat
+                )
+                tsquery = " & ".join(f"{word}:*" for word in search_string.split())
+                search_query = SearchQuery(tsquery, config="french_unaccent", search_type="raw")
+                computed_median, computed_max = self.time_search(
+                    lambda: list(
+                        User.objects.annotate(
+                            computed_full_text=SearchVector("first_name", "last_name", config="french_unaccent")
+                        ).filter(computed_full_text=search_query, kind=UserKind.JOB_SEEKER)[:10]
+                    ),
+                    repeat,
+                )
+                self.stdout.write(
+                    f"{search_string!r}: stored vector median={stored_median:.1f}ms max={stored_max:.1f}ms, "
+                    f"computed vector median={computed_median:.1f}ms max={computed_max:.1f}ms"
+                )
+
+            transaction.set_rollback(True)
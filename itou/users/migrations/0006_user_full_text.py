@@ -0,0 +1,62 @@
+import time
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def _fill_user_full_text(apps, schema_editor):
+    User = apps.get_model("users", "User")
+
+    users_nb = 0
+    last_pk = 0
+    start = time.perf_counter()
+    while pks := list(User.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:10_000]):
+        # Same vector as the users_user_full_text_trigger one.
+        users_nb += User.objects.filter(pk__in=pks).update(
+            full_text=SearchVector("first_name", "last_name", config="public.french_unaccent")
+        )
+        last_pk = pks[-1]
+        print(f"{users_nb} users migrated in {time.perf_counter() - start:.2f} sec")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("users", "0005_clean_pe_connect_users_from_allauth"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="full_text",
+            field=django.contrib.postgres.search.SearchVectorField(null=True),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="user",
+            trigger=pgtrigger.compiler.Trigger(
+                name="users_user_full_text_trigger",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    execute=(
+                        'tsvector_update_trigger("full_text", "public.french_unaccent", "first_name", "last_name")'
+                    ),
+                    func="",
+                    hash="c91288f0c2433ca2cbc65a41dce14dc2271c31ac",
+                    operation='INSERT OR UPDATE OF "first_name", "last_name"',
+                    pgid="pgtrigger_users_user_full_text_trigger_c4930",
+                    table="users_user",
+                    when="BEFORE",
+                ),
+            ),
+        ),
+        migrations.RunPython(_fill_user_full_text, migrations.RunPython.noop, elidable=True),
+        AddIndexConcurrently(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["full_text"], name="users_user_full_text_gin"),
+        ),
+    ]
@@ -0,0 +1,134 @@
+import time
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations
+
+
+# Same statement as the refresh_approvals_summary triggers, for a batch of job seekers.
+FILL_APPROVALS_SUMMARIES_SQL = """
+    INSERT INTO approvals_jobseekerapprovalssummary (
+        job_seeker_id,
+        latest_approval_id,
+        approval_start_at,
+        approval_end_at,
+        latest_pe_approval_id,
+        pe_approval_start_at,
+        pe_approval_end_at
+    )
+    SELECT
+        users_user.id,
+        approval.id,
+        approval.start_at,
+        approval.end_at,
+        pe_approval.id,
+        pe_approval.start_at,
+        pe_approval.end_at
+    FROM users_user
+    LEFT JOIN users_jobseekerprofile AS profile ON profile.user_id = users_user.id
+    LEFT JOIN LATERAL (
+        SELECT id, start_at, end_at FROM approvals_approval
+        WHERE approvals_approval.user_id = users_user.id
+        ORDER BY end_at DESC, start_at, created_at DESC
+        LIMIT 1
+    ) AS approval ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT id, start_at, end_at FROM approvals_poleemploiapproval
+        WHERE (
+            (profile.nir <> '' AND approvals_poleemploiapproval.nir = profile.nir)
+            OR (
+                profile.pole_emploi_id <> ''
+                AND approvals_poleemploiapproval.pole_emploi_id = profile.pole_emploi_id
+                AND approvals_poleemploiapproval.birthdate = users_user.birthdate
+            )
+        )
+        AND NOT EXISTS (
+            SELECT FROM approvals_approval
+            WHERE approvals_approval.user_id = users_user.id
+            AND approvals_approval.number = approvals_poleemploiapproval.number
+        )
+        ORDER BY end_at DESC, start_at, number DESC
+        LIMIT 1
+    ) AS pe_approval ON TRUE
+    WHERE users_user.id = ANY(%s)
+    AND (approval.id IS NOT NULL OR pe_approval.id IS NOT NULL)
+    ON CONFLICT (job_seeker_id) DO UPDATE SET
+        latest_approval_id = EXCLUDED.latest_approval_id,
+        approval_start_at = EXCLUDED.approval_start_at,
+        approval_end_at = EXCLUDED.approval_end_at,
+        latest_pe_approval_id = EXCLUDED.latest_pe_approval_id,
+        pe_approval_start_at = EXCLUDED.pe_approval_start_at,
+        pe_approval_end_at = EXCLUDED.pe_approval_end_at;
+"""
+
+
+def _fill_approvals_summaries(apps, schema_editor):
+    User = apps.get_model("users", "User")
+
+    job_seekers_nb = 0
+    last_pk = 0
+    start = time.perf_counter()
+    while pks := list(
+        User.objects.filter(kind="job_seeker", pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:10_000]
+    ):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(FILL_APPROVALS_SUMMARIES_SQL, [pks])
+        job_seekers_nb += len(pks)
+        last_pk = pks[-1]
+        print(f"{job_seekers_nb} job seekers migrated in {time.perf_counter() - start:.2f} sec")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("approvals", "0005_jobseekerapprovalssummary"),
+        ("users", "0006_user_full_text"),
+    ]
+
+    operations = [
+        pgtrigger.migrations.AddTrigger(
+            model_name="user",
+            trigger=pgtrigger.compiler.Trigger(
+                name="refresh_approvals_summary",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition='WHEN (OLD."birthdate" IS DISTINCT FROM (NEW."birthdate"))',
+                    func="\n                    \n        INSERT INTO approvals_jobseekerapprovalssummary (\n            job_seeker_id,\n            latest_approval_id,\n            approval_start_at,\n            approval_end_at,\n            latest_pe_approval_id,\n            pe_approval_start_at,\n            pe_approval_end_at\n        )\n        SELECT\n            users_user.id,\n            approval.id,\n            approval.start_at,\n            approval.end_at,\n            pe_approval.id,\n            pe_approval.start_at,\n            pe_approval.end_at\n        FROM users_user\n        LEFT JOIN users_jobseekerprofile AS profile ON profile.user_id = users_user.id\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_approval\n            WHERE approvals_approval.user_id = users_user.id\n            ORDER BY end_at DESC, start_at, created_at DESC\n            LIMIT 1\n        ) AS approval ON TRUE\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_poleemploiapproval\n            WHERE (\n                (profile.nir <> '' AND approvals_poleemploiapproval.nir = profile.nir)\n                OR (\n                    profile.pole_emploi_id <> ''\n                    AND approvals_poleemploiapproval.pole_emploi_id = profile.pole_emploi_id\n                    AND approvals_poleemploiapproval.birthdate = users_user.birthdate\n                )\n            )\n            AND NOT EXISTS (\n                SELECT FROM approvals_approval\n                WHERE approvals_approval.user_id = users_user.id\n                AND approvals_approval.number = approvals_poleemploiapproval.number\n            )\n            ORDER BY end_at DESC, start_at, number DESC\n            LIMIT 1\n        ) AS pe_approval ON TRUE\n        WHERE users_user.id = NEW.id AND users_user.kind = 'job_seeker'\n        ON CONFLICT (job_seeker_id) DO UPDATE SET\n            latest_approval_id = EXCLUDED.latest_approval_id,\n            approval_start_at = EXCLUDED.approval_start_at,\n            approval_end_at = EXCLUDED.approval_end_at,\n            latest_pe_approval_id = EXCLUDED.latest_pe_approval_id,\n            pe_approval_start_at = EXCLUDED.pe_approval_start_at,\n            pe_approval_end_at = EXCLUDED.pe_approval_end_at;\n    \n                    RETURN NULL;\n                ",  # noqa: E501
+                    hash="28d1f9ab18470cf3c240b9d832e7b4fe94ce1c63",
+                    operation='UPDATE OF "birthdate"',
+                    pgid="pgtrigger_refresh_approvals_summary_b803a",
+                    table="users_user",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="user",
+            trigger=pgtrigger.compiler.Trigger(
+                name="delete_approvals_summary",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n                    -- Django deletes the summary before the approvals of the user, whose triggers recreate it.\n                    DELETE FROM approvals_jobseekerapprovalssummary WHERE job_seeker_id = OLD.id;\n                    RETURN NULL;\n                ",  # noqa: E501
+                    hash="72cb1d79fc721b072de156af6e03f831b223ac70",
+                    operation="DELETE",
+                    pgid="pgtrigger_delete_approvals_summary_1f145",
+                    table="users_user",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="jobseekerprofile",
+            trigger=pgtrigger.compiler.Trigger(
+                name="refresh_approvals_summary",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n                    IF (TG_OP = 'INSERT' AND NEW.nir = '' AND NEW.pole_emploi_id = '') THEN\n                        RETURN NULL;\n                    END IF;\n                    IF (TG_OP = 'UPDATE' AND (OLD.nir, OLD.pole_emploi_id)\n                        IS NOT DISTINCT FROM (NEW.nir, NEW.pole_emploi_id)) THEN\n                        RETURN NULL;\n                    END IF;\n                    \n        INSERT INTO approvals_jobseekerapprovalssummary (\n            job_seeker_id,\n            latest_approval_id,\n            approval_start_at,\n            approval_end_at,\n            latest_pe_approval_id,\n            pe_approval_start_at,\n            pe_approval_end_at\n        )\n        SELECT\n            users_user.id,\n            approval.id,\n            approval.start_at,\n            approval.end_at,\n            pe_approval.id,\n            pe_approval.start_at,\n            pe_approval.end_at\n        FROM users_user\n        LEFT JOIN users_jobseekerprofile AS profile ON profile.user_id = users_user.id\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_approval\n            WHERE approvals_approval.user_id = users_user.id\n            ORDER BY end_at DESC, start_at, created_at DESC\n            LIMIT 1\n        ) AS approval ON TRUE\n        LEFT JOIN LATERAL (\n            SELECT id, start_at, end_at FROM approvals_poleemploiapproval\n            WHERE (\n                (profile.nir <> '' AND approvals_poleemploiapproval.nir = profile.nir)\n                OR (\n                    profile.pole_emploi_id <> ''\n                    AND approvals_poleemploiapproval.pole_emploi_id = profile.pole_emploi_id\n                    AND approvals_poleemploiapproval.birthdate = users_user.birthdate\n                )\n            )\n            AND NOT EXISTS (\n                SELECT FROM approvals_approval\n                WHERE approvals_approval.user_id = users_user.id\n                AND approvals_approval.number = approvals_poleemploiapproval.number\n            )\n            ORDER BY end_at DESC, start_at, number DESC\n            LIMIT 1\n        ) AS pe_approval ON TRUE\n        WHERE users_user.id = NEW.user_id AND users_user.kind = 'job_seeker'\n        ON CONFLICT (job_seeker_id) DO UPDATE SET\n            latest_approval_id = EXCLUDED.latest_approval_id,\n            approval_start_at = EXCLUDED.approval_start_at,\n            approval_end_at = EXCLUDED.approval_end_at,\n            latest_pe_approval_id = EXCLUDED.latest_pe_approval_id,\n            pe_approval_start_at = EXCLUDED.pe_approval_start_at,\n            pe_approval_end_at = EXCLUDED.pe_approval_end_at;\n    \n                    RETURN NULL;\n                ",  # noqa: E501
+                    hash="496acd384577bac04280e6362c1177bb31124788",
+                    operation='INSERT OR UPDATE OF "nir", "pole_emploi_id"',
+                    pgid="pgtrigger_refresh_approvals_summary_3ae4d",
+                    table="users_jobseekerprofile",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        migrations.RunPython(_fill_approvals_summaries, migrations.RunPython.noop, elidable=True),
+    ]
@@ -1,27 +1,32 @@
 import re
 import string
-import time
 import uuid
-from collections import Counter
+from collections import Counter, defaultdict
 
+import pgtrigger
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.contrib.postgres.fields import CIEmailField
-from django.contrib.postgres.indexes import OpClass
-from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinLengthValidator
 from django.db import models
-from django.db.models import Count, Q
-from django.db.models.functions import Upper
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce, Upper
 from django.utils import timezone
 from django.utils.crypto import salted_hmac
 from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
 
 from itou.approvals.enums import Origin
-from itou.approvals.models import Approval, PoleEmploiApproval
+from itou.approvals.models import (
+    Approval,
+    JobSeekerApprovalsSummary,
+    PoleEmploiApproval,
+    refresh_approvals_summary_sql,
+)
 from itou.asp.models import (
     AllocationDuration,
     Commune,
@@ -56,17 +61,14 @@ class ItouUserManager(UserManager):
         words = re.sub(f"[{string.punctuation}]", " ", search_string).split()
         words = [word + ":*" for word in words]
         tsquery = " & ".join(words)
+        search_query = SearchQuery(tsquery, config="french_unaccent", search_type="raw")
 
-        queryset = (
-            self.annotate(search=SearchVector("first_name", "last_name"))
-            .filter(search=SearchQuery(tsquery, config="french_unaccent", search_type="raw"))
-            .filter(kind=kind)
-        )
+        queryset = self.filter(full_text=search_query, kind=kind)
 
         if current_user:
             queryset = queryset.exclude(follow_up_group__members=current_user).exclude(id=current_user.id)
 
-        return queryset[:limit]
+        return queryset.annotate(rank=SearchRank(F("full_text"), search_query)).order_by("-rank", "pk")[:limit]
 
     def get_duplicated_pole_emploi_ids(self):
         """
@@ -244,6 +246,8 @@ class User(AbstractUser, AddressMixin):
         help_text="Mise à jour par autocomplétion de l'utilisateur",
     )
 
+    full_text = SearchVectorField(null=True)  # Updated by the UpdateSearchVector() trigger.
+
     objects = ItouUserManager()
 
     class Meta(AbstractUser.Meta):
@@ -251,7 +255,37 @@ class User(AbstractUser, AddressMixin):
             models.Index(
                 OpClass(Upper("email"), name="text_pattern_ops"),
                 name="users_user_email_upper",
-            )
+            ),
+            GinIndex(fields=["full_text"], name="users_user_full_text_gin"),
+        ]
+        triggers = [
+            pgtrigger.UpdateSearchVector(
+                name="users_user_full_text_trigger",
+                vector_field="full_text",
+                document_fields=["first_name", "last_name"],
+                config_name="public.french_unaccent",
+            ),
+            pgtrigger.Trigger(
+                name="refresh_approvals_summary",
+                when=pgtrigger.After,
+                # PE approvals are matched on the birthdate.
+                operation=pgtrigger.UpdateOf("birthdate"),
+                condition=pgtrigger.Q(old__birthdate__df=pgtrigger.F("new__birthdate")),
+                func=f"""
+                    {refresh_approvals_summary_sql("NEW.id")}
+                    RETURN NULL;
+                """,
+            ),
+            pgtrigger.Trigger(
+                name="delete_approvals_summary",
+                when=pgtrigger.After,
+                operation=pgtrigger.Delete,
+                func="""
+                    -- Django deletes the summary before the approvals of the user, whose triggers recreate it.
+                    DELETE FROM approvals_jobseekerapprovalssummary WHERE job_seeker_id = OLD.id;
+                    RETURN NULL;
+                """,
+            ),
         ]
         constraints = [
             models.CheckConstraint(
@@ -409,45 +443,26 @@ class User(AbstractUser, AddressMixin):
     def latest_approval(self):
         if not self.is_job_seeker:
             return None
-
-        approvals = self.approvals.all()
-
-        if not approvals:
-            return None
-        if approvals.valid().exists():
-            return approvals.valid().first()
-
-        approval = sorted(
-            approvals,
-            key=lambda x: (
-                -time.mktime(x.end_at.timetuple()),
-                time.mktime(x.start_at.timetuple()),
-            ),
-        )[0]
-        if approval.waiting_period_has_elapsed:
-            return None
-        return approval
+        if "approvals" in getattr(self, "_prefetched_objects_cache", {}):
+            approval = _select_latest_approval(self.approvals.all())
+        else:
+            approval = Approval.objects.filter(
+                pk=JobSeekerApprovalsSummary.objects.filter(job_seeker=self).values("latest_approval")
+            ).first()
+        return _exclude_elapsed_waiting_period(approval)
 
     @cached_property
     def latest_pe_approval(self):
         if not self.is_job_seeker:
             return None
-
-        approval_numbers = self.approvals.all().values_list("number", flat=True)
-
-        pe_approvals = PoleEmploiApproval.objects.find_for(self).exclude(number__in=approval_numbers)
-        if not pe_approvals:
+        profile = self.jobseeker_profile
+        if not profile.nir and not (profile.pole_emploi_id and self.birthdate):
+            # No PE approval can match the job seeker.
             return None
-        pe_approval = sorted(
-            pe_approvals,
-            key=lambda x: (
-                -time.mktime(x.end_at.timetuple()),
-                time.mktime(x.start_at.timetuple()),
-            ),
-        )[0]
-        if pe_approval.waiting_period_has_elapsed:
-            return None
-        return pe_approval
+        pe_approval = PoleEmploiApproval.objects.filter(
+            pk=JobSeekerApprovalsSummary.objects.filter(job_seeker=self).values("latest_pe_approval")
+        ).first()
+        return _exclude_elapsed_waiting_period(pe_approval)
 
     @property
     def latest_common_approval(self):
@@ -655,7 +670,11 @@ class User(AbstractUser, AddressMixin):
 
         # Some candidates may not have accepted job applications
         # Assuming its the case can lead to issues downstream
-        return self.job_applications.accepted().with_accepted_at().order_by("-accepted_at", "-hiring_start_at").first()
+        return (
+            self.job_applications.accepted()
+            .order_by(Coalesce("accepted_at", "created_at").desc(), "-hiring_start_at")
+            .first()
+        )
 
     def last_hire_was_made_by_company(self, company):
         if not self.is_job_seeker:
@@ -726,6 +745,62 @@ class User(AbstractUser, AddressMixin):
         return self.get_full_name()
 
 
+def _select_latest_approval(approvals):
+    """
+    The approval ending last, like in `JobSeekerApprovalsSummary`, from already loaded approvals.
+    """
+    return min(
+        approvals,
+        key=lambda approval: (-approval.end_at.toordinal(), approval.start_at, -approval.created_at.timestamp()),
+        default=None,
+    )
+
+
+def _exclude_elapsed_waiting_period(approval):
+    if approval is None or approval.waiting_period_has_elapsed:
+        return None
+    return approval
+
+
+def prefetch_latest_approvals(users):
+    """
+    Resolve `latest_approval` and `latest_pe_approval` for all `users` at once from their approvals
+    summaries: a query for the summaries and another for the suspensions of their approvals, unless the
+    approvals were prefetched, instead of several queries per user.
+    """
+    job_seekers = defaultdict(list)
+    for user in users:
+        if user.is_job_seeker:
+            job_seekers[user.pk].append(user)
+        else:
+            user.__dict__["latest_approval"] = user.__dict__["latest_pe_approval"] = None
+    if not job_seekers:
+        return
+
+    prefetched_approvals = {
+        pk: job_seeker.approvals.all()
+        for pk, [job_seeker, *_] in job_seekers.items()
+        if "approvals" in getattr(job_seeker, "_prefetched_objects_cache", {})
+    }
+    summaries = JobSeekerApprovalsSummary.objects.select_related("latest_pe_approval")
+    if prefetched_approvals.keys() != job_seekers.keys():
+        # Suspensions are prefetched for `Approval.state`.
+        summaries = summaries.select_related("latest_approval").prefetch_related("latest_approval__suspension_set")
+    summaries = summaries.in_bulk(job_seekers.keys())
+
+    for pk, instances in job_seekers.items():
+        summary = summaries.get(pk)
+        if pk in prefetched_approvals:
+            latest_approval = _select_latest_approval(prefetched_approvals[pk])
+        else:
+            latest_approval = summary.latest_approval if summary else None
+        latest_approval = _exclude_elapsed_waiting_period(latest_approval)
+        latest_pe_approval = _exclude_elapsed_waiting_period(summary.latest_pe_approval if summary else None)
+        for job_seeker in instances:
+            job_seeker.__dict__["latest_approval"] = latest_approval
+            job_seeker.__dict__["latest_pe_approval"] = latest_pe_approval
+
+
 def get_allauth_account_user_display(user):
     return user.email
 
@@ -1013,6 +1088,25 @@ class JobSeekerProfile(models.Model):
                 violation_error_message="Ce numéro de sécurité sociale est déjà associé à un autre utilisateur.",
             ),
         ]
+        triggers = [
+            pgtrigger.Trigger(
+                name="refresh_approvals_summary",
+                when=pgtrigger.After,
+                # PE approvals are matched on the NIR and the Pôle emploi ID.
+                operation=pgtrigger.Insert | pgtrigger.UpdateOf("nir", "pole_emploi_id"),
+                func=f"""
+                    IF (TG_OP = 'INSERT' AND NEW.nir = '' AND NEW.pole_emploi_id = '') THEN
+                        RETURN NULL;
+                    END IF;
+                    IF (TG_OP = 'UPDATE' AND (OLD.nir, OLD.pole_emploi_id)
+                        IS NOT DISTINCT FROM (NEW.nir, NEW.pole_emploi_id)) THEN
+                        RETURN NULL;
+                    END IF;
+                    {refresh_approvals_summary_sql("NEW.user_id")}
+                    RETURN NULL;
+                """,
+            ),
+        ]
 
     def __str__(self):
         return str(self.user)
@@ -1,4 +1,5 @@
 import csv
+import functools
 import logging
 import urllib.parse
 from io import StringIO
@@ -7,7 +8,9 @@ import httpx
 from django.conf import settings
 from django.contrib.gis.geos import GEOSGeometry
 from django.utils.http import urlencode
+from unidecode import unidecode
 
+from itou.geo.models import GeocodingResult
 from itou.utils.apis.exceptions import AddressLookupError, GeocodingDataError
 
 
@@ -29,6 +32,20 @@ BATCH_GEOCODE_API_PARAMS = {
 }
 
 
+@functools.cache
+def get_client():
+    # Shared by all the calls, to reuse the connections to the BAN API.
+    return httpx.Client(timeout=httpx.Timeout(10, connect=3))
+
+
+def _get_cache_key(*parts):
+    """
+    The BAN is neither sensitive to the case, the accents nor the spaces:
+    queries differing only by those share their result.
+    """
+    return "|".join(" ".join(unidecode(str(part)).lower().split()) for part in parts)
+
+
 def call_ban_geocoding_api(address, post_code=None, limit=1):
     if not settings.API_BAN_BASE_URL:
         logger.info("API_BAN_BASE_URL is not defined, geocoding will NOT be done")
@@ -45,18 +62,26 @@ def call_ban_geocoding_api(address, post_code=None, limit=1):
     query_string = urlencode(args)
     url = f"{api_url}?{query_string}"
 
+    cache_key = _get_cache_key("search", limit, post_code or "", address)
+    if cached := GeocodingResult.objects.fresh().filter(query=cache_key).first():
+        if cached.result is None:
+            logger.info("Geocoding error, no result found for `%s`", url)
+        return cached.result
+
     try:
-        r = httpx.get(url)
+        r = get_client().get(url)
         r.raise_for_status()
     except httpx.HTTPError as e:
         logger.info("Error while requesting `%s`: %s", url, e)
         return None
 
     try:
-        return r.json()["features"][0]
+        result = r.json()["features"][0]
     except IndexError:
         logger.info("Geocoding error, no result found for `%s`", url)
-        return None
+        result = None
+    GeocodingResult.objects.update_or_create(query=cache_key, defaults={"result": result})
+    return result
 
 
 def get_geocoding_data(address, post_code=None, limit=1):
@@ -110,9 +135,9 @@ def _addresses_to_csv(addresses):
         return out.getvalue().encode("utf-8")
 
 
-def batch(addresses):
+def _call_ban_batch_geocoding_api(addresses):
     url = urllib.parse.urljoin(settings.API_BAN_BASE_URL, "/search/csv/")
-    with httpx.stream(
+    with get_client().stream(
         "POST",
         url,
         data=BATCH_GEOCODE_API_PARAMS,
@@ -121,3 +146,38 @@ def batch(addresses):
     ) as response:
         response.raise_for_status()
         yield from csv.DictReader(response.iter_lines(), delimiter=BATCH_GEOCODE_API_SEPARATOR)
+
+
+def batch(addresses):
+    """
+    Geocode the `addresses` dicts with the CSV endpoint of the BAN API, yielding a result for each of them
+    in the same order.
+
+    Only the addresses without a known result are sent to the BAN API.
+    """
+    addresses = list(addresses)
+    cache_keys = [_get_cache_key("csv", address["address_line_1"], address["post_code"]) for address in addresses]
+    results = {
+        geocoding_result.query: geocoding_result.result
+        for geocoding_result in GeocodingResult.objects.fresh().filter(query__in=set(cache_keys))
+    }
+
+    missing_addresses = {}
+    for cache_key, address in zip(cache_keys, addresses):
+        if cache_key not in results:
+            missing_addresses.setdefault(cache_key, address)
+    if missing_addresses:
+        for cache_key, result in zip(
+            missing_addresses, _call_ban_batch_geocoding_api(list(missing_addresses.values())), strict=True
+        ):
+            results[cache_key] = result
+        GeocodingResult.objects.bulk_create(
+            [GeocodingResult(query=cache_key, result=results[cache_key]) for cache_key in missing_addresses],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["query"],
+            update_fields=["result", "updated_at"],
+        )
+
+    for cache_key in cache_keys:
+        yield results[cache_key]
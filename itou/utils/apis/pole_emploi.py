@@ -1,5 +1,6 @@
 import logging
 import re
+import threading
 
 import httpx
 from django.core.cache import caches
@@ -44,6 +45,8 @@ API_CLIENT_EMPTY_NIR_BAD_RESPONSE = "empty_nir"
 API_TIMEOUT_SECONDS = 60  # this API is pretty slow, let's give it a chance
 
 CACHE_API_TOKEN_KEY = "pole_emploi_api_client_token"
+# Avoid concurrent workers all asking for a new token when it expires.
+_refresh_token_lock = threading.Lock()
 
 # Pole Emploi also sent us a "sandbox" scope value: "api_testmaj-pass-iaev1" instead of "api_maj-pass-iaev1"
 AUTHORIZED_SCOPES = [
@@ -113,7 +116,9 @@ class PoleEmploiApiClient:
         try:
             token = caches["failsafe"].get(CACHE_API_TOKEN_KEY)
             if not token:
-                token = self._refresh_token()
+                with _refresh_token_lock:
+                    # The token may have been refreshed by another worker in the meantime.
+                    token = caches["failsafe"].get(CACHE_API_TOKEN_KEY) or self._refresh_token()
 
             response = httpx.request(
                 method,
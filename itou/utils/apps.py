@@ -1,7 +1,13 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
 from django.core.checks import Tags, register
+from django.db.models import signals
 
 from itou.utils.checks import check_verbose_name_lower
+from itou.utils.perms.cache import (
+    invalidate_member_organizations_cache,
+    invalidate_members_organizations_cache,
+    invalidate_organizations_cache,
+)
 
 
 class UtilsAppConfig(AppConfig):
@@ -11,3 +17,23 @@ class UtilsAppConfig(AppConfig):
     def ready(self):
         super().ready()
         register(Tags.models)(check_verbose_name_lower)
+
+        from itou.common_apps.address.names_index import invalidate_names_index_on_commit
+
+        for model_label in (
+            "companies.CompanyMembership",
+            "institutions.InstitutionMembership",
+            "prescribers.PrescriberMembership",
+        ):
+            signals.post_save.connect(invalidate_member_organizations_cache, sender=apps.get_model(model_label))
+            signals.post_delete.connect(invalidate_member_organizations_cache, sender=apps.get_model(model_label))
+        for model_label in ("companies.Company", "institutions.Institution", "prescribers.PrescriberOrganization"):
+            signals.m2m_changed.connect(
+                invalidate_members_organizations_cache, sender=apps.get_model(model_label).members.through
+            )
+        for model_label in ("companies.Company", "companies.SiaeConvention"):
+            signals.post_save.connect(invalidate_organizations_cache, sender=apps.get_model(model_label))
+            signals.post_delete.connect(invalidate_organizations_cache, sender=apps.get_model(model_label))
+        for model_label in ("cities.City", "asp.Commune"):
+            signals.post_save.connect(invalidate_names_index_on_commit, sender=apps.get_model(model_label))
+            signals.post_delete.connect(invalidate_names_index_on_commit, sender=apps.get_model(model_label))
@@ -1,6 +1,7 @@
 from functools import wraps
 
 from django.core.cache.backends.redis import RedisCache, RedisCacheClient
+from django.db import transaction
 from redis import exceptions as redis_exceptions
 from sentry_sdk.api import capture_exception
 
@@ -64,3 +65,12 @@ class UnclearableCache(RedisCache):
         # RedisCache calls FLUSHDB, which is not concerned with KEY_PREFIX.
         # That’s an issue for tests isolation.
         raise RuntimeError("Don’t clear the cache.")
+
+
+def invalidate_now_and_on_commit(invalidate):
+    """
+    Run `invalidate()` right away, so that the current transaction sees its changes, and again once they are
+    committed: requests are atomic, and a concurrent request could cache the previous data in between.
+    """
+    invalidate()
+    transaction.on_commit(invalidate)
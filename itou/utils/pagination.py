@@ -1,7 +1,24 @@
+import base64
+import collections.abc
+import datetime
+import json
+import uuid
+
+from django.core.exceptions import ValidationError
 from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+# Above this number of rows estimated by the planner, the results are not counted and the pages are
+# fetched with a keyset pagination.
+LARGE_QUERYSET_ROWS = 10_000
 
 
 class ItouPaginator(Paginator):
+    is_keyset = False
+    count_is_approximate = False
+
     def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, max_pages_num=10):
         super().__init__(object_list, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page)
         self.max_pages_num = max_pages_num
@@ -62,3 +79,141 @@ def pager(queryset, page, items_per_page=10, pages_num=10):
     except (EmptyPage, InvalidPage):
         # If page request is out of range, deliver last page of results.
         return paginator.page(total_pages)
+
+
+def get_approximate_count(queryset):
+    """
+    Number of rows of `queryset` estimated by the PostgreSQL planner, from the table statistics.
+
+    The query is not run: the estimate is instantaneous but can be far from the actual count,
+    only use it to display an order of magnitude.
+    """
+    [plan] = json.loads(queryset.order_by().explain(format="json"))
+    return plan["Plan"]["Plan Rows"]
+
+
+def get_keyset_filters(ordering, position):
+    """
+    Filter the results following `position`, the values of the `ordering` fields of the last result of a page:
+    (a, b, c) > (x, y, z) <=> a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+    with < instead of > for the descending fields.
+    """
+    filters = Q()
+    for i, field in enumerate(ordering):
+        equal = {name.lstrip("-"): value for name, value in zip(ordering[:i], position[:i])}
+        lookup = "lt" if field.startswith("-") else "gt"
+        filters |= Q(**equal, **{f"{field.lstrip('-')}__{lookup}": position[i]})
+    return filters
+
+
+def get_keyset_value(obj, field):
+    value = obj
+    for attr in field.split("__"):
+        value = getattr(value, attr)
+    if isinstance(value, datetime.date):
+        # Keep the microseconds, unlike DjangoJSONEncoder.
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    """
+    Return the position encoded in `cursor`, None for an empty cursor.
+    Raise ValueError when the cursor is invalid.
+    """
+    if not cursor:
+        return None
+    position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(position, list) or len(position) != len(ordering):
+        raise ValueError(f"Invalid cursor {cursor!r}")
+    return position
+
+
+class KeysetPaginator:
+    """
+    Pages are located by a cursor holding the ordering values of the last result of the previous page,
+    the ordering of the queryset must thus end with its primary key.
+
+    Unlike ItouPaginator, no offset is needed: only the first and next pages are reachable, and the results
+    are only counted when the planner estimates them to be few.
+    """
+
+    is_keyset = True
+
+    def __init__(self, queryset, per_page, approximate_count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if (
+            not self.ordering
+            or not all(isinstance(field, str) for field in self.ordering)
+            or self.ordering[-1].lstrip("-") not in ("pk", "id", queryset.model._meta.pk.name)
+        ):
+            raise ValueError(f"The ordering must end with the primary key, got {self.ordering}")
+        self.approximate_count = approximate_count
+
+    @cached_property
+    def count_is_approximate(self):
+        return self.approximate_count is not None and self.approximate_count > LARGE_QUERYSET_ROWS
+
+    @cached_property
+    def count(self):
+        if self.count_is_approximate:
+            return self.approximate_count
+        return self.queryset.count()
+
+    def page(self, cursor):
+        queryset = self.queryset
+        try:
+            position = decode_cursor(cursor, self.ordering)
+            if position is not None:
+                queryset = queryset.filter(get_keyset_filters(self.ordering, position))
+        except (TypeError, ValueError, ValidationError):
+            # If the cursor is invalid, deliver the first page of results.
+            position = None
+            queryset = self.queryset
+        # Fetch an extra result to know if there is a next page.
+        object_list = list(queryset[: self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[: self.per_page]
+            next_cursor = encode_cursor(
+                [get_keyset_value(object_list[-1], field.lstrip("-")) for field in self.ordering]
+            )
+        return KeysetPage(object_list, self, is_first=position is None, next_cursor=next_cursor)
+
+
+class KeysetPage(collections.abc.Sequence):
+    def __init__(self, object_list, paginator, is_first, next_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.is_first = is_first
+        self.next_cursor = next_cursor
+        self.display_pager = not is_first or next_cursor is not None
+
+    def __repr__(self):
+        return f"<Keyset page {self.next_cursor=}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+def large_pager(queryset, page, cursor, items_per_page=10, pages_num=10):
+    """
+    pager() for the querysets that may hold hundreds of thousands of rows: their pages are fetched with
+    a KeysetPaginator when the planner estimates the queryset to be too large to be counted, or when
+    a `cursor` is given, see KeysetPaginator.page().
+    """
+    approximate_count = get_approximate_count(queryset)
+    if cursor is None and approximate_count <= LARGE_QUERYSET_ROWS:
+        return pager(queryset, page, items_per_page=items_per_page, pages_num=pages_num)
+    return KeysetPaginator(queryset, items_per_page, approximate_count=approximate_count).page(cursor)
@@ -0,0 +1,80 @@
+"""
+Cache of the organizations resolved by `ItouCurrentOrganizationMiddleware` for each user.
+
+Only the primary keys of the organizations and the admin status are cached, the organizations themselves
+are fetched on every request since views are free to update and save them.
+"""
+
+import uuid
+
+from django.core.cache import caches
+
+from itou.utils.cache import invalidate_now_and_on_commit
+
+
+ORGANIZATIONS_CACHE_TIMEOUT = 60 * 10
+# Bumped whenever a company or a convention changes, since it may change which companies are active.
+ORGANIZATIONS_CACHE_VERSION_KEY = "organizations:version"
+
+
+def get_organizations_cache_key(user_pk):
+    return f"organizations:{user_pk}"
+
+
+def get_memberships(user, model, compute_memberships):
+    """
+    Return the active memberships of `user` as a list of (organization, is_admin) and whether the user
+    has any active membership at all, even to an inactive organization.
+
+    `compute_memberships()` resolves them from the database on a cache miss, following requests only
+    fetch the organizations of `model`.
+    """
+    cache = caches["failsafe"]
+    cache_key = get_organizations_cache_key(user.pk)
+    cached = cache.get_many([cache_key, ORGANIZATIONS_CACHE_VERSION_KEY]) or {}
+    version = cached.get(ORGANIZATIONS_CACHE_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(ORGANIZATIONS_CACHE_VERSION_KEY, version, None)
+
+    infos = cached.get(cache_key)
+    if infos is not None and infos["version"] == version:
+        organizations = model.objects.in_bulk([org_pk for org_pk, _is_admin in infos["memberships"]])
+        memberships = [
+            (organizations[org_pk], is_admin) for org_pk, is_admin in infos["memberships"] if org_pk in organizations
+        ]
+        return memberships, infos["has_active_memberships"]
+
+    memberships, has_active_memberships = compute_memberships()
+    cache.set(
+        cache_key,
+        {
+            "version": version,
+            "memberships": [(org.pk, is_admin) for org, is_admin in memberships],
+            "has_active_memberships": has_active_memberships,
+        },
+        ORGANIZATIONS_CACHE_TIMEOUT,
+    )
+    return memberships, has_active_memberships
+
+
+def invalidate_member_organizations_cache(sender, instance, **kwargs):
+    cache_key = get_organizations_cache_key(instance.user_id)
+    invalidate_now_and_on_commit(lambda: caches["failsafe"].delete(cache_key))
+
+
+def invalidate_members_organizations_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    # Memberships created with `members.add()` are bulk created without any post_save signal.
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    user_pks = [instance.pk] if reverse else pk_set or []
+    cache_keys = [get_organizations_cache_key(user_pk) for user_pk in user_pks]
+    invalidate_now_and_on_commit(lambda: caches["failsafe"].delete_many(cache_keys))
+    if action == "post_clear" and not reverse:
+        invalidate_organizations_cache()
+
+
+def invalidate_organizations_cache(*args, **kwargs):
+    invalidate_now_and_on_commit(
+        lambda: caches["failsafe"].set(ORGANIZATIONS_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+    )
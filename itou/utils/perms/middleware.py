@@ -1,3 +1,5 @@
+import functools
+
 from django.conf import settings
 from django.contrib import messages
 from django.http import HttpResponseRedirect
@@ -5,22 +7,30 @@ from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
+from itou.companies.models import Company
+from itou.institutions.models import Institution
+from itou.prescribers.models import PrescriberOrganization
 from itou.users.enums import IdentityProvider, UserKind
 from itou.utils import constants as global_constants
+from itou.utils.perms.cache import get_memberships
 from itou.www.login import urls as login_urls
 
 
-def extract_membership_infos_and_update_session(memberships, org_through_field, session):
+@functools.cache
+def get_login_routes():
+    return frozenset([reverse(f"login:{url.name}") for url in login_urls.urlpatterns] + [reverse("account_login")])
+
+
+def extract_membership_infos_and_update_session(memberships, session):
     current_org_pk = session.get(global_constants.ITOU_SESSION_CURRENT_ORGANIZATION_KEY)
     orgs = []
     current_org = None
     admin_status = {}
-    for membership in memberships:
-        org = getattr(membership, org_through_field)
+    for org, is_admin in memberships:
         orgs.append(org)
         if org.pk == current_org_pk:
             current_org = org
-        admin_status[org.pk] = membership.is_admin
+        admin_status[org.pk] = is_admin
     if current_org is None:
         if orgs:
             # If an org exists, choose the first one
@@ -47,43 +57,54 @@ class ItouCurrentOrganizationMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
+    @staticmethod
+    def get_employer_memberships(user):
+        active_memberships = list(user.companymembership_set.filter(is_active=True).order_by("created_at"))
+        companies = {
+            company.pk: company
+            for company in user.company_set.filter(
+                pk__in=[membership.company_id for membership in active_memberships]
+            ).active_or_in_grace_period()
+        }
+        really_active_memberships = []
+        for membership in active_memberships:
+            if membership.company_id in companies:
+                # The company is active (or in grace period)
+                membership.company = companies[membership.company_id]
+                really_active_memberships.append(membership)
+        # If there is no current company, we want to default to the first active one
+        # (and preferably not one in grace period)
+        really_active_memberships.sort(key=lambda m: (m.company.has_convention_in_grace_period, m.created_at))
+        memberships = [(membership.company, membership.is_admin) for membership in really_active_memberships]
+        return memberships, bool(active_memberships)
+
+    @staticmethod
+    def get_organization_memberships(memberships, org_through_field):
+        memberships = [
+            (getattr(membership, org_through_field), membership.is_admin)
+            for membership in memberships.filter(is_active=True).order_by("created_at")
+        ]
+        return memberships, bool(memberships)
+
     def __call__(self, request):
         user = request.user
 
         redirect_message = None
         if user.is_authenticated:
             if user.is_employer:
-                active_memberships = list(user.companymembership_set.filter(is_active=True).order_by("created_at"))
-                companies = {
-                    company.pk: company
-                    for company in user.company_set.filter(
-                        pk__in=[membership.company_id for membership in active_memberships]
-                    ).active_or_in_grace_period()
-                }
-                really_active_memberships = []
-                for membership in active_memberships:
-                    if membership.company_id in companies:
-                        # The company is active (or in grace period)
-                        membership.company = companies[membership.company_id]
-                        really_active_memberships.append(membership)
-                # If there is no current company, we want to default to the first active one
-                # (and preferably not one in grace period)
-                really_active_memberships.sort(key=lambda m: (m.company.has_convention_in_grace_period, m.created_at))
-
+                memberships, has_active_memberships = get_memberships(
+                    user, Company, functools.partial(self.get_employer_memberships, user)
+                )
                 (
                     request.organizations,
                     request.current_organization,
                     request.is_current_organization_admin,
-                ) = extract_membership_infos_and_update_session(
-                    really_active_memberships,
-                    "company",
-                    request.session,
-                )
+                ) = extract_membership_infos_and_update_session(memberships, request.session)
 
                 if not request.current_organization:
                     # SIAE user has no active SIAE and thus must not be able to access any page,
                     # thus we force a logout with a few exceptions (cf skip_middleware_conditions)
-                    if not active_memberships:
+                    if not has_active_memberships:
                         redirect_message = mark_safe(
                             "Nous sommes désolés, votre compte n'est "
                             "actuellement rattaché à aucune structure.<br>"
@@ -101,30 +122,36 @@ class ItouCurrentOrganizationMiddleware:
                         )
 
             elif user.is_prescriber:
+                memberships, _has_active_memberships = get_memberships(
+                    user,
+                    PrescriberOrganization,
+                    functools.partial(
+                        self.get_organization_memberships,
+                        user.prescribermembership_set.select_related("organization"),
+                        "organization",
+                    ),
+                )
                 (
                     request.organizations,
                     request.current_organization,
                     request.is_current_organization_admin,
-                ) = extract_membership_infos_and_update_session(
-                    user.prescribermembership_set.filter(is_active=True)
-                    .order_by("created_at")
-                    .select_related("organization"),
-                    "organization",
-                    request.session,
-                )
+                ) = extract_membership_infos_and_update_session(memberships, request.session)
 
             elif user.is_labor_inspector:
+                memberships, _has_active_memberships = get_memberships(
+                    user,
+                    Institution,
+                    functools.partial(
+                        self.get_organization_memberships,
+                        user.institutionmembership_set.select_related("institution"),
+                        "institution",
+                    ),
+                )
                 (
                     request.organizations,
                     request.current_organization,
                     request.is_current_organization_admin,
-                ) = extract_membership_infos_and_update_session(
-                    user.institutionmembership_set.filter(is_active=True)
-                    .order_by("created_at")
-                    .select_related("institution"),
-                    "institution",
-                    request.session,
-                )
+                ) = extract_membership_infos_and_update_session(memberships, request.session)
                 if not request.current_organization:
                     redirect_message = mark_safe(
                         "Nous sommes désolés, votre compte n'est "
@@ -138,9 +165,8 @@ class ItouCurrentOrganizationMiddleware:
         # - View two: user is added to the group.
         # In view two, the user is authenticated but he does not belong to any group.
         # This raises an error so we skip the middleware only in this case.
-        login_routes = [reverse(f"login:{url.name}") for url in login_urls.urlpatterns] + [reverse("account_login")]
         skip_middleware_conditions = [
-            request.path in login_routes,
+            request.path in get_login_routes(),
             request.path.startswith("/invitations/") and not request.path.startswith("/invitations/invite"),
             request.path.startswith("/signup/siae/join"),  # employer about to join a company
             request.path.startswith("/signup/facilitator/join"),  # facilitator about to join a company
@@ -1,20 +1,30 @@
+import copy
+import json
 import logging
 
+from anymail.backends import mailjet
+from anymail.exceptions import AnymailRequestsAPIError
+from anymail.message import AnymailRecipientStatus, AnymailStatus
+from anymail.utils import update_deep
 from django.conf import settings
 from django.core.mail import get_connection
 from django.core.mail.backends.base import BaseEmailBackend
 from django.core.mail.message import EmailMessage
-from huey.contrib.djhuey import task
+from huey.contrib.djhuey import HUEY, task
 
 from itou.utils.iterators import chunks
 
 
+logger = logging.getLogger(__name__)
+
 # Reduce verbosity of huey logs (INFO by default)
 logging.getLogger("huey").setLevel(logging.WARNING)
 
 
 # Mailjet max number of recipients (CC, BCC, TO)
 _MAILJET_MAX_RECIPIENTS = 50
+# Mailjet max number of messages per Send API call
+_MAILJET_MAX_MESSAGES = 50
 _EMAIL_KEYS = ("from_email", "cc", "bcc", "subject", "body")
 
 
@@ -52,6 +62,74 @@ def sanitize_mailjet_recipients(email_message):
     return sanitized_emails
 
 
+class MailjetBatchEmailBackend(mailjet.EmailBackend):
+    """
+    Mailjet backend sending the messages by batches of `_MAILJET_MAX_MESSAGES` per Send API call,
+    instead of one call per message.
+
+    Mailjet reports a status for each message of a batch: the failed messages are logged instead of
+    raising, which would send again the rest of the batch when the task is retried.
+    """
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+
+        created_session = self.open()
+        try:
+            return sum(self._send_batch(batch) for batch in chunks(email_messages, _MAILJET_MAX_MESSAGES))
+        finally:
+            if created_session:
+                self.close()
+
+    def _send_batch(self, email_messages):
+        messages_payloads = []
+        for message in email_messages:
+            message.anymail_status = AnymailStatus()
+            if self.run_pre_send(message) and message.recipients():
+                messages_payloads.append((message, self.build_message_payload(message, self.send_defaults)))
+        if not messages_payloads:
+            return 0
+
+        # Each payload holds a single message, with most of its parameters in Globals.
+        api_messages = []
+        for _message, payload in messages_payloads:
+            [api_message] = payload.data["Messages"]
+            message_data = copy.deepcopy(payload.data["Globals"])
+            update_deep(message_data, api_message)
+            api_messages.append(message_data)
+        first_message, first_payload = messages_payloads[0]
+        batch_payload = copy.copy(first_payload)
+        batch_payload.data = {"Messages": api_messages}
+
+        response = self.post_to_esp(batch_payload, first_message)
+        parsed_response = self.deserialize_json_response(response, batch_payload, first_message)
+        if "ErrorCode" in parsed_response or len(parsed_response.get("Messages", [])) != len(messages_payloads):
+            raise AnymailRequestsAPIError(
+                email_message=first_message, payload=batch_payload, response=response, backend=self
+            )
+
+        sent = 0
+        for (message, payload), result in zip(messages_payloads, parsed_response["Messages"]):
+            message.anymail_status.esp_response = response
+            status = "sent" if result["Status"] == "success" else "failed"
+            recipient_status = {
+                recipient["Email"]: AnymailRecipientStatus(message_id=str(recipient["MessageID"]), status=status)
+                for recipient in result.get("To", []) + result.get("Cc", []) + result.get("Bcc", [])
+            }
+            for email in payload.recipients:
+                recipient_status.setdefault(email.addr_spec, AnymailRecipientStatus(message_id=None, status="failed"))
+            message.anymail_status.set_recipient_status(recipient_status)
+            self.run_post_send(message)
+            if status == "sent":
+                sent += 1
+            else:
+                logger.error(
+                    "Mailjet refused a message subject=%r errors=%s", message.subject, result.get("Errors", [])
+                )
+        return sent
+
+
 # Custom async email backend wrapper
 # ----------------------------------
 
@@ -108,6 +186,72 @@ def _async_send_messages(serializable_email_messages):
     return len(messages)
 
 
+# Messages waiting for the next flush, serialized with `_serializeEmailMessage`.
+_EMAIL_QUEUE_KEY = "emails:queue"
+# Batch moved out of the queue, kept until its sending task is enqueued.
+_EMAIL_BATCH_KEY = "emails:batch"
+_EMAIL_FLUSH_SCHEDULED_KEY = "emails:flush_scheduled"
+# Flushes share the batch key, only one of them may run at a time.
+_EMAIL_FLUSH_LOCK_KEY = "emails:flush_lock"
+
+
+def _queue_email_messages(serializable_email_messages):
+    """
+    Queue the messages until the flush scheduled at most `SEND_EMAIL_BATCH_WINDOW_IN_SECONDS` from now,
+    so that emails sent one by one (e.g. notifications to all the members of an organization) end up
+    in a few batches.
+    """
+    conn = HUEY.storage.conn
+    conn.rpush(_EMAIL_QUEUE_KEY, *[json.dumps(email) for email in serializable_email_messages])
+    # Only the first messages of a window schedule the flush. The key expires in case the flush is lost.
+    window = settings.SEND_EMAIL_BATCH_WINDOW_IN_SECONDS
+    if conn.set(_EMAIL_FLUSH_SCHEDULED_KEY, 1, nx=True, ex=window * 10):
+        _async_flush_email_queue.schedule(delay=window)
+    return len(serializable_email_messages)
+
+
+def _move_email_batch(conn):
+    # Atomically move the next batch out of the queue, so that it's never held by the worker only.
+    with conn.pipeline(transaction=True) as pipe:
+        for _ in range(_MAILJET_MAX_MESSAGES):
+            pipe.lmove(_EMAIL_QUEUE_KEY, _EMAIL_BATCH_KEY)
+        pipe.execute()
+
+
+@task()
+def _async_flush_email_queue():
+    conn = HUEY.storage.conn
+    window = settings.SEND_EMAIL_BATCH_WINDOW_IN_SECONDS
+    # The lock expires in case the worker holding it is lost.
+    lock = conn.lock(_EMAIL_FLUSH_LOCK_KEY, timeout=window * 10)
+    if not lock.acquire(blocking=False):
+        # Another flush is running, come back later for the messages queued after it emptied the queue.
+        _async_flush_email_queue.schedule(delay=window)
+        return
+    try:
+        # Messages queued from now on will schedule another flush.
+        conn.delete(_EMAIL_FLUSH_SCHEDULED_KEY)
+        queue_depth = conn.llen(_EMAIL_QUEUE_KEY)
+        batches_nb = 0
+        while True:
+            # A batch left over by an interrupted flush is sent first.
+            if not conn.exists(_EMAIL_BATCH_KEY):
+                _move_email_batch(conn)
+            serialized_emails = conn.lrange(_EMAIL_BATCH_KEY, 0, -1)
+            if not serialized_emails:
+                break
+            # Each batch is sent (and retried) by its own task.
+            _async_send_messages([json.loads(serialized_email) for serialized_email in serialized_emails])
+            conn.delete(_EMAIL_BATCH_KEY)
+            batches_nb += 1
+    finally:
+        lock.release()
+    logger.info(
+        "Flushed the emails queue",
+        extra={"email_queue_depth": queue_depth, "email_batches_count": batches_nb},
+    )
+
+
 class AsyncEmailBackend(BaseEmailBackend):
     """Custom async email backend wrapper
 
@@ -117,6 +261,7 @@ class AsyncEmailBackend(BaseEmailBackend):
     This class:
     * wraps an email backend defined in `settings.ASYNC_EMAIL_BACKEND`
     * delegate the actual email sending to a function with *serializable* parameters
+    * coalesces the messages sent within `settings.SEND_EMAIL_BATCH_WINDOW_IN_SECONDS`
 
     See `_async_send_messages` for more on details on the serialization and
     asynchronous processing
@@ -128,4 +273,7 @@ class AsyncEmailBackend(BaseEmailBackend):
 
         emails = [_serializeEmailMessage(email) for email in email_messages]
 
+        # Without a consumer, tasks are run right away and scheduled ones would never run.
+        if settings.SEND_EMAIL_BATCH_WINDOW_IN_SECONDS and not HUEY.immediate:
+            return _queue_email_messages(emails)
         return _async_send_messages(emails)
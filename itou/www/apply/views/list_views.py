@@ -10,7 +10,8 @@ from itou.companies.enums import SIAE_WITH_CONVENTION_KINDS
 from itou.eligibility.models import SelectedAdministrativeCriteria
 from itou.job_applications.export import stream_xlsx_export
 from itou.job_applications.models import JobApplicationWorkflow
-from itou.utils.pagination import pager
+from itou.users.models import prefetch_latest_approvals
+from itou.utils.pagination import large_pager, pager
 from itou.utils.perms.company import get_current_company_or_404
 from itou.utils.perms.prescriber import get_all_available_job_applications_as_prescriber
 from itou.utils.urls import get_safe_url
@@ -32,7 +33,7 @@ def _add_pending_for_weeks(job_applications):
     for job_app in job_applications:
         pending_for_weeks = None
         if job_app.state in JobApplicationWorkflow.PENDING_STATES:
-            pending_for_seconds = (timezone.now() - job_app.last_change).total_seconds()
+            pending_for_seconds = (timezone.now() - (job_app.last_change_at or job_app.created_at)).total_seconds()
             pending_for_weeks = int(pending_for_seconds // SECONDS_IN_WEEK)
         job_app.pending_for_weeks = pending_for_weeks
 
@@ -117,7 +118,9 @@ def list_for_prescriber(request, template_name="apply/list_for_prescriber.html")
         job_applications = filters_form.filter(job_applications)
         filters_counter = filters_form.get_qs_filters_counter()
 
-    job_applications_page = pager(job_applications, request.GET.get("page"), items_per_page=10)
+    job_applications_page = large_pager(
+        job_applications, request.GET.get("page"), request.GET.get("cursor"), items_per_page=10
+    )
     _add_pending_for_weeks(job_applications_page)
     _add_user_can_view_personal_information(job_applications_page, request.user.can_view_personal_information)
     _add_administrative_criteria(job_applications_page)
@@ -163,7 +166,7 @@ def list_for_prescriber_exports_download(request, month_identifier=None):
     List of applications for a prescriber for a given month identifier (YYYY-mm),
     exported as a CSV file with immediate download
     """
-    job_applications = get_all_available_job_applications_as_prescriber(request).with_list_related_data()
+    job_applications = get_all_available_job_applications_as_prescriber(request).order_by("-created_at", "pk")
     filename = "candidatures"
     if month_identifier:
         year, month = month_identifier.split("-")
@@ -196,8 +199,12 @@ def list_for_siae(request, template_name="apply/list_for_siae.html"):
         job_applications = filters_form.filter(job_applications)
         filters_counter = filters_form.get_qs_filters_counter()
 
-    job_applications_page = pager(job_applications, request.GET.get("page"), items_per_page=10)
+    job_applications_page = large_pager(
+        job_applications, request.GET.get("page"), request.GET.get("cursor"), items_per_page=10
+    )
     _add_pending_for_weeks(job_applications_page)
+    # The cards display the PASS IAE of each job seeker.
+    prefetch_latest_approvals([job_application.job_seeker for job_application in job_applications_page])
 
     # SIAE members have access to personal info
     _add_user_can_view_personal_information(job_applications_page, lambda ja: True)
@@ -249,7 +256,7 @@ def list_for_siae_exports_download(request, month_identifier=None):
     exported as a CSV file with immediate download
     """
     company = get_current_company_or_404(request)
-    job_applications = company.job_applications_received.not_archived().with_list_related_data()
+    job_applications = company.job_applications_received.not_archived().order_by("-created_at", "pk")
     filename = f"candidatures-{slugify(company.display_name)}"
     if month_identifier:
         year, month = month_identifier.split("-")
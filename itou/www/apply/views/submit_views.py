@@ -17,6 +17,7 @@ from django.utils.html import format_html
 from django.views.generic import TemplateView
 
 from itou.approvals.models import Approval
+from itou.communications.dispatch.email import send_email_notifications
 from itou.companies.enums import CompanyKind
 from itou.companies.models import Company, JobDescription
 from itou.eligibility.models import EligibilityDiagnosis
@@ -1093,8 +1094,9 @@ class ApplicationResumeView(ApplicationBaseView):
                     companymembership__company=job_application.to_company,
                     companymembership__is_active=True,
                 )
-                for employer in company_recipients:
-                    job_application.notifications_new_for_employer(employer).send()
+                send_email_notifications(
+                    [job_application.notifications_new_for_employer(employer) for employer in company_recipients]
+                )
                 job_application.notifications_new_for_job_seeker.send()
                 if request.user.is_prescriber:
                     job_application.notifications_new_for_proxy.send()
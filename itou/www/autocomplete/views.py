@@ -1,14 +1,10 @@
 from datetime import datetime
 
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import F, Q, Value
-from django.db.models.functions import Least, Lower, NullIf, StrIndex
 from django.http import JsonResponse
 from django.urls import reverse_lazy
-from unidecode import unidecode
 
-from itou.asp.models import Commune
-from itou.cities.models import City
+from itou.common_apps.address.names_index import get_cities_index, get_communes_index
 from itou.jobs.models import Appellation
 from itou.users.models import User
 from itou.utils.decorators import settings_protected_view
@@ -18,31 +14,6 @@ from itou.utils.decorators import settings_protected_view
 MAX_CITIES_TO_RETURN = 50
 
 
-def autocomplete_name(qs, term, extra_ordering_by):
-    term = unidecode(term.lower())
-    term_spaced = term.replace("-", " ")
-    term_hyphenated = term.replace(" ", "-")
-    # We started with a trigram similarity and word similarity approach. It is disappointing
-    # since it does return results that are not expected, for instance results containing
-    # letters not present in the search.
-    # It has been decided with the UX to use the simplest approach. It seems that most
-    # people look for a city by "the start of the name", not by "any word within the name"
-    # so the icontains lookup, ordered by index of the matching string, feels more natural.
-    # The hyphenated/unhyphenated thing has been added considering the mess that hyphens
-    # represent in french city names. It should be improved in the future to handle cases
-    # such as search terms “La Chapelle du” not finding La Chapelle-du-Châtelard.
-
-    return (
-        qs.filter(Q(name__unaccent__icontains=term_spaced) | Q(name__unaccent__icontains=term_hyphenated))
-        .annotate(
-            spaced_index=NullIf(StrIndex(Lower("name__unaccent"), Value(term_spaced)), 0),
-            hyphenated_index=NullIf(StrIndex(Lower("name__unaccent"), Value(term_hyphenated)), 0),
-            best_index=Least(F("spaced_index"), F("hyphenated_index")),
-        )
-        .order_by(F("best_index").asc(nulls_last=True), "name", extra_ordering_by)
-    )
-
-
 def cities_autocomplete(request):
     """
     Returns JSON data compliant with the jQuery UI Autocomplete Widget:
@@ -57,10 +28,11 @@ def cities_autocomplete(request):
     cities = []
 
     if term:
+        cities_index = get_cities_index()
         if term.isdigit():
-            cities = City.objects.filter(post_codes__contains=[term]).order_by("name", "department")
+            cities = cities_index.search_code(term)
         else:
-            cities = autocomplete_name(City.objects.all(), term, extra_ordering_by="department")
+            cities = cities_index.search_name(term)
 
         if select2_mode:
             cities = [
@@ -128,12 +100,13 @@ def communes_autocomplete(request):
         # Can't extract date in ISO format: use today as fallback
         dt = datetime.now()
 
-    active_communes_qs = Commune.objects.filter(start_date__lte=dt).filter(Q(end_date=None) | Q(end_date__gt=dt))
     if term:
+        communes_index = get_communes_index()
         if term.isdigit():
-            communes = active_communes_qs.filter(code__startswith=term).order_by("name", "code")
+            communes = communes_index.search_code(term, prefix=True)
         else:
-            communes = autocomplete_name(active_communes_qs, term, extra_ordering_by="code")
+            communes = communes_index.search_name(term)
+        communes = [commune for commune in communes if commune.is_active(dt.date())]
 
         if select2_mode:
             communes = [
@@ -5,7 +5,8 @@ from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
-from django.db.models import F
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.http import Http404, HttpResponseForbidden, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
@@ -24,6 +25,7 @@ from itou.employee_record.enums import Status
 from itou.employee_record.models import EmployeeRecord
 from itou.institutions.models import Institution
 from itou.job_applications.enums import JobApplicationState
+from itou.job_applications.models import JobApplication
 from itou.openid_connect.inclusion_connect import constants as ic_constants
 from itou.prescribers.models import PrescriberOrganization
 from itou.siae_evaluations.models import EvaluatedSiae, EvaluationCampaign
@@ -43,6 +45,43 @@ from itou.www.search.forms import SiaeSearchForm
 from itou.www.stats import utils as stats_utils
 
 
+def get_employer_dashboard_counters(company, **job_applications_states):
+    """
+    Compute the employer dashboard badges counters in a single query.
+
+    Each keyword argument gives the name of a counter of the job applications received by `company`
+    in the given states. The rejected employee records are always counted, as `rejected_employee_records`.
+    """
+
+    def count(queryset, group_by):
+        # A subquery is way more efficient here than a join.
+        # See `CompanyQuerySet.with_count_recent_received_job_apps`.
+        return Coalesce(
+            Subquery(
+                queryset.values(group_by).annotate(count=Count("pk")).values("count"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    job_applications = JobApplication.objects.filter(to_company=OuterRef("pk"))
+    return (
+        Company.objects.filter(pk=company.pk)
+        .annotate(
+            rejected_employee_records=count(
+                EmployeeRecord.objects.for_company(OuterRef("pk")).filter(status=Status.REJECTED),
+                "job_application__to_company",
+            ),
+            **{
+                name: count(job_applications.filter(state__in=states), "to_company")
+                for name, states in job_applications_states.items()
+            },
+        )
+        .values("rejected_employee_records", *job_applications_states)
+        .get()
+    )
+
+
 def _employer_dashboard_context(request):
     current_org = get_current_company_or_404(request)
     states_to_process = [JobApplicationState.NEW, JobApplicationState.PROCESSING]
@@ -63,9 +102,15 @@ def _employer_dashboard_context(request):
             "badge": "bg-info-lighter",
         },
     ]
-    job_applications = current_org.job_applications_received.values("state").all()
-    for category in job_applications_categories:
-        category["counter"] = len([ja for ja in job_applications if ja["state"] in category["states"]])
+    counters = get_employer_dashboard_counters(
+        current_org,
+        **{
+            f"job_applications_category_{i}": category["states"]
+            for i, category in enumerate(job_applications_categories)
+        },
+    )
+    for i, category in enumerate(job_applications_categories):
+        category["counter"] = counters[f"job_applications_category_{i}"]
         category["url"] = f"{reverse('apply:list_for_siae')}?{'&'.join([f'states={c}' for c in category['states']])}"
 
     show_eiti_webinar_banner = current_org.kind == CompanyKind.EITI
@@ -90,9 +135,7 @@ def _employer_dashboard_context(request):
             .select_related("evaluation_campaign")
         ),
         "job_applications_categories": job_applications_categories,
-        "num_rejected_employee_records": (
-            EmployeeRecord.objects.for_company(current_org).filter(status=Status.REJECTED).count()
-        ),
+        "num_rejected_employee_records": counters["rejected_employee_records"],
         "show_eiti_webinar_banner": show_eiti_webinar_banner,
         "siae_suspension_text_with_dates": (
             current_org.get_active_suspension_text_with_dates()
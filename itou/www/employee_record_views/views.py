@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.db.models import Count, Exists, OuterRef
+from django.db.models.functions import Coalesce
 from django.http.response import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
@@ -113,8 +114,7 @@ class AddView(LoginRequiredMixin, NamedUrlSessionWizardView):
             job_application = (
                 JobApplication.objects.filter(to_company=self.company, approval=approval)
                 .accepted()
-                .with_accepted_at()
-                .latest("accepted_at")
+                .latest(Coalesce("accepted_at", "created_at"))
             )
             return HttpResponseRedirect(
                 reverse("employee_record_views:create", kwargs={"job_application_id": job_application.pk})
@@ -0,0 +1,14 @@
+from django.apps import AppConfig, apps
+from django.db.models import signals
+
+from itou.www.search.cache import invalidate_search_cache
+
+
+class SearchAppConfig(AppConfig):
+    name = "itou.www.search"
+
+    def ready(self):
+        super().ready()
+        for model_label in ("companies.Company", "companies.JobDescription"):
+            signals.post_save.connect(invalidate_search_cache, sender=apps.get_model(model_label))
+            signals.post_delete.connect(invalidate_search_cache, sender=apps.get_model(model_label))
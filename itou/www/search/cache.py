@@ -0,0 +1,49 @@
+"""
+Short lived cache of the employers and job descriptions search results.
+
+Searches rely on spatial queries over all companies and job descriptions, which are way too expensive
+to run again on every page change or tab switch: the ordered ids of the results and the filters choices
+are cached instead, and each page only fetches its own objects.
+"""
+
+import hashlib
+import json
+import uuid
+
+from django.core.cache import caches
+
+from itou.utils.cache import invalidate_now_and_on_commit
+
+
+SEARCH_CACHE_PREFIX = "search"
+SEARCH_CACHE_TIMEOUT = 60 * 5
+SEARCH_CACHE_VERSION_KEY = f"{SEARCH_CACHE_PREFIX}:version"
+
+
+def get_search_cache_version(cache):
+    version = cache.get(SEARCH_CACHE_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(SEARCH_CACHE_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_search_cache(*args, **kwargs):
+    """
+    Make every cached search outdated, meant to be connected to the companies and job descriptions signals.
+    """
+    invalidate_now_and_on_commit(lambda: caches["failsafe"].set(SEARCH_CACHE_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def get_or_set_search_cache(name, params, compute):
+    """
+    Return the value cached for this search `params`, computing and caching it with `compute()` when missing.
+    """
+    cache = caches["failsafe"]
+    params_hash = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    cache_key = f"{SEARCH_CACHE_PREFIX}:{get_search_cache_version(cache)}:{name}:{params_hash}"
+    value = cache.get(cache_key)
+    if value is None:
+        value = compute()
+        cache.set(cache_key, value, SEARCH_CACHE_TIMEOUT)
+    return value
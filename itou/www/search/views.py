@@ -13,6 +13,7 @@ from itou.companies.models import Company, JobDescription
 from itou.job_applications.models import JobApplication, JobApplicationWorkflow
 from itou.prescribers.models import PrescriberOrganization
 from itou.utils.pagination import pager
+from itou.www.search.cache import get_or_set_search_cache
 from itou.www.search.forms import JobDescriptionSearchForm, PrescriberSearchForm, SiaeSearchForm
 
 
@@ -23,6 +24,13 @@ INSEE_CODES_WITH_DISTRICTS = {"13055", "75056", "69123"}
 PageAndCounts = namedtuple("PageAndCounts", ("results_page", "siaes_count", "job_descriptions_count"))
 
 
+def get_job_description_distance(coords):
+    return Case(
+        When(location__isnull=False, then=Distance("location__coords", coords) / 1000),
+        When(location__isnull=True, then=Distance("company__coords", coords) / 1000),
+    )
+
+
 def employer_search_home(request, template_name="search/siaes_search_home.html"):
     context = {"siae_search_form": SiaeSearchForm()}
     return render(request, template_name, context)
@@ -68,25 +76,18 @@ class EmployerSearchBaseView(FormView):
         # this enables not losing the count while changing tabs.
         contract_types = form.cleaned_data.get("contract_types", self.request.GET.getlist("contract_types", []))
 
-        siaes = (
-            Company.objects.active()
-            .within(city.coords, distance)
-            .annotate(distance=Distance("coords", city.coords) / 1000)
-        )
+        siaes = Company.objects.active().within(city.coords, distance)
         job_descriptions = (
-            JobDescription.objects.active()
-            .within(city.coords, distance)
-            .select_related("company", "location", "appellation")
-            .exclude(company__block_job_applications=True)
-            .annotate(
-                distance=Case(
-                    When(location__isnull=False, then=Distance("location__coords", city.coords) / 1000),
-                    When(location__isnull=True, then=Distance("company__coords", city.coords) / 1000),
-                )
-            )
+            JobDescription.objects.active().within(city.coords, distance).exclude(company__block_job_applications=True)
         )
 
-        self.add_form_choices(form, siaes, job_descriptions)
+        # The filters choices only depend on the searched area.
+        form_choices = get_or_set_search_cache(
+            f"{self.__class__.__name__}:choices",
+            {"city": city.pk, "distance": distance},
+            lambda: self.get_form_choices(city, siaes, job_descriptions),
+        )
+        self.add_form_choices(form, form_choices)
 
         if kinds:
             siaes = siaes.filter(kind__in=kinds)
@@ -121,16 +122,32 @@ class EmployerSearchBaseView(FormView):
                 query |= Q(appellation__rome__code__startswith=domain)
             job_descriptions = job_descriptions.filter(query)
 
+        clean_company_pk = None
         company = self.request.GET.get("company")
         if company:
             try:
                 clean_company_pk = int(company)
             except ValueError:
-                clean_company_pk = None
+                pass
             else:
                 siaes = siaes.filter(pk=clean_company_pk)
 
-        results_and_counts = self.get_results_page_and_counts(siaes, job_descriptions)
+        # Both tabs share the same results, switching tab or page only fetches the objects to display.
+        results_ids = get_or_set_search_cache(
+            "results",
+            {
+                "city": city.pk,
+                "distance": distance,
+                "kinds": sorted(kinds),
+                "contract_types": sorted(contract_types),
+                "departments": sorted(departments),
+                "districts": sorted(districts),
+                "domains": sorted(domains),
+                "company": clean_company_pk,
+            },
+            lambda: self.get_results_ids(siaes, job_descriptions),
+        )
+        results_and_counts = self.get_results_page_and_counts(city, results_ids)
 
         context = {
             "form": form,
@@ -155,9 +172,40 @@ class EmployerSearchBaseView(FormView):
         }
         return render(self.request, self.get_template_names(), self.get_context_data(**context))
 
+    def get_results_ids(self, siaes, job_descriptions):
+        siaes = (
+            siaes
+            # For sorting let's put siaes in only 2 buckets (boolean has_active_members).
+            # If we sort naively by `-_total_active_members` we would show
+            # siaes with 10 members (where 10 is the max), then siaes
+            # with 9 members, then siaes with 8 members etc...
+            # This is clearly not what we want. We want to show siaes with members
+            # (whatever the number of members is) then siaes without members.
+            .with_has_active_members()
+            # Sort in 4 subgroups in the following order, each subgroup being sorted by job_app_score.
+            # 1) has_active_members and not block_job_applications
+            # These are the siaes which can currently hire, and should be on top.
+            # 2) has_active_members and block_job_applications
+            # These are the siaes currently blocking job applications, they should
+            # be rather high in the list since they are likely to hire again.
+            # 3) not has_active_members and not block_job_applications
+            # These are the siaes with no member, they should show last.
+            # 4) not has_active_members and block_job_applications
+            # This group is supposed to be empty. But itou staff may have
+            # detached members from their siae so it could still happen.
+            .order_by("-has_active_members", "block_job_applications", "job_app_score", "pk")
+        )
+        job_descriptions = job_descriptions.order_by(
+            F("source_kind").asc(nulls_first=True), "-updated_at", "-created_at"
+        )
+        return {
+            "siaes": list(siaes.values_list("pk", flat=True)),
+            "job_descriptions": list(job_descriptions.values_list("pk", flat=True)),
+        }
+
 
 class EmployerSearchView(EmployerSearchBaseView):
-    def add_form_choices(self, form, siaes, _job_descriptions):
+    def get_form_choices(self, city, siaes, _job_descriptions):
         # Extract departments from results to inject them as filters
         # The DB contains around 4k SIAE (always fast in Python and no need of iterator())
         departments = set()
@@ -173,65 +221,56 @@ class EmployerSearchView(EmployerSearchBaseView):
                     if int(siae.post_code) <= DEPARTMENTS_WITH_DISTRICTS[siae.department]["max"]:
                         departments_districts[siae.department].add(siae.post_code)
 
-        if departments:
-            departments = sorted(departments)
-            form.add_field_departements(departments)
+        if city.code_insee not in INSEE_CODES_WITH_DISTRICTS:
+            departments_districts = {}
+        return {
+            "departments": sorted(departments),
+            "districts": {department: sorted(districts) for department, districts in departments_districts.items()},
+            "companies": company_choices,
+        }
 
-        city = form.cleaned_data["city"]
-        if departments_districts and city.code_insee in INSEE_CODES_WITH_DISTRICTS:
-            for department, districts in departments_districts.items():
-                districts = sorted(districts)
-                form.add_field_districts(department, districts)
+    def add_form_choices(self, form, form_choices):
+        if form_choices["departments"]:
+            form.add_field_departements(form_choices["departments"])
 
-        if company_choices:
-            form.add_field_company(company_choices)
+        for department, districts in form_choices["districts"].items():
+            form.add_field_districts(department, districts)
 
-    def get_results_page_and_counts(self, siaes, job_descriptions):
+        if form_choices["companies"]:
+            form.add_field_company(form_choices["companies"])
+
+    def get_results_page_and_counts(self, city, results_ids):
+        page = pager(results_ids["siaes"], self.request.GET.get("page"), items_per_page=10)
         siaes = (
-            siaes.prefetch_related(
+            Company.objects.filter(pk__in=page.object_list)
+            .annotate(distance=Distance("coords", city.coords) / 1000)
+            .with_has_active_members()
+            .prefetch_related(
                 Prefetch(
                     lookup="job_description_through",
                     queryset=JobDescription.objects.with_annotation_is_popular()
-                    .filter(company__in=siaes, is_active=True)
+                    .filter(is_active=True)
                     .select_related("appellation", "location", "company"),
                     to_attr="active_job_descriptions",
                 )
             )
-            # For sorting let's put siaes in only 2 buckets (boolean has_active_members).
-            # If we sort naively by `-_total_active_members` we would show
-            # siaes with 10 members (where 10 is the max), then siaes
-            # with 9 members, then siaes with 8 members etc...
-            # This is clearly not what we want. We want to show siaes with members
-            # (whatever the number of members is) then siaes without members.
-            .with_has_active_members()
-            # Sort in 4 subgroups in the following order, each subgroup being sorted by job_app_score.
-            # 1) has_active_members and not block_job_applications
-            # These are the siaes which can currently hire, and should be on top.
-            # 2) has_active_members and block_job_applications
-            # These are the siaes currently blocking job applications, they should
-            # be rather high in the list since they are likely to hire again.
-            # 3) not has_active_members and not block_job_applications
-            # These are the siaes with no member, they should show last.
-            # 4) not has_active_members and block_job_applications
-            # This group is supposed to be empty. But itou staff may have
-            # detached members from their siae so it could still happen.
-            .order_by("-has_active_members", "block_job_applications", "job_app_score", "pk")
+            .in_bulk()
         )
-
-        page = pager(siaes, self.request.GET.get("page"), items_per_page=10)
+        # Keep the cached order, and skip companies deleted in the meantime.
+        page.object_list = [siaes[pk] for pk in page.object_list if pk in siaes]
         return PageAndCounts(
             results_page=page,
             siaes_count=page.paginator.count,
-            job_descriptions_count=job_descriptions.count(),
+            job_descriptions_count=len(results_ids["job_descriptions"]),
         )
 
 
 class JobDescriptionSearchView(EmployerSearchBaseView):
     form_class = JobDescriptionSearchForm
 
-    def add_form_choices(self, form, _siaes, job_descriptions):
+    def get_form_choices(self, _city, _siaes, job_descriptions):
         departments = set()
-        for job_description in job_descriptions:
+        for job_description in job_descriptions.select_related("company", "location"):
             department = None
             if job_description.location:
                 department = job_description.location.department
@@ -247,34 +286,40 @@ class JobDescriptionSearchView(EmployerSearchBaseView):
             if department:
                 departments.add(department)
 
-        if departments:
-            departments = sorted(departments)
-            form.add_field_departements(departments)
+        return {"departments": sorted(departments)}
 
-    def get_results_page_and_counts(self, siaes, job_descriptions):
-        job_descriptions = job_descriptions.order_by(
-            F("source_kind").asc(nulls_first=True), "-updated_at", "-created_at"
-        )
+    def add_form_choices(self, form, form_choices):
+        if form_choices["departments"]:
+            form.add_field_departements(form_choices["departments"])
 
-        page = pager(job_descriptions, self.request.GET.get("page"), items_per_page=10)
+    def get_results_page_and_counts(self, city, results_ids):
+        page = pager(results_ids["job_descriptions"], self.request.GET.get("page"), items_per_page=10)
         # Prefer a prefetch_related over annotating the entire queryset with_annotation_is_popular().
         # That annotation is quite expensive and PostgreSQL runs it on the entire queryset, even
         # though we don’t sort or group by that column. It would be smarter to apply the limit
         # before computing the annotation, but that’s not what PostgreSQL 15 does on 2024-02-21.
-        page.object_list = page.object_list.prefetch_related(
-            Prefetch(
-                "jobapplication_set",
-                to_attr="jobapplication_set_pending",
-                queryset=JobApplication.objects.filter(state__in=JobApplicationWorkflow.PENDING_STATES),
+        job_descriptions = (
+            JobDescription.objects.filter(pk__in=page.object_list)
+            .select_related("company", "location", "appellation")
+            .annotate(distance=get_job_description_distance(city.coords))
+            .prefetch_related(
+                Prefetch(
+                    "jobapplication_set",
+                    to_attr="jobapplication_set_pending",
+                    queryset=JobApplication.objects.filter(state__in=JobApplicationWorkflow.PENDING_STATES),
+                )
             )
+            .in_bulk()
         )
+        # Keep the cached order, and skip job descriptions deleted in the meantime.
+        page.object_list = [job_descriptions[pk] for pk in page.object_list if pk in job_descriptions]
         for job_description in page.object_list:
             job_description.is_popular = (
                 len(job_description.jobapplication_set_pending) >= job_description._meta.model.POPULAR_THRESHOLD
             )
         return PageAndCounts(
             results_page=page,
-            siaes_count=siaes.count(),
+            siaes_count=len(results_ids["siaes"]),
             job_descriptions_count=page.paginator.count,
         )
 
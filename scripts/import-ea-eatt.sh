@@ -30,6 +30,7 @@ mkdir -p "$OUTPUT_PATH"
 # Perform the necessary data imports
 export ASP_FLUX_IAE_DIR="$FLUX_IAE_DIR"
 time ./manage.py import_ea_eatt --wet-run --verbosity=2 |& tee -a "$OUTPUT_PATH/output_$(date '+%Y-%m-%d_%H-%M-%S').log"
+time ./manage.py snapshot_data_inclusion_structures
 
 # Destroy the cleartext data
 rm -rf "$FLUX_IAE_DIR"
@@ -32,6 +32,7 @@ mkdir -p "$OUTPUT_PATH/import_siae"
 export ASP_FLUX_IAE_DIR="$FLUX_IAE_DIR"
 time ./manage.py populate_metabase_fluxiae --verbosity 2 |& tee -a "$OUTPUT_PATH/populate_metabase_fluxiae/output_$(date '+%Y-%m-%d_%H-%M-%S').log"
 time ./manage.py import_siae --wet-run --verbosity=2 |& tee -a "$OUTPUT_PATH/import_siae/output_$(date '+%Y-%m-%d_%H-%M-%S').log"
+time ./manage.py snapshot_data_inclusion_structures
 
 # Destroy the cleartext data
 rm -rf "$FLUX_IAE_DIR"
@@ -0,0 +1,87 @@
+import socket
+import struct
+import threading
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from itou.antivirus import clamd
+from itou.antivirus.models import Scan
+from itou.utils.storage.s3 import s3_client
+from tests.files.factories import FileFactory
+
+
+@pytest.fixture
+def fake_clamd(tmp_path):
+    socket_path = str(tmp_path / "clamd.ctl")
+    received = []
+
+    def serve(server):
+        conn, _addr = server.accept()
+        with conn:
+            data = b""
+            while not data.startswith(b"zINSTREAM\0") or not data.endswith(struct.pack("!L", 0)):
+                data += conn.recv(4096)
+            data = data.removeprefix(b"zINSTREAM\0")
+            while (size := struct.unpack("!L", data[:4])[0]) != 0:
+                received.append(data[4 : 4 + size])
+                data = data[4 + size :]
+            reply = b"stream: Win.Test.EICAR_HDB-1 FOUND\0" if b"EICAR" in b"".join(received) else b"stream: OK\0"
+            conn.sendall(reply)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(socket_path)
+        server.listen()
+        thread = threading.Thread(target=serve, args=(server,))
+        thread.start()
+        yield socket_path, received
+        thread.join(timeout=5)
+
+
+@pytest.mark.parametrize(
+    "chunks,signature",
+    [
+        ([b"Hello ", b"", b"world"], None),
+        ([b"X5O!P%@AP", b"EICAR"], "Win.Test.EICAR_HDB-1"),
+    ],
+)
+def test_instream(fake_clamd, chunks, signature):
+    socket_path, received = fake_clamd
+    assert clamd.instream(iter(chunks), socket_path=socket_path) == signature
+    # Empty chunks would end the stream.
+    assert received == [chunk for chunk in chunks if chunk]
+
+
+def test_parse_reply():
+    assert clamd.parse_reply("stream: OK") is None
+    assert clamd.parse_reply("stream: Win.Test.EICAR_HDB-1 FOUND") == "Win.Test.EICAR_HDB-1"
+    with pytest.raises(clamd.ClamdError, match="INSTREAM size limit exceeded. ERROR"):
+        clamd.parse_reply("INSTREAM size limit exceeded. ERROR")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scan_s3_files_with_clamd(temporary_bucket, mocker):
+    client = s3_client()
+    clean_file = FileFactory()
+    infected_file = FileFactory()
+    client.put_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=clean_file.key, Body=b"Hello world")
+    client.put_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=infected_file.key, Body=b"EICAR")
+
+    def fake_instream(chunks):
+        return "Win.Test.EICAR_HDB-1" if b"EICAR" in b"".join(chunks) else None
+
+    instream = mocker.patch("itou.antivirus.clamd.instream", side_effect=fake_instream)
+    call_command("scan_s3_files", "--clamd", "--workers", "2")
+
+    clean_scan = Scan.objects.get(file=clean_file)
+    assert clean_scan.infected is False
+    assert clean_scan.clamav_signature == ""
+    assert clean_scan.clamav_completed_at is not None
+    infected_scan = Scan.objects.get(file=infected_file)
+    assert infected_scan.infected is True
+    assert infected_scan.clamav_signature == "Win.Test.EICAR_HDB-1"
+
+    # Recently scanned files are not scanned again.
+    call_command("scan_s3_files", "--clamd", "--workers", "2")
+    assert instream.call_count == 2
@@ -1,8 +1,13 @@
+import datetime
+
+from django.core.management import call_command
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient, APITestCase
 
 from itou.companies.enums import CompanyKind
 from itou.companies.models import Company
+from itou.prescribers.models import PrescriberOrganization
 from tests.companies.factories import CompanyFactory, SiaeConventionFactory
 from tests.prescribers.factories import PrescriberOrganizationFactory
 from tests.users.factories import EmployerFactory, PrescriberFactory
@@ -12,6 +17,7 @@ from ..utils import _str_with_tz
 
 
 NUM_QUERIES = BASE_NUM_QUERIES
+NUM_QUERIES += 1  # snapshot
 NUM_QUERIES += 1  # count
 NUM_QUERIES += 1  # get siae / organization
 
@@ -170,6 +176,26 @@ class DataInclusionSiaeStructureTest(APITestCase):
 
         assert structure_data_list[0]["siret"] == company.siret[:9]  # fake nic is removed
 
+    def test_list_structures_snapshot_since_related_changes(self):
+        company_1 = CompanyFactory(siret="10000000000001", kind=CompanyKind.ACI)
+        call_command("snapshot_data_inclusion_structures")
+
+        # Only the other structures sharing the SIRET change, which makes company_1 an antenne.
+        since = timezone.now()
+        company_2 = CompanyFactory(siret=company_1.siret, kind=CompanyKind.EI)
+        call_command("snapshot_data_inclusion_structures")
+
+        response = self.authenticated_client.get(
+            self.url, format="json", data={"type": "siae", "since": since.isoformat()}
+        )
+        assert response.status_code == 200
+        structure_data_list = response.json()["results"]
+        assert [structure_data["id"] for structure_data in structure_data_list] == [
+            str(company_1.uid),
+            str(company_2.uid),
+        ]
+        assert [structure_data["antenne"] for structure_data in structure_data_list] == [True, True]
+
     def test_list_structures_duplicated_siret(self):
         company_1 = CompanyFactory(siret="10000000000001", kind=CompanyKind.ACI)
         company_2 = CompanyFactory(siret=company_1.siret, kind=CompanyKind.EI)
@@ -328,3 +354,84 @@ class DataInclusionPrescriberStructureTest(APITestCase):
         structure_data = response.json()["results"][0]
         assert structure_data["presentation_resume"] == orga.description[:279] + "…"
         assert structure_data["presentation_detail"] == orga.description
+
+    def test_list_structures_cursor_pagination(self):
+        created_at = timezone.now()
+        orga_1 = PrescriberOrganizationFactory(created_at=created_at - datetime.timedelta(days=1))
+        # Same creation date, ordered by pk.
+        orga_2 = PrescriberOrganizationFactory(created_at=created_at)
+        orga_3 = PrescriberOrganizationFactory(created_at=created_at)
+
+        num_queries = NUM_QUERIES
+        num_queries -= 1  # no count
+        with self.assertNumQueries(num_queries):
+            response = self.authenticated_client.get(
+                self.url,
+                format="json",
+                data={"type": "orga", "cursor": "", "page_size": 2},
+            )
+        assert response.status_code == 200
+        data = response.json()
+        assert list(data) == ["next", "results"]
+        assert [structure["id"] for structure in data["results"]] == [str(orga_1.uid), str(orga_2.uid)]
+
+        # Created after the first page, appears at the end without shifting the next pages.
+        orga_4 = PrescriberOrganizationFactory()
+        with self.assertNumQueries(num_queries):
+            response = self.authenticated_client.get(data["next"], format="json")
+        assert response.status_code == 200
+        data = response.json()
+        assert [structure["id"] for structure in data["results"]] == [str(orga_3.uid), str(orga_4.uid)]
+        assert data["next"] is None
+
+        response = self.authenticated_client.get(
+            self.url, format="json", data={"type": "orga", "cursor": "invalid", "page_size": 2}
+        )
+        assert response.status_code == 404
+
+    def test_list_structures_snapshot(self):
+        orga_1 = PrescriberOrganizationFactory()
+        orga_2 = PrescriberOrganizationFactory()
+        live_data = self.authenticated_client.get(self.url, format="json", data={"type": "orga"}).json()
+
+        call_command("snapshot_data_inclusion_structures")
+        with self.assertNumQueries(NUM_QUERIES):
+            response = self.authenticated_client.get(self.url, format="json", data={"type": "orga"})
+        assert response.status_code == 200
+        assert response.json() == live_data
+        etag = response["ETag"]
+        last_modified = response["Last-Modified"]
+
+        # Nothing changed.
+        call_command("snapshot_data_inclusion_structures")
+        num_queries = NUM_QUERIES
+        num_queries -= 2  # no count and no structures
+        with self.assertNumQueries(num_queries):
+            response = self.authenticated_client.get(
+                self.url, format="json", data={"type": "orga"}, HTTP_IF_NONE_MATCH=etag
+            )
+        assert response.status_code == 304
+        response = self.authenticated_client.get(
+            self.url, format="json", data={"type": "orga"}, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        assert response.status_code == 304
+
+        since = timezone.now()
+        PrescriberOrganization.objects.filter(pk=orga_2.pk).update(name="Nouveau nom")
+        call_command("snapshot_data_inclusion_structures")
+        response = self.authenticated_client.get(
+            self.url, format="json", data={"type": "orga"}, HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert [structure["nom"] for structure in response.json()["results"]] == [orga_1.name, "Nouveau nom"]
+
+        # The bulk update did not change `updated_at`, the structure is still returned.
+        response = self.authenticated_client.get(
+            self.url, format="json", data={"type": "orga", "since": since.isoformat()}
+        )
+        assert response.status_code == 200
+        assert [structure["id"] for structure in response.json()["results"]] == [str(orga_2.uid)]
+
+        response = self.authenticated_client.get(self.url, format="json", data={"type": "orga", "since": "hier"})
+        assert response.status_code == 400
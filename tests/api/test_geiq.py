@@ -210,3 +210,37 @@ def test_civilite_mapping(title, outcome):
 )
 def test_label_mappings(choices_class, mapping):
     assert set(choices_class.values) == set(mapping.values())
+
+
+def test_candidatures_geiq_cursor_pagination():
+    client = _api_client()
+    company = CompanyFactory(kind=CompanyKind.GEIQ)
+    job_applications = sorted(
+        [
+            JobApplicationFactory(
+                with_geiq_eligibility_diagnosis=True,
+                was_hired=True,
+                to_company=company,
+                job_seeker__last_name="Doe",
+                job_seeker__first_name="John",
+            )
+            for _ in range(3)
+        ],
+        # Same SIRET and job seeker names, ordered by pk.
+        key=lambda job_application: job_application.pk,
+    )
+    _api_token_for([company])
+
+    response = client.get(reverse("v1:geiq_jobapplication_list"), {"cursor": "", "page_size": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert [result["id_embauche"] for result in data["results"]] == [
+        str(job_application.pk) for job_application in job_applications[:2]
+    ]
+
+    # The next link holds the UUID primary key of the last result.
+    response = client.get(data["next"])
+    assert response.status_code == 200
+    data = response.json()
+    assert [result["id_embauche"] for result in data["results"]] == [str(job_applications[2].pk)]
+    assert data["next"] is None
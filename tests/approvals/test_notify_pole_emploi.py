@@ -643,6 +643,32 @@ class ApprovalsSendToPeManagementTestCase(TestCase):
             approval.refresh_from_db()
             assert approval.pe_notification_status == api_enums.PEApiNotificationStatus.READY
 
+    @patch.object(CancelledApproval, "notify_pole_emploi")
+    @patch.object(Approval, "notify_pole_emploi")
+    @patch("itou.utils.throttling.TokenBucket.acquire")
+    def test_send_concurrently(self, acquire_mock, notify_mock, cancelled_notify_mock):
+        stdout = io.StringIO()
+        approvals = ApprovalFactory.create_batch(3, with_jobapplication=True)
+        cancelled_approvals = [
+            CancelledApprovalFactory(start_at=datetime.datetime.today().date() - datetime.timedelta(days=i))
+            for i in range(2)
+        ]
+        management.call_command(
+            "send_approvals_to_pe",
+            wet_run=True,
+            workers=4,
+            rate=0.1,
+            stdout=stdout,
+        )
+        output = stdout.getvalue().split("\n")
+        # 0.1 request per second during a run, 2 requests per approval.
+        assert output[0] == "approvals needing to be sent count=3, batch count=14"
+        assert "cancelled approvals needing to be sent count=2, batch count=11" in output
+        assert notify_mock.call_count == len(approvals)
+        assert cancelled_notify_mock.call_count == len(cancelled_approvals)
+        assert acquire_mock.call_count == 5
+        acquire_mock.assert_called_with(2)
+
 
 @override_settings(
     API_ESD={
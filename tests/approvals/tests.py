@@ -35,6 +35,7 @@ from itou.users.enums import LackOfPoleEmploiId
 from itou.utils.apis import enums as api_enums
 from tests.approvals.factories import (
     ApprovalFactory,
+    CancelledApprovalFactory,
     PoleEmploiApprovalFactory,
     ProlongationFactory,
     ProlongationRequestFactory,
@@ -200,12 +201,14 @@ class ApprovalModelTest(TestCase):
             approval.save()
 
     def test_get_next_number_no_preexisting_approval(self):
+        Approval.sync_number_sequence()
         expected_number = f"{Approval.ASP_ITOU_PREFIX}0000001"
         next_number = Approval.get_next_number()
         assert next_number == expected_number
 
     def test_get_next_number_with_preexisting_approval(self):
         ApprovalFactory(number=f"{Approval.ASP_ITOU_PREFIX}0000040")
+        Approval.sync_number_sequence()
         expected_number = f"{Approval.ASP_ITOU_PREFIX}0000041"
         next_number = Approval.get_next_number()
         assert next_number == expected_number
@@ -213,6 +216,7 @@ class ApprovalModelTest(TestCase):
     def test_get_next_number_with_preexisting_pe_approval(self):
         # With pre-existing Pôle emploi approval.
         ApprovalFactory(number="625741810182", origin_pe_approval=True)
+        Approval.sync_number_sequence()
         expected_number = f"{Approval.ASP_ITOU_PREFIX}0000001"
         next_number = Approval.get_next_number()
         assert next_number == expected_number
@@ -220,6 +224,7 @@ class ApprovalModelTest(TestCase):
     def test_get_next_number_with_both_preexisting_objects(self):
         ApprovalFactory(number=f"{Approval.ASP_ITOU_PREFIX}8888882")
         ApprovalFactory(number="625741810182", origin_pe_approval=True)
+        Approval.sync_number_sequence()
         expected_number = f"{Approval.ASP_ITOU_PREFIX}8888883"
         next_number = Approval.get_next_number()
         assert next_number == expected_number
@@ -228,15 +233,35 @@ class ApprovalModelTest(TestCase):
         demo_prefix = "XXXXX"
         with mock.patch.object(Approval, "ASP_ITOU_PREFIX", demo_prefix):
             ApprovalFactory(number=f"{demo_prefix}0044440")
+            Approval.sync_number_sequence()
             expected_number = f"{demo_prefix}0044441"
             next_number = Approval.get_next_number()
             assert next_number == expected_number
 
     def test_get_next_number_last_possible_number(self):
         ApprovalFactory(number=f"{Approval.ASP_ITOU_PREFIX}9999999")
+        Approval.sync_number_sequence()
+        # The sequence is not rolled back with the test transaction.
+        self.addCleanup(Approval.sync_number_sequence, 0)
         with pytest.raises(RuntimeError):
             Approval.get_next_number()
 
+    def test_get_next_number_after_cancelled_approval(self):
+        CancelledApprovalFactory(number=f"{Approval.ASP_ITOU_PREFIX}0000050")
+        ApprovalFactory(number=f"{Approval.ASP_ITOU_PREFIX}0000040")
+        Approval.sync_number_sequence()
+        assert Approval.get_next_number() == f"{Approval.ASP_ITOU_PREFIX}0000051"
+        assert Approval.get_next_number() == f"{Approval.ASP_ITOU_PREFIX}0000052"
+
+    def test_get_next_number_skips_numbers_issued_since_the_last_sync(self):
+        ApprovalFactory(number=f"{Approval.ASP_ITOU_PREFIX}0000040")
+        Approval.sync_number_sequence()
+        # Issued by other means, e.g. by an instance running the previous code during a deploy.
+        ApprovalFactory(number=f"{Approval.ASP_ITOU_PREFIX}0000041")
+        CancelledApprovalFactory(number=f"{Approval.ASP_ITOU_PREFIX}0000042")
+        assert Approval.get_next_number() == f"{Approval.ASP_ITOU_PREFIX}0000043"
+        assert Approval.get_next_number() == f"{Approval.ASP_ITOU_PREFIX}0000044"
+
     def test_cannot_mass_delete_approvals(self):
         with pytest.raises(NotImplementedError):
             Approval.objects.all().delete()
@@ -1736,6 +1761,10 @@ class ApprovalConcurrentModelTest(TransactionTestCase):
     This way we can appropriately test the select_for_update() behaviour.
     """
 
+    def setUp(self):
+        super().setUp()
+        Approval.sync_number_sequence()
+
     def test_nominal_process(self):
         with transaction.atomic():
             # create a first approval out of the blue, ensure the number is correct.
@@ -1751,15 +1780,9 @@ class ApprovalConcurrentModelTest(TransactionTestCase):
             assert approval_2.number == "XXXXX0000002"
 
     def test_race_condition(self):
-        """Demonstrate the issue where two concurrent requests are locking the last row of
-        the Approval table (effectively, preventing each other from modifying it at the same
-        time) but still be wrong in evaluating the next number: the selected line is the same
-        so the number also is.
-        What we can do though is selecting the FIRST line just for locking (cheap semaphore)
-        and then select the last one.
+        """Two concurrent requests, each one saving its approval after the other one got its number,
+        must not get the same number.
         """
-        # create a first Approval so that the last() in get_next_number actually has something
-        # to select_for_update() and will effectively lock the last row.
         with transaction.atomic():
             ApprovalFactory(user=JobSeekerFactory(), number=None)
 
@@ -1813,6 +1836,35 @@ class ApprovalConcurrentModelTest(TransactionTestCase):
         assert approval.number == "XXXXX0000002"
         assert approval2.number == "XXXXX0000003"
 
+    def test_get_next_number_concurrently(self):
+        numbers = []
+        broken_barriers = []
+        threads_count = 10
+        numbers_per_thread = 20
+        # Every thread waits with its transaction open until all the others got a number:
+        # a lock held by get_next_number() until the end of the transaction would break the barrier.
+        barrier = threading.Barrier(threads_count, timeout=10)
+
+        def request():
+            try:
+                for _ in range(numbers_per_thread):
+                    with transaction.atomic():
+                        numbers.append(Approval.get_next_number())
+                        barrier.wait()
+            except threading.BrokenBarrierError as e:
+                broken_barriers.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=request) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert broken_barriers == []
+        assert sorted(numbers) == [f"XXXXX{i:07d}" for i in range(1, threads_count * numbers_per_thread + 1)]
+
 
 class PENotificationMixinTestCase(TestCase):
     def test_base_values(self):
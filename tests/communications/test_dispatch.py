@@ -1,9 +1,11 @@
 from django.core import mail
+from django.core.cache import caches
 
 from itou.communications import registry as notifications_registry
 from itou.communications.apps import sync_notifications
+from itou.communications.cache import get_disabled_notifications_cache_key, get_settings_key
 from itou.communications.dispatch.base import BaseNotification
-from itou.communications.dispatch.email import EmailNotification
+from itou.communications.dispatch.email import EmailNotification, send_email_notifications
 from itou.communications.dispatch.utils import (
     EmployerNotification,
     JobSeekerNotification,
@@ -12,6 +14,7 @@ from itou.communications.dispatch.utils import (
     WithStructureMixin,
 )
 from itou.communications.models import NotificationRecord, NotificationSettings
+from tests.prescribers.factories import PrescriberMembershipFactory
 from tests.users.factories import EmployerFactory, JobSeekerFactory, PrescriberFactory
 from tests.utils.test import TestCase
 
@@ -200,6 +203,43 @@ class EmailNotificationTest(FakeNotificationClassesMixin, TestCase):
         assert mail.outbox[0].to == [self.user.email]
         assert "Cet email est envoyé depuis un environnement de démonstration" in mail.outbox[0].body
 
+    def test_send_email_notifications(self):
+        other_user = PrescriberMembershipFactory(organization=self.organization).user
+        disabled_user = PrescriberMembershipFactory(organization=self.organization).user
+        settings, _ = NotificationSettings.get_or_create(disabled_user, self.organization)
+        settings.disabled_notifications.set(
+            [NotificationRecord.objects.get(notification_class=self.ManageableNotification.__name__)]
+        )
+
+        with self.assertNumQueries(1):  # Disabled notifications of all the recipients
+            send_email_notifications(
+                [
+                    self.ManageableNotification(user, self.organization)
+                    for user in [self.user, other_user, disabled_user]
+                ]
+            )
+        assert [email.to for email in mail.outbox] == [[self.user.email], [other_user.email]]
+
+        # The disabled notifications are cached
+        with self.assertNumQueries(0):
+            assert not self.ManageableNotification(disabled_user, self.organization).should_send()
+        # until they change.
+        settings.disabled_notifications.clear()
+        with self.assertNumQueries(1):
+            assert self.ManageableNotification(disabled_user, self.organization).should_send()
+
+    def test_disabled_notifications_cache_is_invalidated_on_commit(self):
+        settings, _ = NotificationSettings.get_or_create(self.user, self.organization)
+        notification_record = NotificationRecord.objects.get(notification_class=self.ManageableNotification.__name__)
+        cache_key = get_disabled_notifications_cache_key(get_settings_key(self.user, self.organization))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.disabled_notifications.add(notification_record)
+            # A concurrent request caches the disabled notifications it read before the commit.
+            caches["failsafe"].set(cache_key, [])
+        with self.assertNumQueries(1):
+            assert not self.ManageableNotification(self.user, self.organization).should_send()
+
 
 class ProfiledNotificationTest(TestCase):
     def setUp(self):
@@ -18,7 +18,12 @@ from itou.companies.management.commands._import_siae.siae import (
     check_whether_signup_is_possible_for_all_siaes,
     create_new_siaes,
 )
-from itou.companies.management.commands._import_siae.utils import anonymize_fluxiae_df, could_siae_be_deleted
+from itou.companies.management.commands._import_siae.utils import (
+    anonymize_fluxiae_df,
+    could_siae_be_deleted,
+    get_fluxiae_df,
+    get_fluxiae_df_chunks,
+)
 from itou.companies.management.commands._import_siae.vue_af import (
     get_conventions_by_siae_key,
     get_vue_af_df,
@@ -28,6 +33,7 @@ from itou.companies.management.commands._import_siae.vue_structure import (
     get_vue_structure_df,
 )
 from itou.companies.models import Company
+from itou.metabase.dataframes import infer_columns_from_df, infer_columns_from_first_values
 from tests.approvals.factories import ApprovalFactory
 from tests.companies.factories import CompanyFactory, CompanyWith2MembershipsFactory, SiaeConventionFactory
 from tests.eligibility.factories import EligibilityDiagnosisMadeBySiaeFactory
@@ -220,6 +226,18 @@ class ImportSiaeManagementCommandsTest(TestCase):
         )
 
 
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+@pytest.mark.parametrize("vue_name", ["fluxIAE_AnnexeFinanciere", "fluxIAE_Structure"])
+@override_settings(ASP_FLUX_IAE_DIR=Path(settings.APPS_DIR) / "companies/fixtures", METABASE_HASH_SALT="foobar2000")
+def test_get_fluxiae_df_chunks(vue_name, chunk_size):
+    df = get_fluxiae_df(vue_name)
+    with get_fluxiae_df_chunks(vue_name, chunk_size=chunk_size) as (first_values, df_chunks):
+        chunks = list(df_chunks)
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df, check_dtype=False)
+    assert infer_columns_from_first_values(first_values) == infer_columns_from_df(df)
+
+
 @override_settings(METABASE_HASH_SALT="foobar2000")
 def test_hashed_approval_number():
     df = pd.DataFrame(data={"salarie_agrement": ["999992012369", None, ""]})
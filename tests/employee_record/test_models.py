@@ -678,6 +678,7 @@ class TestEmployeeRecordQueryset:
     "archive,expected_archive",
     [
         ('{"Hello": "World"}', {"Hello": "World"}),
+        ({"Hello": "World"}, {"Hello": "World"}),
         ("{}", {}),
         ("", ""),
         (None, None),
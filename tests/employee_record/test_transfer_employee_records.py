@@ -3,7 +3,8 @@ import json
 
 import freezegun
 import pytest
-from django.test.utils import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils import timezone
 
 from itou.employee_record.enums import NotificationStatus, Status
@@ -227,3 +228,41 @@ def test_duplicates_with_an_extension_update_the_existing_new_notification(sftp_
     notification = employee_record.update_notifications.get()
     assert notification.status == Status.NEW
     assert notification.updated_at == expected_updated_at
+
+
+@freezegun.freeze_time("2021-09-27")
+def test_download_updates_the_batch_at_once(sftp_directory, command):
+    processed, duplicate, rejected = EmployeeRecordFactory.create_batch(3, ready_for_transfer=True)
+    SuspensionFactory(approval=duplicate.job_application.approval)
+
+    with CaptureQueriesContext(connection) as ctx:
+        command.handle(upload=True, download=False, preflight=False, wet_run=True)
+    assert len([query for query in ctx.captured_queries if query["sql"].startswith("UPDATE")]) == 1
+
+    codes = {}
+    for employee_record, code in [(processed, "0000"), (duplicate, "3436"), (rejected, "3308")]:
+        employee_record.refresh_from_db()
+        assert employee_record.status == Status.SENT
+        codes[employee_record.asp_batch_line_number] = code
+    [file] = sftp_directory.joinpath("depot").iterdir()
+    batch = json.loads(file.read_text())
+    for employee_record in batch["lignesTelechargement"]:
+        code = codes[employee_record["numLigne"]]
+        employee_record["codeTraitement"] = code
+        employee_record["libelleTraitement"] = f"Code {code}"
+    sftp_directory.joinpath("retrait", EmployeeRecordBatch.feedback_filename(file.name)).write_text(json.dumps(batch))
+
+    with CaptureQueriesContext(connection) as ctx:
+        command.handle(upload=False, download=True, preflight=False, wet_run=True)
+    assert len([query for query in ctx.captured_queries if query["sql"].startswith("UPDATE")]) == 1
+
+    for employee_record in [processed, duplicate, rejected]:
+        employee_record.refresh_from_db()
+    assert processed.status == Status.PROCESSED
+    assert processed.archived_json["libelleTraitement"] == "Code 0000"
+    assert duplicate.status == Status.PROCESSED
+    assert duplicate.processed_as_duplicate is True
+    assert duplicate.update_notifications.get().status == Status.NEW
+    assert rejected.status == Status.REJECTED
+    assert rejected.asp_processing_code == "3308"
+    assert rejected.archived_json["libelleTraitement"] == "Code 3308"
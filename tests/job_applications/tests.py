@@ -1,8 +1,11 @@
 import datetime
+import importlib
 import json
+from unittest import mock
 
 import pytest
 from dateutil.relativedelta import relativedelta
+from django.apps import apps
 from django.conf import settings
 from django.core import mail
 from django.core.exceptions import ValidationError
@@ -381,16 +384,14 @@ class JobApplicationQuerySetTest(TestCase):
         assert hasattr(qs, "has_suspended_approval")
         assert not qs.has_suspended_approval
 
-    def test_with_last_change(self):
+    def test_last_change_at(self):
         job_app = JobApplicationSentByJobSeekerFactory()
-        qs = JobApplication.objects.with_last_change().get(pk=job_app.pk)
-        assert hasattr(qs, "last_change")
-        assert qs.last_change == job_app.created_at
+        assert job_app.last_change_at == job_app.created_at
 
-        job_app.process()
-        qs = JobApplication.objects.with_last_change().get(pk=job_app.pk)
-        last_change = job_app.logs.order_by("-timestamp").first()
-        assert qs.last_change == last_change.timestamp
+        with freeze_time(job_app.created_at + datetime.timedelta(days=1)):
+            job_app.process()
+        job_app.refresh_from_db()
+        assert job_app.last_change_at == job_app.logs.get().timestamp
 
     def test_with_jobseeker_eligibility_diagnosis(self):
         job_app = JobApplicationFactory(with_approval=True)
@@ -620,47 +621,51 @@ class JobApplicationQuerySetTest(TestCase):
         )
         assert job_app not in JobApplication.objects.eligible_as_employee_record(job_app.to_company)
 
-    def test_with_accepted_at_for_created_from_pe_approval(self):
-        JobApplicationFactory(
+    def test_accepted_at_for_created_from_pe_approval(self):
+        job_application = JobApplicationFactory(
             state=JobApplicationState.ACCEPTED,
             origin=Origin.PE_APPROVAL,
         )
-
-        job_application = JobApplication.objects.with_accepted_at().first()
         assert job_application.accepted_at == job_application.created_at
 
-    def test_with_accepted_at_for_accept_transition(self):
+    def test_accepted_at_for_accept_transition(self):
         job_application = JobApplicationSentByCompanyFactory()
         job_application.process()
-        job_application.accept(user=job_application.sender)
+        with freeze_time(job_application.created_at + datetime.timedelta(days=1)):
+            job_application.accept(user=job_application.sender)
 
-        expected_created_at = JobApplicationTransitionLog.objects.filter(
+        expected_accepted_at = JobApplicationTransitionLog.objects.get(
             job_application=job_application,
             transition=JobApplicationWorkflow.TRANSITION_ACCEPT,
-        ).aggregate(timestamp=Max("timestamp"))["timestamp"]
-        assert JobApplication.objects.with_accepted_at().first().accepted_at == expected_created_at
+        ).timestamp
+        job_application.refresh_from_db()
+        assert job_application.accepted_at == expected_accepted_at
+        assert job_application.last_change_at == expected_accepted_at
 
-    def test_with_accepted_at_with_multiple_transitions(self):
+    def test_accepted_at_with_multiple_transitions(self):
+        Approval.sync_number_sequence()
         job_application = JobApplicationSentByCompanyFactory()
         job_application.process()
         job_application.accept(user=job_application.sender)
         assert job_application.approval.number == "XXXXX0000001"
         job_application.cancel(user=job_application.sender)
-        job_application.accept(user=job_application.sender)
+        with freeze_time(job_application.created_at + datetime.timedelta(days=1)):
+            job_application.accept(user=job_application.sender)
         assert job_application.approval.number == "XXXXX0000002"
-        job_application.cancel(user=job_application.sender)
+        with freeze_time(job_application.created_at + datetime.timedelta(days=2)):
+            job_application.cancel(user=job_application.sender)
         assert list(CancelledApproval.objects.order_by("number").values_list("number", flat=True)) == [
             "XXXXX0000001",
             "XXXXX0000002",
         ]
 
-        expected_created_at = JobApplicationTransitionLog.objects.filter(
+        expected_accepted_at = JobApplicationTransitionLog.objects.filter(
             job_application=job_application,
             transition=JobApplicationWorkflow.TRANSITION_ACCEPT,
         ).aggregate(timestamp=Max("timestamp"))["timestamp"]
-        # We should not have more job applications
-        assert JobApplication.objects.with_accepted_at().count() == JobApplication.objects.count()
-        assert JobApplication.objects.with_accepted_at().first().accepted_at == expected_created_at
+        job_application.refresh_from_db()
+        assert job_application.accepted_at == expected_accepted_at
+        assert job_application.last_change_at == expected_accepted_at + datetime.timedelta(days=1)
 
     def test_accept_without_sender(self):
         job_application = JobApplicationFactory(sent_by_authorized_prescriber_organisation=True)
@@ -676,29 +681,51 @@ class JobApplicationQuerySetTest(TestCase):
             recipients.append(recipient)
         assert recipients == [job_application.job_seeker.email, employer.email]
 
-    def test_with_accepted_at_default_value(self):
+    def test_accepted_at_default_value(self):
         job_application = JobApplicationSentByCompanyFactory()
-
-        assert JobApplication.objects.with_accepted_at().first().accepted_at is None
+        assert job_application.accepted_at is None
 
         job_application.process()  # 1 transition but no accept
-        assert JobApplication.objects.with_accepted_at().first().accepted_at is None
+        job_application.refresh_from_db()
+        assert job_application.accepted_at is None
 
         job_application.refuse(job_application.sender)  # 2 transitions, still no accept
-        assert JobApplication.objects.with_accepted_at().first().accepted_at is None
+        job_application.refresh_from_db()
+        assert job_application.accepted_at is None
 
-    def test_with_accepted_at_for_accepted_with_no_transition(self):
-        JobApplicationSentByCompanyFactory(state=JobApplicationState.ACCEPTED)
-        job_application = JobApplication.objects.with_accepted_at().first()
+    def test_accepted_at_for_accepted_with_no_transition(self):
+        job_application = JobApplicationSentByCompanyFactory(state=JobApplicationState.ACCEPTED)
         assert job_application.accepted_at == job_application.created_at
 
-    def test_with_accepted_at_for_ai_stock(self):
-        JobApplicationFactory(origin=Origin.AI_STOCK)
-
-        job_application = JobApplication.objects.with_accepted_at().first()
+    def test_accepted_at_for_ai_stock(self):
+        job_application = JobApplicationFactory(origin=Origin.AI_STOCK)
         assert job_application.accepted_at.date() == job_application.hiring_start_at
         assert job_application.accepted_at != job_application.created_at
 
+    def test_fill_last_change_at_accepted_at_migration(self):
+        job_application = JobApplicationSentByCompanyFactory()
+        job_application.process()
+        job_application.accept(user=job_application.sender)
+        accepted_with_no_transition = JobApplicationSentByCompanyFactory(state=JobApplicationState.ACCEPTED)
+        new = JobApplicationSentByCompanyFactory()
+        JobApplication.objects.update(last_change_at=None, accepted_at=None)
+
+        migration = importlib.import_module(
+            "itou.job_applications.migrations.0006_fill_jobapplication_last_change_at_accepted_at"
+        )
+        migration._fill_last_change_at_accepted_at(apps, None)
+
+        accept_log = job_application.logs.get(transition=JobApplicationWorkflow.TRANSITION_ACCEPT)
+        job_application.refresh_from_db()
+        assert job_application.last_change_at == accept_log.timestamp
+        assert job_application.accepted_at == accept_log.timestamp
+        accepted_with_no_transition.refresh_from_db()
+        assert accepted_with_no_transition.last_change_at == accepted_with_no_transition.created_at
+        assert accepted_with_no_transition.accepted_at == accepted_with_no_transition.created_at
+        new.refresh_from_db()
+        assert new.last_change_at == new.created_at
+        assert new.accepted_at is None
+
 
 class JobApplicationNotificationsTest(TestCase):
     AFPA = "Afpa"
@@ -1756,6 +1783,32 @@ class JobApplicationXlsxExportTest(TestCase):
             ],
         ]
 
+    def test_xlsx_export_queries_per_batch(self):
+        job_applications = JobApplicationFactory.create_batch(3, with_approval=True)
+        job_applications.sort(
+            key=lambda job_application: (-job_application.created_at.timestamp(), job_application.pk)
+        )
+
+        with mock.patch("itou.job_applications.export.EXPORT_BATCH_SIZE", 2):
+            response = stream_xlsx_export(JobApplication.objects.order_by("-created_at", "pk"), "filename")
+            with self.assertNumQueries(
+                1  # job applications with their job seekers, senders and companies (server-side cursor)
+                # First batch of 2 job applications:
+                + 1  # prefetch selected jobs
+                + 1  # job seekers approvals
+                + 1  # prefetch approvals suspensions
+                + 1  # job seekers PE approvals
+                + 1  # job seekers valid eligibility diagnoses
+                # Second batch of 1 job application, with the same queries.
+                + 5
+            ):
+                rows = get_rows_from_streaming_response(response)
+
+        assert [row[JOB_APPLICATION_CSV_HEADERS.index("Numéro PASS IAE")] for row in rows[1:]] == [
+            job_application.approval.number for job_application in job_applications
+        ]
+        assert [row[JOB_APPLICATION_CSV_HEADERS.index("Éligibilité IAE validée")] for row in rows[1:]] == ["oui"] * 3
+
     def test_all_gender_cases_in_export(self):
         assert _resolve_title(title="", nir="") == ""
         assert _resolve_title(title=Title.M, nir="") == Title.M
@@ -14,6 +14,9 @@ from itou.companies.enums import ContractType
 from itou.companies.models import JobDescription
 from itou.eligibility.models import AdministrativeCriteria
 from itou.geo.utils import coords_to_geometry
+from itou.job_applications.enums import JobApplicationState
+from itou.job_applications.models import JobApplication
+from itou.metabase.management.commands.populate_metabase_emplois import Command, get_modes_dependencies
 from itou.metabase.tables.utils import hash_content
 from itou.users.enums import IdentityProvider, UserKind
 from tests.analytics.factories import DatumFactory, StatsDashboardVisitFactory
@@ -203,8 +206,6 @@ def test_populate_job_seekers():
     num_queries += 1  # Count rows
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select all elements ids (chunked_queryset)
-    num_queries += 1  # Select last pk for current chunck
     num_queries += 1  # Select job seekers chunck (with annotations)
     num_queries += 1  # Prefetch EligibilityDiagnosis with anotations, author_prescriber_organization and author_siae
     num_queries += 1  # Prefetch JobApplications with Siaes
@@ -386,8 +387,6 @@ def test_populate_criteria():
     num_queries = 1  # Count criteria
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select criteria IDs
-    num_queries += 1  # Select one chunk of criteria IDs
     num_queries += 1  # Select criteria with columns
     num_queries += 1  # COMMIT (inject_chunk)
     num_queries += 1  # COMMIT (rename_table_atomically DROP TABLE)
@@ -423,8 +422,6 @@ def test_populate_job_applications():
     num_queries += 1  # Count job applications
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select job application IDs
-    num_queries += 1  # Select one chunk of job application IDs
     num_queries += 1  # Select job applications with columns
     num_queries += 1  # Select job application transition logs
     num_queries += 1  # COMMIT (inject_chunk)
@@ -474,8 +471,6 @@ def test_populate_job_applications():
     num_queries = 1  # Count job applications
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select job application IDs
-    num_queries += 1  # Select one chunk of job application IDs
     num_queries += 1  # Select job applications with columns
     num_queries += 1  # COMMIT (inject_chunk)
     num_queries += 1  # COMMIT (rename_table_atomically DROP TABLE)
@@ -497,6 +492,52 @@ def test_populate_job_applications():
         ]
 
 
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("metabase")
+def test_populate_job_applications_incremental():
+    company = CompanyFactory(kind="GEIQ")
+    with freeze_time("2024-05-01 10:00"):
+        ja_unchanged, ja_changed, ja_deleted = JobApplicationFactory.create_batch(3, to_company=company)
+
+    with freeze_time("2024-05-01 11:00"):
+        # No watermark yet: full rebuild.
+        management.call_command("populate_metabase_emplois", mode="job_applications", incremental=True)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id FROM candidatures")
+        assert {row[0] for row in cursor.fetchall()} == {ja_unchanged.pk, ja_changed.pk, ja_deleted.pk}
+
+    # Not seen by the incremental mode since updated_at is untouched.
+    JobApplication.objects.filter(pk=ja_unchanged.pk).update(state=JobApplicationState.PROCESSING)
+    with freeze_time("2024-05-02 10:00"):
+        ja_changed.state = JobApplicationState.ACCEPTED
+        ja_changed.save(update_fields=["state", "updated_at"])
+        ja_deleted.delete()
+        ja_new = JobApplicationFactory(to_company=company)
+
+    with freeze_time("2024-05-02 11:00"):
+        management.call_command("populate_metabase_emplois", mode="job_applications", incremental=True)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, état, date_mise_à_jour_metabase FROM candidatures ORDER BY date_candidature, id")
+        rows = cursor.fetchall()
+        assert sorted(rows) == sorted(
+            [
+                # Only the changed rows are written.
+                (ja_unchanged.pk, JobApplicationState.NEW.label, datetime.date(2024, 4, 30)),
+                (ja_changed.pk, JobApplicationState.ACCEPTED.label, datetime.date(2024, 5, 1)),
+                (ja_new.pk, JobApplicationState.NEW.label, datetime.date(2024, 5, 1)),
+            ]
+        )
+        cursor.execute("SELECT last_run_at, last_full_run_at FROM z_watermarks WHERE table_name = 'candidatures'")
+        assert cursor.fetchall() == [
+            (
+                datetime.datetime(2024, 5, 2, 11, tzinfo=datetime.UTC),
+                datetime.datetime(2024, 5, 1, 11, tzinfo=datetime.UTC),
+            )
+        ]
+
+
 @freeze_time("2023-02-02")
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.usefixtures("metabase")
@@ -508,15 +549,11 @@ def test_populate_approvals():
     num_queries += 1  # Count PE approvals
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select approval IDs
-    num_queries += 1  # Select approvals IDs, chunk by 1000
     num_queries += 1  # Select approvals with columns
     num_queries += 1  # Prefetch users
     num_queries += 1  # Prefetch JobApplications
     num_queries += 1  # COMMIT (inject_chunk)
 
-    num_queries += 1  # Select PE approval IDs
-    num_queries += 1  # Select PE approvals IDs, chunk by 1000
     num_queries += 1  # Select PE approvals with columns
     num_queries += 1  # Select prescriber organizations
     num_queries += 1  # COMMIT (inject_chunk)
@@ -579,8 +616,6 @@ def test_populate_prolongations():
     num_queries = 1  # Count prolongations
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select prolongation IDs
-    num_queries += 1  # Select one chunk of prolongation IDs
     num_queries += 1  # Select prolongations with columns
     num_queries += 1  # COMMIT (inject_chunk)
     num_queries += 1  # COMMIT (rename_table_atomically DROP TABLE)
@@ -625,8 +660,6 @@ def test_populate_prolongation_requests():
     num_queries = 1  # Count prolongation_requests
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select prolongation_request IDs
-    num_queries += 1  # Select one chunk of prolongation_request IDs
     num_queries += 1  # Select prolongation_requests with columns
     num_queries += 1  # COMMIT (inject_chunk)
     num_queries += 1  # COMMIT (rename_table_atomically DROP TABLE)
@@ -669,8 +702,6 @@ def test_populate_institutions():
     num_queries = 1  # Count institutions
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select institution IDs
-    num_queries += 1  # Select one chunk of institution IDs
     num_queries += 1  # Select institutions with columns
     num_queries += 1  # COMMIT (inject_chunk)
     num_queries += 1  # COMMIT (rename_table_atomically DROP TABLE)
@@ -704,8 +735,6 @@ def test_populate_evaluation_campaigns():
     num_queries = 1  # Count campaigns
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select campaign IDs
-    num_queries += 1  # Select one chunk of campaign IDs
     num_queries += 1  # Select campaigns with columns
     num_queries += 1  # COMMIT (inject_chunk)
     num_queries += 1  # COMMIT (rename_table_atomically DROP TABLE)
@@ -739,8 +768,6 @@ def test_populate_evaluated_siaes():
     num_queries = 1  # Count evaluated siaes
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select evaluated siae IDs
-    num_queries += 1  # Select one chunk of evaluated siae IDs
     num_queries += 1  # Select evaluated siaes with columns
     num_queries += 1  # Select related evaluated job applications
     num_queries += 1  # Select related campaigns
@@ -776,8 +803,6 @@ def test_populate_evaluated_job_applications():
     num_queries = 1  # Count evaluated job applications
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select evaluated job application IDs
-    num_queries += 1  # Select one chunk of evaluated job application IDs
     num_queries += 1  # Select evaluated job applications with columns
     num_queries += 1  # Select related evaluated siaes
     num_queries += 1  # COMMIT (inject_chunk)
@@ -811,8 +836,6 @@ def test_populate_evaluated_criteria():
     num_queries = 1  # Count evaluated criteria
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select evaluated criteria IDs
-    num_queries += 1  # Select one chunk of evaluated criteria IDs
     num_queries += 1  # Select evaluated criteria with columns
     num_queries += 1  # COMMIT (inject_chunk)
     num_queries += 1  # COMMIT (rename_table_atomically DROP TABLE)
@@ -862,8 +885,6 @@ def test_populate_users():
     num_queries = 1  # Count users
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select user IDs
-    num_queries += 1  # Select one chunk of user IDs
     num_queries += 1  # Select users with columns
     num_queries += 1  # COMMIT (inject_chunk)
     num_queries += 1  # COMMIT (rename_table_atomically DROP TABLE)
@@ -903,18 +924,12 @@ def test_populate_memberships():
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
 
-    num_queries += 1  # Select siae memberships IDs
-    num_queries += 1  # Select one chunk of siae memberships IDs
     num_queries += 1  # Select siae memberships with columns
     num_queries += 1  # COMMIT (inject_chunk)
 
-    num_queries += 1  # Select prescriber memberships IDs
-    num_queries += 1  # Select one chunk of prescriber memberships IDs
     num_queries += 1  # Select prescriber memberships with columns
     num_queries += 1  # COMMIT (inject_chunk)
 
-    num_queries += 1  # Select institution memberships IDs
-    num_queries += 1  # Select one chunk of institution memberships IDs
     num_queries += 1  # Select institution memberships with columns
     num_queries += 1  # COMMIT (inject_chunk)
 
@@ -1013,6 +1028,74 @@ def test_data_inconsistencies(capsys):
     ]
 
 
+def test_several_modes_run_dbt_daily_last(mocker):
+    calls = []
+    mocker.patch.object(Command, "populate_analytics", lambda self: calls.append("analytics"))
+    mocker.patch.object(Command, "populate_enums", lambda self: calls.append("enums"))
+    mocker.patch.object(Command, "build_dbt_daily", lambda self: calls.append("dbt_daily"))
+
+    management.call_command("populate_metabase_emplois", mode=["dbt_daily", "analytics", "enums"])
+    assert calls == ["analytics", "enums", "dbt_daily"]
+
+
+def test_several_modes_dbt_daily_not_run_after_failure(mocker):
+    mocker.patch.object(Command, "populate_analytics", side_effect=RuntimeError("boom"))
+    mocker.patch.object(Command, "build_dbt_daily")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        management.call_command("populate_metabase_emplois", mode=["dbt_daily", "analytics"])
+
+
+def test_get_modes_dependencies():
+    assert get_modes_dependencies(["analytics", "dbt_daily", "data_inconsistencies", "siaes"]) == {
+        "analytics": set(),
+        "dbt_daily": {"analytics", "siaes"},
+        "data_inconsistencies": set(),
+        "siaes": set(),
+    }
+
+
+def test_populate_metabase_emplois_jobs_skips_dependents_of_failed_modes(mocker, capsys):
+    # Forked workers inherit the patched operations.
+    mocker.patch.object(Command, "populate_analytics")
+    mocker.patch.object(Command, "populate_companies", side_effect=RuntimeError("boom"))
+    mocker.patch.object(Command, "report_data_inconsistencies")
+    mocker.patch.object(Command, "build_dbt_daily")
+
+    with pytest.raises(RuntimeError, match="The following modes failed or were skipped: dbt_daily, siaes"):
+        management.call_command(
+            "populate_metabase_emplois", mode=["dbt_daily", "analytics", "siaes", "data_inconsistencies"], jobs=2
+        )
+
+    stdout, _ = capsys.readouterr()
+    lines = stdout.splitlines()
+    assert "Starting mode=dbt_daily." not in lines
+    for mode in ["analytics", "siaes", "data_inconsistencies"]:
+        assert f"Starting mode={mode}." in lines
+    assert "Mode=analytics completed." in lines
+    assert "Mode=data_inconsistencies completed." in lines
+    assert "Mode=siaes failed with exception RuntimeError('boom')." in lines
+    assert lines.index("Skipping mode=dbt_daily as one of its dependencies failed.") > lines.index(
+        "Mode=siaes failed with exception RuntimeError('boom')."
+    )
+
+
+def test_populate_metabase_emplois_jobs_runs_dependents_last(mocker, capsys):
+    for operation in ["populate_analytics", "populate_companies", "report_data_inconsistencies", "build_dbt_daily"]:
+        mocker.patch.object(Command, operation)
+
+    management.call_command(
+        "populate_metabase_emplois", mode=["dbt_daily", "analytics", "siaes", "data_inconsistencies"], jobs=2
+    )
+
+    stdout, _ = capsys.readouterr()
+    lines = stdout.splitlines()
+    dbt_daily_start = lines.index("Starting mode=dbt_daily.")
+    assert lines.index("Mode=analytics completed.") < dbt_daily_start
+    assert lines.index("Mode=siaes completed.") < dbt_daily_start
+    assert "Mode=dbt_daily completed." in lines
+
+
 @freeze_time("2023-02-02")
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.usefixtures("metabase")
@@ -1051,8 +1134,6 @@ def test_populate_job_descriptions():
     num_queries = 1  # Count total rows for job descriptions
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select all job descriptions
-    num_queries += 1  # Select job descriptions chunk
     num_queries += 1  # Select job descriptions with columns
     num_queries += 1  # Annotate job applications count
     num_queries += 1  # COMMIT (inject_chunk)
@@ -1112,8 +1193,6 @@ def test_populate_companies():
     num_queries = 1  # Count Siaes
     num_queries += 1  # COMMIT Queryset counts (autocommit mode)
     num_queries += 1  # COMMIT Create table
-    num_queries += 1  # Select active SIAES
-    num_queries += 1  # Select one chunk of siaes
     num_queries += 1  # Select siaes with annotations and columns
     num_queries += 1  # Select other siaes with the same convention
     num_queries += 1  # Prefetch siae job descriptions
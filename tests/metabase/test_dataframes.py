@@ -0,0 +1,81 @@
+import pandas as pd
+import psycopg
+import pytest
+from django.db import connection
+
+from itou.metabase import dataframes
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("metabase")
+def test_store_df_resumes_after_last_committed_chunk(mocker):
+    df = pd.DataFrame({"id": range(10), "name": [f"Name {i}" for i in range(10)]})
+
+    copy_df = dataframes.copy_df
+    stored_ids = []
+
+    def flaky_copy_df(cursor, table_name, columns, df_chunk):
+        stored_ids.append(df_chunk["id"].tolist())
+        if len(stored_ids) == 3:
+            raise psycopg.OperationalError("server closed the connection unexpectedly")
+        copy_df(cursor, table_name, columns, df_chunk)
+
+    mocker.patch("itou.metabase.dataframes.copy_df", side_effect=flaky_copy_df)
+    dataframes.store_df(df, "z_test_store_df", rows_per_chunk=3)
+
+    # Only the failed chunk is sent again.
+    assert stored_ids == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [6, 7, 8], [9]]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, name FROM z_test_store_df ORDER BY id")
+        assert cursor.fetchall() == [(i, f"Name {i}") for i in range(10)]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("metabase")
+def test_store_df_chunks_retries_the_failed_chunk(mocker):
+    df = pd.DataFrame({"id": range(10), "name": [f"Name {i}" for i in range(10)]})
+    df_chunks = (df[start : start + 3] for start in range(0, len(df), 3))
+
+    copy_df = dataframes.copy_df
+    stored_ids = []
+
+    def flaky_copy_df(cursor, table_name, columns, df_chunk):
+        stored_ids.append(df_chunk["id"].tolist())
+        if len(stored_ids) == 3:
+            raise psycopg.OperationalError("server closed the connection unexpectedly")
+        copy_df(cursor, table_name, columns, df_chunk)
+
+    mocker.patch("itou.metabase.dataframes.copy_df", side_effect=flaky_copy_df)
+    dataframes.store_df_chunks(df_chunks, dataframes.infer_columns_from_df(df), "z_test_store_df_chunks")
+
+    # Only the failed chunk is sent again.
+    assert stored_ids == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [6, 7, 8], [9]]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, name FROM z_test_store_df_chunks ORDER BY id")
+        assert cursor.fetchall() == [(i, f"Name {i}") for i in range(10)]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("metabase")
+def test_store_df_chunks_skips_the_chunk_committed_before_the_failure(mocker):
+    df = pd.DataFrame({"id": range(10), "name": [f"Name {i}" for i in range(10)]})
+    df_chunks = (df[start : start + 3] for start in range(0, len(df), 3))
+
+    copy_df = dataframes.copy_df
+    stored_ids = []
+
+    def copy_df_losing_the_commit(cursor, table_name, columns, df_chunk):
+        stored_ids.append(df_chunk["id"].tolist())
+        copy_df(cursor, table_name, columns, df_chunk)
+        if len(stored_ids) == 2:
+            # The COMMIT went through, but its acknowledgement was lost.
+            cursor.connection.commit()
+            raise psycopg.OperationalError("server closed the connection unexpectedly")
+
+    mocker.patch("itou.metabase.dataframes.copy_df", side_effect=copy_df_losing_the_commit)
+    dataframes.store_df_chunks(df_chunks, dataframes.infer_columns_from_df(df), "z_test_store_df_chunks")
+
+    assert stored_ids == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, name FROM z_test_store_df_chunks ORDER BY id")
+        assert cursor.fetchall() == [(i, f"Name {i}") for i in range(10)]
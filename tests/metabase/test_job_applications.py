@@ -1,4 +1,6 @@
-from itou.job_applications.enums import RefusalReason
+from itou.companies.enums import ContractType
+from itou.job_applications.enums import Origin, RefusalReason
+from itou.job_applications.models import JobApplication
 from itou.metabase.tables.job_applications import TABLE
 from itou.prescribers.enums import PrescriberOrganizationKind
 from tests.job_applications.factories import (
@@ -53,3 +55,12 @@ class MetabaseJobApplicationTest(TestCase):
         assert ja.sender_prescriber_organization.kind != PrescriberOrganizationKind.PE
         assert TABLE.get(column_name="nom_prénom_conseiller", input=ja) is None
         assert TABLE.get(column_name="safir_org_prescripteur", input=ja) is None
+
+    def test_column_expressions_match_fn(self):
+        JobApplicationFactory(with_approval=True, origin=Origin.AI_STOCK)
+        JobApplicationFactory(contract_type=ContractType.APPRENTICESHIP)
+        columns = [c for c in TABLE.columns if "expression" in c]
+        queryset = JobApplication.objects.annotate(**{f"column_{i}": c["expression"] for i, c in enumerate(columns)})
+        for ja in queryset:
+            for i, c in enumerate(columns):
+                assert getattr(ja, f"column_{i}") == c["fn"](ja), c["name"]
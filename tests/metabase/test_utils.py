@@ -1,5 +1,10 @@
+from pytest_django.asserts import assertNumQueries
+
+from itou.companies.models import Company
 from itou.geo.utils import coords_to_geometry
 from itou.metabase.tables.utils import get_qpv_job_seeker_pks, get_zrr_status_for_insee_code
+from itou.metabase.utils import chunked_queryset
+from tests.companies.factories import CompanyFactory
 from tests.geo.factories import QPVFactory, ZRRFactory
 from tests.users.factories import JobSeekerFactory
 
@@ -34,3 +39,18 @@ def test_get_zrr_status_for_insee_code_not_in_zrr():
 def test_get_zrr_status_for_insee_code_partially_in_zrr():
     partially_in_zrr = ZRRFactory(partially_in_zrr=True)
     assert get_zrr_status_for_insee_code(partially_in_zrr.insee_code) == "Partiellement classée en ZRR"
+
+
+def test_chunked_queryset():
+    company_pks = sorted(company.pk for company in CompanyFactory.create_batch(5, with_membership=True))
+
+    num_queries = 1  # Select companies through a server-side cursor
+    num_queries += 3  # Prefetch members, once per chunk
+    with assertNumQueries(num_queries):
+        chunks = list(chunked_queryset(Company.objects.prefetch_related("members"), chunk_size=2))
+    assert [[company.pk for company in chunk] for chunk in chunks] == [
+        company_pks[0:2],
+        company_pks[2:4],
+        company_pks[4:],
+    ]
+    assert all(len(company.members.all()) == 1 for chunk in chunks for company in chunk)
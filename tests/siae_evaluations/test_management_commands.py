@@ -6,7 +6,10 @@ from django.core.management import call_command
 from django.utils import timezone
 from freezegun import freeze_time
 
+from itou.companies.models import Company
 from itou.siae_evaluations import enums as evaluation_enums
+from itou.siae_evaluations.models import EvaluationCampaign
+from tests.institutions.factories import InstitutionFactory
 from tests.siae_evaluations.factories import (
     EvaluatedAdministrativeCriteriaFactory,
     EvaluatedJobApplicationFactory,
@@ -634,3 +637,23 @@ class TestManagementCommand:
         assert stdout == ""
         assert stderr == ""
         assert mailoutbox == []
+
+
+def test_benchmark_evaluation_campaigns(capsys, mailoutbox):
+    InstitutionFactory(department="14")
+    InstitutionFactory(department="75")
+
+    call_command("benchmark_evaluation_campaigns", fake_siaes_per_department=4, fake_job_applications_per_siae=3)
+
+    stdout, _stderr = capsys.readouterr()
+    lines = stdout.splitlines()
+    assert lines[0] == "Created 8 fake SIAEs with 24 job applications"
+    # 30% of 4 SIAEs, and the minimum of 2 job applications for each.
+    assert lines[1].startswith("14: 1 SIAEs and 2 job applications selected in ")
+    assert lines[2].startswith("75: 1 SIAEs and 2 job applications selected in ")
+    assert lines[3].startswith("2 campaigns populated in ")
+    assert len(lines) == 4
+    assert mailoutbox == []
+    # Everything is rolled back.
+    assert not Company.objects.filter(name__startswith="Benchmark").exists()
+    assert not EvaluationCampaign.objects.exists()
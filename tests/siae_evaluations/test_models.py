@@ -15,7 +15,6 @@ from itou.eligibility.enums import AdministrativeCriteriaLevel, AuthorKind
 from itou.eligibility.models import AdministrativeCriteria, EligibilityDiagnosis
 from itou.institutions.enums import InstitutionKind
 from itou.job_applications.enums import JobApplicationState
-from itou.job_applications.models import JobApplication, JobApplicationQuerySet
 from itou.siae_evaluations import enums as evaluation_enums
 from itou.siae_evaluations.models import (
     Calendar,
@@ -26,7 +25,7 @@ from itou.siae_evaluations.models import (
     EvaluationCampaign,
     Sanctions,
     create_campaigns_and_calendar,
-    select_min_max_job_applications,
+    get_min_max_job_applications_limit,
     validate_institution,
 )
 from itou.utils.models import InclusiveDateRange
@@ -42,7 +41,7 @@ from tests.siae_evaluations.factories import (
     EvaluatedSiaeFactory,
     EvaluationCampaignFactory,
 )
-from tests.users.factories import JobSeekerFactory, PrescriberFactory
+from tests.users.factories import JobSeekerFactory
 from tests.utils.test import TestCase
 
 
@@ -59,50 +58,17 @@ def create_batch_of_job_applications(company):
 
 
 class EvaluationCampaignMiscMethodsTest(TestCase):
-    def test_select_min_max_job_applications(self):
-        company = CompanyFactory()
-        job_seeker = JobSeekerFactory()
-        sender = PrescriberFactory()
-        eligibility_diagnosis = EligibilityDiagnosisFactory(job_seeker=job_seeker)
-
-        def create_job_apps(count):
-            return JobApplicationFactory.create_batch(
-                count,
-                to_company=company,
-                job_seeker=job_seeker,
-                eligibility_diagnosis=eligibility_diagnosis,
-                sender=sender,
-            )
-
-        # zero job application
-        qs = select_min_max_job_applications(JobApplication.objects.filter(to_company=company))
-        assert isinstance(qs, JobApplicationQuerySet)
-        assert 0 == qs.count()
-
-        # one job applications made by SIAE
-        [job_application] = create_job_apps(1)
-        assert (
-            job_application
-            == select_min_max_job_applications(JobApplication.objects.filter(to_company=company)).first()
-        )
-        assert 1 == select_min_max_job_applications(JobApplication.objects.filter(to_company=company)).count()
-
+    def test_get_min_max_job_applications_limit(self):
         # under 10 job applications, 20% is below the minimum value of 2 -> select 2
-        create_job_apps(5)
-        assert (
-            evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MIN
-            == select_min_max_job_applications(JobApplication.objects.filter(to_company=company)).count()
-        )
+        assert get_min_max_job_applications_limit(1) == evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MIN
+        assert get_min_max_job_applications_limit(6) == evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MIN
 
         # from 20 job applications to 100 we have the correct percentage
-        create_job_apps(55)
-        assert 12 == select_min_max_job_applications(JobApplication.objects.filter(to_company=company)).count()
+        assert get_min_max_job_applications_limit(61) == 12
 
         # Over 100, stop at the max number -> 20
-        create_job_apps(50)
         assert (
-            evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MAX
-            == select_min_max_job_applications(JobApplication.objects.filter(to_company=company)).count()
+            get_min_max_job_applications_limit(111) == evaluation_enums.EvaluationJobApplicationsBoundariesNumber.MAX
         )
 
 
@@ -365,15 +331,6 @@ class EvaluationCampaignManagerTest(TestCase):
 
         assert 2 == evaluation_campaign.number_of_siaes_to_select()
 
-    def test_eligible_siaes_under_ratio(self):
-        evaluation_campaign = EvaluationCampaignFactory()
-
-        for _ in range(6):
-            company = CompanyFactory(department="14")
-            create_batch_of_job_applications(company)
-
-        assert 2 == evaluation_campaign.eligible_siaes_under_ratio().count()
-
     def test_populate(self):
         # integration tests
         evaluation_campaign = EvaluationCampaignFactory()
@@ -402,14 +359,10 @@ class EvaluationCampaignManagerTest(TestCase):
         with self.assertNumQueries(
             1  # SAVEPOINT from transaction.atomic()
             + 1  # UPDATE SET percent_set_at
-            + 1  # COUNT eligible job applications
-            + 1  # SELECT to_company_id and job application count for SIAE with at least 2 auto-prescriptions.
-            + 1  # SELECT SIAE details
+            + 1  # SELECT eligible job applications and their SIAE
+            + 1  # SELECT SIAE details and convention
             + 1  # INSERT EvaluatedSiae
-            + 1  # COUNT eligible job applications
-            + 1  # SELECT job applications to evaluate
             + 1  # INSERT EvaluatedJobApplication
-            + 1  # SELECT SIAE convention
             + 1  # SELECT SIAE admin users
             + 1  # SELECT institution users
             + 1  # RELEASE SAVEPOINT (end of transaction.atomic())
@@ -419,6 +372,7 @@ class EvaluationCampaignManagerTest(TestCase):
 
         assert fake_now == evaluation_campaign.percent_set_at
         assert fake_now == evaluation_campaign.evaluations_asked_at
+        assert evaluation_campaign.selection_seed is not None
         assert 1 == EvaluatedSiae.objects.all().count()
         assert 2 == EvaluatedJobApplication.objects.all().count()
 
@@ -432,6 +386,47 @@ class EvaluationCampaignManagerTest(TestCase):
         with pytest.raises(CampaignAlreadyPopulatedException):
             evaluation_campaign.populate(fake_now)
 
+    def test_populate_many_siaes(self):
+        evaluation_campaign = EvaluationCampaignFactory(chosen_percent=50)
+        other_campaign = EvaluationCampaignFactory(
+            chosen_percent=50, institution__department=evaluation_campaign.institution.department
+        )
+        siae_count = 8
+        for _ in range(siae_count):
+            company = CompanyFactory(department=evaluation_campaign.institution.department, with_membership=True)
+            create_batch_of_job_applications(company)
+        fake_now = timezone.now() - relativedelta(weeks=1)
+
+        # Only the emails depend on the number of selected SIAEs.
+        with self.assertNumQueries(
+            1  # SAVEPOINT from transaction.atomic()
+            + 1  # UPDATE SET percent_set_at
+            + 1  # SELECT eligible job applications and their SIAE
+            + 1  # SELECT SIAE details and convention
+            + 1  # INSERT EvaluatedSiae
+            + 1  # INSERT EvaluatedJobApplication
+            + siae_count // 2  # SELECT SIAE admin users
+            + 1  # SELECT institution users
+            + 1  # RELEASE SAVEPOINT (end of transaction.atomic())
+        ):
+            evaluation_campaign.populate(fake_now)
+        assert evaluation_campaign.evaluated_siaes.count() == siae_count // 2
+
+        # The stored seed gives the same selection.
+        other_campaign.populate(fake_now, seed=evaluation_campaign.selection_seed)
+        assert other_campaign.selection_seed == evaluation_campaign.selection_seed
+
+        def selection(campaign):
+            return {
+                evaluated_siae.siae_id: {
+                    evaluated_job_application.job_application_id
+                    for evaluated_job_application in evaluated_siae.evaluated_job_applications.all()
+                }
+                for evaluated_siae in campaign.evaluated_siaes.prefetch_related("evaluated_job_applications")
+            }
+
+        assert selection(evaluation_campaign) == selection(other_campaign)
+
     @freeze_time("2023-01-02 11:11:11")
     def test_transition_to_adversarial_phase(self):
         ignored_siae = EvaluatedSiaeFactory(pk=1000, siae__pk=2000)  # will be ignored
@@ -1190,3 +1190,15 @@ def test_pe_certify_users_retry(capsys, snapshot):
         recherche_call(old_failure, swap=False),
         recherche_call(old_failure, swap=True),
     ]
+
+
+def test_benchmark_users_autocomplete(capsys):
+    call_command("benchmark_users_autocomplete", fake_users=3, repeat=1)
+
+    stdout, _stderr = capsys.readouterr()
+    lines = stdout.splitlines()
+    assert lines[:2] == ["Created 3/3 fake job seekers", "3 job seekers"]
+    assert len(lines) == 2 + 10  # One line per search string.
+    assert lines[2].startswith("'m': stored vector median=")
+    # The fake job seekers are rolled back.
+    assert not User.objects.filter(email__startswith="benchmark-").exists()
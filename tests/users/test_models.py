@@ -15,15 +15,20 @@ from django.test import override_settings
 from django.utils import timezone
 
 import tests.asp.factories as asp
-from itou.approvals.models import Approval
+from itou.approvals.models import Approval, JobSeekerApprovalsSummary
 from itou.asp.models import AllocationDuration, EducationLevel
 from itou.cities.models import City
 from itou.companies.enums import CompanyKind
 from itou.job_applications.enums import JobApplicationState, Origin
 from itou.users.enums import IdentityProvider, LackOfNIRReason, LackOfPoleEmploiId, Title, UserKind
-from itou.users.models import JobSeekerProfile, User
+from itou.users.models import JobSeekerProfile, User, prefetch_latest_approvals
 from itou.utils.mocks.address_format import BAN_GEOCODING_API_RESULTS_MOCK, mock_get_geocoding_data
-from tests.approvals.factories import ApprovalFactory, PoleEmploiApprovalFactory
+from tests.approvals.factories import (
+    ApprovalFactory,
+    PoleEmploiApprovalFactory,
+    ProlongationFactory,
+    SuspensionFactory,
+)
 from tests.companies.factories import CompanyFactory
 from tests.eligibility.factories import EligibilityDiagnosisFactory, EligibilityDiagnosisMadeBySiaeFactory
 from tests.job_applications.factories import JobApplicationFactory, JobApplicationSentByJobSeekerFactory
@@ -88,6 +93,24 @@ class ManagerTest(TestCase):
         }
         self.assertCountEqual(duplicated_users, expected_result)
 
+    def test_autocomplete(self):
+        jean = JobSeekerFactory(first_name="Jean", last_name="Dupont")
+        jeanne = JobSeekerFactory(first_name="Jeanne", last_name="Jean")
+        JobSeekerFactory(first_name="Pierre", last_name="Dupont")
+        PrescriberFactory(first_name="Jean", last_name="Durand")
+
+        # Matches with both names rank first.
+        assert list(User.objects.autocomplete("jean")) == [jeanne, jean]
+        assert list(User.objects.autocomplete("jean dup")) == [jean]
+        # Accents are ignored.
+        assert list(User.objects.autocomplete("Jéan Düpont")) == [jean]
+
+        # The search vector follows the name changes.
+        jean.last_name = "Martin"
+        jean.save(update_fields=["last_name"])
+        assert list(User.objects.autocomplete("jean dup")) == []
+        assert list(User.objects.autocomplete("jean mar")) == [jean]
+
 
 class ModelTest(TestCase):
     def test_generate_unique_username(self):
@@ -1169,6 +1192,124 @@ class LatestApprovalTestCase(TestCase):
         PoleEmploiApprovalFactory(nir=user.jobseeker_profile.nir, start_at=start_at, end_at=end_at)
         assert user.latest_common_approval is None
 
+    def test_prefetch_latest_approvals(self):
+        with_approval = JobSeekerFactory()
+        approval = ApprovalFactory(user=with_approval)
+        with_pe_approval = JobSeekerFactory(with_pole_emploi_id=True)
+        pe_approval = PoleEmploiApprovalFactory(
+            pole_emploi_id=with_pe_approval.jobseeker_profile.pole_emploi_id, birthdate=with_pe_approval.birthdate
+        )
+        with_expired_approval = JobSeekerFactory()
+        end_at = timezone.localdate() - relativedelta(years=3)
+        ApprovalFactory(user=with_expired_approval, start_at=end_at - relativedelta(years=2), end_at=end_at)
+        other_pe_approval = PoleEmploiApprovalFactory(nir=with_expired_approval.jobseeker_profile.nir)
+        without_approval = JobSeekerFactory()
+        prescriber = PrescriberFactory()
+
+        users = list(
+            User.objects.filter(
+                pk__in=[with_approval.pk, with_pe_approval.pk, with_expired_approval.pk, without_approval.pk]
+            )
+            .select_related("jobseeker_profile")
+            .order_by("pk")
+        ) + [prescriber]
+        with self.assertNumQueries(
+            1  # approvals summaries of the job seekers, with their approvals and PE approvals
+            + 1  # suspensions of the approvals
+        ):
+            prefetch_latest_approvals(users)
+        with self.assertNumQueries(0):
+            assert [user.latest_common_approval for user in users] == [
+                approval,
+                pe_approval,
+                other_pe_approval,
+                None,
+                None,
+            ]
+
+        for user in users[:4]:
+            fresh_user = User.objects.get(pk=user.pk)
+            assert user.latest_approval == fresh_user.latest_approval
+            assert user.latest_pe_approval == fresh_user.latest_pe_approval
+
+    def test_approvals_summary_latest_approval_ends_last(self):
+        user = JobSeekerFactory()
+        today = timezone.localdate()
+        ending_last = ApprovalFactory(user=user, start_at=today - relativedelta(months=6))
+        created_last = ApprovalFactory(user=user, start_at=today, end_at=today + relativedelta(months=3))
+
+        summary = JobSeekerApprovalsSummary.objects.get(job_seeker=user)
+        assert summary.latest_approval == ending_last
+        assert summary.approval_start_at == ending_last.start_at
+        assert summary.approval_end_at == ending_last.end_at
+        assert summary.approval_waiting_period_end == ending_last.waiting_period_end
+        assert user.latest_approval == ending_last
+
+        ending_last.delete()
+        summary.refresh_from_db()
+        assert summary.latest_approval == created_last
+        assert summary.approval_end_at == created_last.end_at
+
+    def test_approvals_summary_follows_suspensions_and_prolongations(self):
+        user = JobSeekerFactory()
+        approval = ApprovalFactory(user=user)
+
+        suspension = SuspensionFactory(approval=approval)
+        approval.refresh_from_db()
+        summary = JobSeekerApprovalsSummary.objects.get(job_seeker=user)
+        assert summary.approval_end_at == approval.end_at
+
+        ProlongationFactory(approval=approval, start_at=approval.end_at)
+        approval.refresh_from_db()
+        summary.refresh_from_db()
+        assert summary.approval_end_at == approval.end_at
+
+        suspension.delete()
+        approval.refresh_from_db()
+        summary.refresh_from_db()
+        assert summary.approval_end_at == approval.end_at
+
+    def test_approvals_summary_follows_job_seeker_identity(self):
+        user = JobSeekerFactory(with_pole_emploi_id=True)
+        by_nir = PoleEmploiApprovalFactory(nir=user.jobseeker_profile.nir)
+        by_pole_emploi_id = PoleEmploiApprovalFactory(
+            pole_emploi_id=user.jobseeker_profile.pole_emploi_id,
+            birthdate=user.birthdate,
+            end_at=by_nir.end_at - relativedelta(days=1),
+        )
+        summary = JobSeekerApprovalsSummary.objects.get(job_seeker=user)
+        assert summary.latest_pe_approval == by_nir
+        assert summary.pe_approval_end_at == by_nir.end_at
+
+        user.jobseeker_profile.nir = ""
+        user.jobseeker_profile.lack_of_nir_reason = LackOfNIRReason.TEMPORARY_NUMBER
+        user.jobseeker_profile.save()
+        summary.refresh_from_db()
+        assert summary.latest_pe_approval == by_pole_emploi_id
+
+        user.birthdate -= relativedelta(days=1)
+        user.save()
+        summary.refresh_from_db()
+        assert summary.latest_pe_approval is None
+        assert summary.pe_approval_end_at is None
+
+        # PASS IAE issued from a PE approval replace it.
+        user.birthdate = by_pole_emploi_id.birthdate
+        user.save()
+        ApprovalFactory(user=user, number=by_pole_emploi_id.number, origin_pe_approval=True)
+        summary.refresh_from_db()
+        assert summary.latest_pe_approval is None
+        assert summary.latest_approval.number == by_pole_emploi_id.number
+
+    def test_approvals_summary_deleted_with_job_seeker(self):
+        user = JobSeekerFactory()
+        ApprovalFactory(user=user)
+        PoleEmploiApprovalFactory(nir=user.jobseeker_profile.nir)
+        assert JobSeekerApprovalsSummary.objects.filter(job_seeker=user).exists()
+
+        user.delete()
+        assert not JobSeekerApprovalsSummary.objects.exists()
+
 
 @pytest.mark.parametrize("initial_asp_uid", ("08b4e9f755a688b554a6487d96d2a0", ""))
 @override_settings(SECRET_KEY="test")
@@ -1,6 +1,8 @@
 import pytest
 from django.contrib.gis.geos import GEOSGeometry
+from django.utils import timezone
 
+from itou.geo.models import GEOCODING_RESULT_TTL, GeocodingResult
 from itou.utils.apis import geocoding
 from itou.utils.apis.exceptions import GeocodingDataError
 from itou.utils.mocks.geocoding import BAN_GEOCODING_API_NO_RESULT_MOCK, BAN_GEOCODING_API_WITH_RESULT_RESPONSE
@@ -47,3 +49,61 @@ def test_get_geocoding_data_try_without_post_code_if_no_results_for_drom_and_com
     with pytest.raises(GeocodingDataError):
         geocoding.get_geocoding_data("HOWELL CENTER", post_code=post_code)
     assert [record for record in caplog.record_tuples if record[0] == geocoding.__name__] == snapshot
+
+
+def test_call_ban_geocoding_api_cache(respx_mock, settings):
+    settings.API_BAN_BASE_URL = "https://geo.foo"
+    route = respx_mock.get(f"{settings.API_BAN_BASE_URL}/search/").respond(
+        200, json=BAN_GEOCODING_API_WITH_RESULT_RESPONSE
+    )
+
+    result = geocoding.call_ban_geocoding_api("10 PL 5 MARTYRS LYCÉE BUFFON", post_code="75015")
+    assert result == BAN_GEOCODING_API_WITH_RESULT_RESPONSE["features"][0]
+    assert route.call_count == 1
+
+    # Same query, but for the case and spaces.
+    assert geocoding.call_ban_geocoding_api(" 10 pl 5 martyrs  lycée buffon", post_code="75015") == result
+    assert route.call_count == 1
+
+    # Not the same post code.
+    geocoding.call_ban_geocoding_api("10 PL 5 MARTYRS LYCÉE BUFFON", post_code="75014")
+    assert route.call_count == 2
+
+    # Outdated result.
+    GeocodingResult.objects.update(updated_at=timezone.now() - GEOCODING_RESULT_TTL)
+    geocoding.call_ban_geocoding_api("10 PL 5 MARTYRS LYCÉE BUFFON", post_code="75015")
+    assert route.call_count == 3
+
+
+def test_batch_cache(respx_mock, settings):
+    settings.API_BAN_BASE_URL = "https://geo.foo"
+    route = respx_mock.post(f"{settings.API_BAN_BASE_URL}/search/csv/").respond(
+        200,
+        text=(
+            "id;result_label;result_score;latitude;longitude\n"
+            "1;7 rue de Laroche;0.77;42.42;13.13\n"
+            "2;5 rue Bigot;0.32;42.42;13.13\n"
+        ),
+    )
+    addresses = [
+        {"pk": 1, "address_line_1": "7 rue de Laroche", "post_code": "75001"},
+        {"pk": 2, "address_line_1": "5 rue Bigot", "post_code": "75002"},
+        # Only sent once.
+        {"pk": 3, "address_line_1": "7 RUE DE LAROCHE", "post_code": "75001"},
+    ]
+    results = list(geocoding.batch(addresses))
+    assert [result["result_label"] for result in results] == ["7 rue de Laroche", "5 rue Bigot", "7 rue de Laroche"]
+    assert route.call_count == 1
+
+    route.respond(200, text="id;result_label;result_score;latitude;longitude\n4;9 avenue Delorme;0.83;42.42;13.13\n")
+    addresses.append({"pk": 4, "address_line_1": "9 avenue Delorme", "post_code": "92220"})
+    results = list(geocoding.batch(addresses))
+    assert [result["result_label"] for result in results] == [
+        "7 rue de Laroche",
+        "5 rue Bigot",
+        "7 rue de Laroche",
+        "9 avenue Delorme",
+    ]
+    assert route.call_count == 2
+    assert b"9 avenue Delorme" in route.calls.last.request.content
+    assert b"rue Bigot" not in route.calls.last.request.content
@@ -0,0 +1,31 @@
+import pytest
+from freezegun import freeze_time
+
+from itou.utils.throttling import TokenBucket
+
+
+def test_token_bucket(mocker):
+    with freeze_time("2024-01-01 00:00:00") as frozen_time:
+        sleep = mocker.patch("itou.utils.throttling.time.sleep", side_effect=lambda seconds: frozen_time.tick(seconds))
+        bucket = TokenBucket(rate=2, capacity=4)
+
+        # The bucket starts full.
+        for _ in range(4):
+            bucket.acquire()
+        sleep.assert_not_called()
+
+        # Then waits for it to be refilled.
+        bucket.acquire(2)
+        sleep.assert_called_once_with(1)
+
+        # Tokens do not pile up beyond the capacity.
+        frozen_time.tick(60)
+        bucket.acquire(4)
+        assert sleep.call_count == 1
+        bucket.acquire()
+        sleep.assert_called_with(0.5)
+
+
+def test_token_bucket_capacity():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=2).acquire(3)
@@ -17,6 +17,7 @@ from django.contrib.auth.models import AnonymousUser, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.messages.middleware import MessageMiddleware
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import caches
 from django.core.exceptions import ValidationError
 from django.core.mail.message import EmailMessage
 from django.http import HttpResponse
@@ -38,15 +39,17 @@ from itou.cities.models import City
 from itou.companies.enums import CompanyKind
 from itou.companies.models import Company, CompanyMembership
 from itou.job_applications.enums import JobApplicationState
+from itou.job_applications.models import JobApplication
 from itou.users.enums import UserKind
 from itou.users.models import User
-from itou.utils import constants as global_constants, pagination
+from itou.utils import constants as global_constants, pagination, tasks
 from itou.utils.emails import redact_email_address
 from itou.utils.models import PkSupportRemark
 from itou.utils.password_validation import CnilCompositionPasswordValidator
+from itou.utils.perms.cache import get_organizations_cache_key
 from itou.utils.perms.middleware import ItouCurrentOrganizationMiddleware
 from itou.utils.sync import DiffItem, DiffItemKind, yield_sync_diff
-from itou.utils.tasks import sanitize_mailjet_recipients
+from itou.utils.tasks import MailjetBatchEmailBackend, sanitize_mailjet_recipients
 from itou.utils.templatetags import dict_filters, format_filters, job_applications, job_seekers
 from itou.utils.tokens import COMPANY_SIGNUP_MAGIC_LINK_TIMEOUT, CompanySignupTokenGenerator
 from itou.utils.urls import (
@@ -296,6 +299,64 @@ class TestItouCurrentOrganizationMiddleware:
         assert request.organizations == [company, active_company]
         assert request.is_current_organization_admin
 
+    def test_employer_memberships_are_cached(self, mocked_get_response_for_middlewaremixin):
+        factory = RequestFactory()
+        membership = CompanyMembershipFactory()
+
+        def get_request():
+            request = factory.get("/")
+            request.user = membership.user
+            SessionMiddleware(get_response_for_middlewaremixin).process_request(request)
+            return request
+
+        ItouCurrentOrganizationMiddleware(mocked_get_response_for_middlewaremixin)(get_request())
+
+        request = get_request()
+        with assertNumQueries(1):  # Retrieve the companies from the cached memberships
+            ItouCurrentOrganizationMiddleware(mocked_get_response_for_middlewaremixin)(request)
+        assert request.current_organization == membership.company
+        assert request.is_current_organization_admin
+
+        # Memberships changes are seen at once.
+        membership.is_admin = False
+        membership.save(update_fields=["is_admin"])
+        request = get_request()
+        with assertNumQueries(
+            # Retrieve user memberships
+            1
+            # Check if siaes are active or in grace period
+            + 1
+        ):
+            ItouCurrentOrganizationMiddleware(mocked_get_response_for_middlewaremixin)(request)
+        assert request.current_organization == membership.company
+        assert not request.is_current_organization_admin
+
+        # So are companies changes, which may deactivate them.
+        membership.company.save()
+        request = get_request()
+        with assertNumQueries(
+            # Retrieve user memberships
+            1
+            # Check if siaes are active or in grace period
+            + 1
+        ):
+            ItouCurrentOrganizationMiddleware(mocked_get_response_for_middlewaremixin)(request)
+        assert request.current_organization == membership.company
+        assert mocked_get_response_for_middlewaremixin.call_count == 4
+
+    def test_memberships_cache_is_invalidated_on_commit(self, django_capture_on_commit_callbacks):
+        membership = CompanyMembershipFactory()
+        cache = caches["failsafe"]
+        cache_key = get_organizations_cache_key(membership.user_id)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            membership.is_active = False
+            membership.save(update_fields=["is_active"])
+            assert cache.get(cache_key) is None
+            # A concurrent request caches the memberships it read before the commit.
+            cache.set(cache_key, {"version": "stale", "memberships": [(membership.company_id, True)]})
+        assert cache.get(cache_key) is None
+
     def test_prescriber_no_organization(self, mocked_get_response_for_middlewaremixin):
         factory = RequestFactory()
         request = factory.get("/")
@@ -1048,6 +1109,141 @@ class UtilsEmailsSplitRecipientTest(TestCase):
         assert 25 == len(result[1].to)
 
 
+@override_settings(ANYMAIL={"MAILJET_API_KEY": "key", "MAILJET_SECRET_KEY": "secret"})
+def test_mailjet_batch_email_backend(mocker, caplog):
+    messages = [
+        EmailMessage(from_email="unit-test@tests.com", body="xxx", to=[f"user{i}@tests.com"], subject=f"test {i}")
+        for i in range(60)
+    ]
+
+    def mailjet_send(**params):
+        api_messages = json.loads(params["data"])["Messages"]
+        results = [
+            {"Status": "error", "Errors": [{"ErrorMessage": "Invalid"}]}
+            if api_message["Subject"] == "test 3"
+            else {"Status": "success", "To": [{"Email": api_message["To"][0]["Email"], "MessageID": i}]}
+            for i, api_message in enumerate(api_messages)
+        ]
+        return mocker.Mock(status_code=200, json=mocker.Mock(return_value={"Messages": results}))
+
+    request = mocker.patch("requests.Session.request", side_effect=mailjet_send)
+    assert MailjetBatchEmailBackend().send_messages(messages) == 59
+
+    # Mailjet accepts at most 50 messages per call.
+    assert [len(json.loads(call.kwargs["data"])["Messages"]) for call in request.call_args_list] == [50, 10]
+    assert json.loads(request.call_args_list[0].kwargs["data"])["Messages"][0] == {
+        "From": {"Email": "unit-test@tests.com"},
+        "Subject": "test 0",
+        "TextPart": "xxx",
+        "To": [{"Email": "user0@tests.com"}],
+    }
+    assert messages[0].anymail_status.status == {"sent"}
+    assert messages[3].anymail_status.status == {"failed"}
+    assert caplog.messages == ["Mailjet refused a message subject='test 3' errors=[{'ErrorMessage': 'Invalid'}]"]
+
+
+@pytest.fixture(name="email_queue")
+def email_queue_fixture(mocker):
+    redis_client = caches["failsafe"]._cache.get_client(write=True)
+    prefix = uuid.uuid4()
+    for key in ("_EMAIL_QUEUE_KEY", "_EMAIL_BATCH_KEY", "_EMAIL_FLUSH_SCHEDULED_KEY", "_EMAIL_FLUSH_LOCK_KEY"):
+        mocker.patch(f"itou.utils.tasks.{key}", f"{prefix}:{getattr(tasks, key)}")
+    # Emails are only queued when tasks are run by a consumer.
+    mocker.patch("itou.utils.tasks.HUEY", mocker.Mock(immediate=False, storage=mocker.Mock(conn=redis_client)))
+    yield redis_client
+    redis_client.delete(
+        tasks._EMAIL_QUEUE_KEY, tasks._EMAIL_BATCH_KEY, tasks._EMAIL_FLUSH_SCHEDULED_KEY, tasks._EMAIL_FLUSH_LOCK_KEY
+    )
+
+
+def _queued_email(i):
+    return EmailMessage(from_email="unit-test@tests.com", body="xxx", to=[f"user{i}@tests.com"], subject=f"test {i}")
+
+
+@override_settings(SEND_EMAIL_BATCH_WINDOW_IN_SECONDS=10)
+def test_async_email_backend_queues_emails(mocker, email_queue):
+    schedule = mocker.patch("itou.utils.tasks._async_flush_email_queue.schedule")
+    send = mocker.patch("itou.utils.tasks._async_send_messages")
+
+    assert tasks.AsyncEmailBackend().send_messages([_queued_email(0), _queued_email(1)]) == 2
+    assert tasks.AsyncEmailBackend().send_messages([_queued_email(2)]) == 1
+
+    send.assert_not_called()
+    # Only the first emails of the window schedule the flush.
+    schedule.assert_called_once_with(delay=10)
+    assert [json.loads(email)["subject"] for email in email_queue.lrange(tasks._EMAIL_QUEUE_KEY, 0, -1)] == [
+        "test 0",
+        "test 1",
+        "test 2",
+    ]
+
+    # Once flushed, the next emails schedule another flush.
+    tasks._async_flush_email_queue.call_local()
+    tasks.AsyncEmailBackend().send_messages([_queued_email(3)])
+    assert schedule.call_count == 2
+
+
+def test_flush_email_queue_splits_batches(mocker, email_queue):
+    send = mocker.patch("itou.utils.tasks._async_send_messages")
+    email_queue.rpush(
+        tasks._EMAIL_QUEUE_KEY,
+        *[json.dumps(tasks._serializeEmailMessage(_queued_email(i))) for i in range(120)],
+    )
+
+    tasks._async_flush_email_queue.call_local()
+
+    # Mailjet accepts at most 50 messages per call.
+    assert [len(call.args[0]) for call in send.call_args_list] == [50, 50, 20]
+    assert [email["subject"] for call in send.call_args_list for email in call.args[0]] == [
+        f"test {i}" for i in range(120)
+    ]
+    assert not email_queue.exists(tasks._EMAIL_QUEUE_KEY, tasks._EMAIL_BATCH_KEY)
+
+
+def test_flush_email_queue_keeps_the_batch_when_interrupted(mocker, email_queue):
+    send = mocker.patch("itou.utils.tasks._async_send_messages", side_effect=[ConnectionError, None, None])
+    email_queue.rpush(
+        tasks._EMAIL_QUEUE_KEY,
+        *[json.dumps(tasks._serializeEmailMessage(_queued_email(i))) for i in range(60)],
+    )
+
+    with pytest.raises(ConnectionError):
+        tasks._async_flush_email_queue.call_local()
+    assert email_queue.llen(tasks._EMAIL_BATCH_KEY) == 50
+    assert email_queue.llen(tasks._EMAIL_QUEUE_KEY) == 10
+
+    # The next flush sends the interrupted batch first.
+    tasks._async_flush_email_queue.call_local()
+    assert [len(call.args[0]) for call in send.call_args_list] == [50, 50, 10]
+    assert send.call_args_list[1].args[0][0]["subject"] == "test 0"
+    assert not email_queue.exists(tasks._EMAIL_QUEUE_KEY, tasks._EMAIL_BATCH_KEY)
+
+
+@override_settings(SEND_EMAIL_BATCH_WINDOW_IN_SECONDS=10)
+def test_flush_email_queue_runs_one_flush_at_a_time(mocker, email_queue):
+    schedule = mocker.patch("itou.utils.tasks._async_flush_email_queue.schedule")
+    sent_subjects = []
+
+    def send_during_overlapping_flush(serializable_email_messages):
+        sent_subjects.extend(email["subject"] for email in serializable_email_messages)
+        if len(sent_subjects) == 50:
+            # Another worker flushes while the first batch is being sent.
+            tasks._async_flush_email_queue.call_local()
+
+    mocker.patch("itou.utils.tasks._async_send_messages", side_effect=send_during_overlapping_flush)
+    email_queue.rpush(
+        tasks._EMAIL_QUEUE_KEY,
+        *[json.dumps(tasks._serializeEmailMessage(_queued_email(i))) for i in range(120)],
+    )
+
+    tasks._async_flush_email_queue.call_local()
+
+    # The overlapping flush neither sent nor dropped any email, and is postponed.
+    assert sent_subjects == [f"test {i}" for i in range(120)]
+    schedule.assert_called_once_with(delay=10)
+    assert not email_queue.exists(tasks._EMAIL_QUEUE_KEY, tasks._EMAIL_BATCH_KEY, tasks._EMAIL_FLUSH_LOCK_KEY)
+
+
 class SupportRemarkAdminViewsTest(TestCase):
     def test_add_support_remark_to_suspension(self):
         today = timezone.localdate()
@@ -1266,6 +1462,56 @@ class TestPaginator:
         assert pager.pages_to_display == range(5, 16)
 
 
+class TestKeysetPaginator:
+    def test_pages(self):
+        JobApplicationFactory.create_batch(5, created_at=timezone.now())
+        JobApplicationFactory.create_batch(2)
+        queryset = JobApplication.objects.order_by("-created_at", "pk")
+        paginator = pagination.KeysetPaginator(queryset, 2)
+
+        pages = [paginator.page("")]
+        while pages[-1].next_cursor:
+            pages.append(paginator.page(pages[-1].next_cursor))
+        assert [len(page) for page in pages] == [2, 2, 2, 1]
+        assert [job_application for page in pages for job_application in page] == list(queryset)
+        assert pages[0].is_first
+        assert pages[0].display_pager
+        assert not pages[-1].is_first
+        assert paginator.count == 7
+        assert not paginator.count_is_approximate
+
+    def test_invalid_cursor(self):
+        JobApplicationFactory.create_batch(3)
+        paginator = pagination.KeysetPaginator(JobApplication.objects.order_by("-created_at", "pk"), 2)
+        for cursor in ["invalid", pagination.encode_cursor(["2024-01-01"]), pagination.encode_cursor(["a", "b"])]:
+            page = paginator.page(cursor)
+            assert page.is_first
+            assert len(page) == 2
+
+    def test_ordering_without_pk(self):
+        with pytest.raises(ValueError):
+            pagination.KeysetPaginator(JobApplication.objects.order_by("-created_at"), 2)
+
+    def test_large_pager(self, mocker):
+        JobApplicationFactory.create_batch(3)
+        queryset = JobApplication.objects.order_by("-created_at", "pk")
+
+        page = pagination.large_pager(queryset, page=2, cursor=None, items_per_page=2)
+        assert not page.paginator.is_keyset
+        assert page.number == 2
+
+        page = pagination.large_pager(queryset, page=2, cursor="", items_per_page=2)
+        assert page.paginator.is_keyset
+        assert page.paginator.count == 3
+
+        mocker.patch("itou.utils.pagination.get_approximate_count", return_value=50_000)
+        with assertNumQueries(1):  # Only fetch the page
+            page = pagination.large_pager(queryset, page=2, cursor=None, items_per_page=2)
+            assert page.paginator.count == 50_000
+        assert page.paginator.count_is_approximate
+        assert page.is_first
+
+
 def test_yield_sync_diff():
     # NOTE(vperron): not ideal, since I'm using models from a different Django app.
     # But I'm not sure that for such a simple utility function, I should really create a model
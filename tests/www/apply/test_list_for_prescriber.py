@@ -80,6 +80,7 @@ def test_list_for_prescriber_as_unauthorized_prescriber(client):
         + 1  # get list of administrative criteria
         + 2  # get list of job application + prefetch of job descriptions
         + 1  # get list of siaes (distinct to_company_id)
+        + 1  # planner estimate of the number of job applications
         + 3  # count, list & prefetch of job application
         + 1  # get job seekers approvals
         + 1  # check user authorized membership (can_edit_personal_information)
@@ -114,6 +115,26 @@ def test_list_for_prescriber_filtered_by_state(client):
     assert len(applications) == 3
 
 
+def test_list_for_prescriber_keyset_pagination(client, mocker):
+    prescriber = PrescriberFactory()
+    JobApplicationFactory.create_batch(12, sender=prescriber)
+    client.force_login(prescriber)
+
+    mocker.patch("itou.utils.pagination.get_approximate_count", return_value=50_000)
+    response = client.get(reverse("apply:list_for_prescriber"))
+    page = response.context["job_applications_page"]
+    assert len(page.object_list) == 10
+    assertContains(response, "environ 50000 <strong>résultats</strong>")
+    assertContains(response, "Suivant")
+    assertNotContains(response, "Dernier")
+
+    response = client.get(reverse("apply:list_for_prescriber"), {"cursor": page.next_cursor})
+    next_page = response.context["job_applications_page"]
+    assert len(next_page.object_list) == 2
+    assert next_page.next_cursor is None
+    assert not {job_application.pk for job_application in page} & {job_application.pk for job_application in next_page}
+
+
 def test_list_for_prescriber_filtered_by_sender(client):
     organization = PrescriberOrganizationWith2MembershipFactory()
     a_prescriber, another_prescriber = organization.members.all()
@@ -151,6 +151,7 @@ class ProcessListSiaeTest(TestCase):
             + 1  # select distinct sender_prescriber_organization
             #
             # Paginate the job applications queryset:
+            + 1  # planner estimate of the number of job applications
             + 1  # has_suspended_approval subquery
             + 1  # select job applications with annotations
             + 1  # prefetch selected jobs
@@ -158,36 +159,19 @@ class ProcessListSiaeTest(TestCase):
             + 1  # prefetch jobs location
             + 1  # prefetch approvals
             + 1  # manually prefetch administrative_criteria
+            + 1  # approvals summaries of the job seekers (prefetch_latest_approvals)
             #
             # Render template:
             # 9 job applications (1 per state in JobApplicationWorkflow + 1 sent by prescriber)
-            # 22 requests, maggie has a diagnosis made by a prescriber in this test
-            + 1  # jobapp1: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
             + 1  # jobapp1: select last valid diagnosis made by prescriber or SIAE (prescriber)
-            # 24 requests
-            + 1  # jobapp2: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
             + 1  # jobapp2: select last valid diagnosis made by prescriber or SIAE (SIAE)
-            # 26 requests
-            + 1  # jobapp3: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
             + 1  # jobapp3: select last valid diagnosis made by prescriber or SIAE (SIAE)
-            # 28 requests
-            + 1  # jobapp4: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
             + 1  # jobapp4: select last valid diagnosis made by prescriber or SIAE (SIAE)
-            # 30 requests
-            + 1  # jobapp5: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
             + 1  # jobapp5: select last valid diagnosis made by prescriber or SIAE (SIAE)
-            # 32 requests
-            + 1  # jobapp6: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
             + 1  # jobapp6: select last valid diagnosis made by prescriber or SIAE (SIAE)
-            # 34 requests
-            + 1  # jobapp7: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
             + 1  # jobapp7: select last valid diagnosis made by prescriber or SIAE (SIAE)
-            # 36 requests
-            + 1  # jobapp8: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
             + 1  # jobapp8: select last valid diagnosis made by prescriber or SIAE (SIAE)
-            # 38 requests, maggie has a diagnosis made by a prescriber in this test
-            + 1  # jobapp9: no approval (prefetched ⇒ no query), check PE approval (⇒ no PE approval)
-            + 1  # jobapp8: select last valid diagnosis made by prescriber or SIAE (prescriber)
+            + 1  # jobapp9: select last valid diagnosis made by prescriber or SIAE (prescriber)
             + 3  # update session
         ):
             response = self.client.get(reverse("apply:list_for_siae"))
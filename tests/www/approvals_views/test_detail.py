@@ -121,7 +121,7 @@ class TestApprovalDetailView:
             + 2  # fetch siae membership and siae infos (middleware)
             + 1  # place savepoint right after the middlewares
             + 1  # job_seeker.approval
-            + 1  # job_application.with_accepted_at annotation coming from next query
+            + 1  # last accepted job application
             + 1  # approval.suspension active today
             + 1  # Suspension.can_be_handled_by_siae >> User.last_accepted_job_application
             + 1  # select latest approval for user (can_be_prolonged)
@@ -200,7 +200,7 @@ class TestApprovalDetailView:
             # get_context_data
             + 1  # for every *active* suspension, check if there is an accepted job application after it
             + 1  # approval.suspension_set.end_at >= today >= approval.suspension_set.start_at (.can_be_suspended)
-            + 1  # job_application.with_accepted_at annotation coming from (.last_hire_was_made_by_company)
+            + 1  # last accepted job application (.last_hire_was_made_by_company)
             + 1  # siae infos (.last_hire_was_made_by_company)
             + 1  # user approvals (.is_last_for_user)
             + 1  # siae infos (job_application.get_eligibility_diagnosis())
@@ -217,7 +217,7 @@ class TestApprovalDetailView:
             + 1  # prescribers_prescriberorganization (job_application.is_sent_by_authorized_prescriber)
             + 1  # get user infos (eligibility_diagnosis.author.get_full_name)
             + 1  # eligibility_diagnosis.administrative_criteria.all
-            + 3  # approval: eligibility_diagnosis.considered_to_expire_at/has_valid_common_approval
+            + 1  # approval: eligibility_diagnosis.considered_to_expire_at/has_valid_common_approval
             # template: approvals/detail.html
             + 2  # all_job_applications with prefetch selected_jobs
             # template: approvals/includes/job_description_list.html
@@ -1,6 +1,7 @@
 from django.urls import reverse
 
 from itou.asp.models import Commune
+from itou.cities.models import City
 from tests.cities.factories import create_test_cities
 from tests.companies.factories import CompanyFactory
 from tests.jobs.factories import create_test_romes_and_appellations
@@ -280,6 +281,32 @@ class CitiesAutocompleteTest(TestCase):
         assert response.status_code == 200
         assert response.json() == []
 
+    def test_names_index(self):
+        create_test_cities(["75"], num_per_department=20)
+        url = reverse("autocomplete:cities")
+
+        # The first request builds the index of the worker.
+        response = self.client.get(url, {"term": "paris 8"})
+        assert response.json() == [{"slug": "paris-8e-arrondissement-75", "value": "Paris 8e Arrondissement (75)"}]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"term": "paris 8"})
+        assert response.json() == [{"slug": "paris-8e-arrondissement-75", "value": "Paris 8e Arrondissement (75)"}]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"term": "75008"})
+        assert response.json() == [{"slug": "paris-8e-arrondissement-75", "value": "Paris 8e Arrondissement (75)"}]
+
+        # The index is rebuilt once a city change is committed.
+        city = City.objects.get(slug="paris-8e-arrondissement-75")
+        city.name = "Paris 8e"
+        with self.captureOnCommitCallbacks(execute=True):
+            city.save()
+            with self.assertNumQueries(0):
+                response = self.client.get(url, {"term": "paris 8"})
+            assert response.json() == [{"slug": "paris-8e-arrondissement-75", "value": "Paris 8e Arrondissement (75)"}]
+        response = self.client.get(url, {"term": "paris 8"})
+        assert response.json() == [{"slug": "paris-8e-arrondissement-75", "value": "Paris 8e (75)"}]
+
     def test_queryset_is_ordered_before_truncation(self):
         create_test_cities(["01", "02", "54", "57", "62", "75", "93"], num_per_department=20)
         response = self.client.get(reverse("autocomplete:cities"), {"term": "e"})
@@ -18,7 +18,7 @@ from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.html import escape
 from freezegun import freeze_time
-from pytest_django.asserts import assertContains, assertNotContains, assertRedirects
+from pytest_django.asserts import assertContains, assertNotContains, assertNumQueries, assertRedirects
 from rest_framework.authtoken.models import Token
 
 from itou.cities.models import City
@@ -28,6 +28,7 @@ from itou.companies.enums import CompanyKind
 from itou.companies.models import Company
 from itou.employee_record.enums import Status
 from itou.institutions.enums import InstitutionKind
+from itou.job_applications.enums import JobApplicationState
 from itou.prescribers.enums import PrescriberOrganizationKind
 from itou.prescribers.models import PrescriberOrganization
 from itou.siae_evaluations import enums as evaluation_enums
@@ -40,6 +41,7 @@ from itou.utils.mocks.address_format import mock_get_geocoding_data_by_ban_api_r
 from itou.utils.models import InclusiveDateRange
 from itou.utils.templatetags.format_filters import format_approval_number, format_siret
 from itou.www.dashboard.forms import EditUserEmailForm
+from itou.www.dashboard.views import get_employer_dashboard_counters
 from tests.approvals.factories import ApprovalFactory, ProlongationRequestFactory
 from tests.companies.factories import (
     CompanyAfterGracePeriodFactory,
@@ -465,8 +467,7 @@ class DashboardViewTest(TestCase):
         num_queries += 1  #  get user (middleware)
         num_queries += 2  #  get company memberships (middleware)
         num_queries += 1  #  OrganizationAbstract.has_admin()
-        num_queries += 1  #  select job applications states
-        num_queries += 1  #  count employee records
+        num_queries += 1  #  count job applications & employee records
         num_queries += 1  #  check if evaluations sanctions exists
         num_queries += 1  #  check siae conventions
         num_queries += 1  #  OrganizationAbstract.has_member()
@@ -2507,3 +2508,26 @@ def test_prolongation_requests_badge(client):
         f"""a[href^='{reverse("approvals:prolongation_requests_list")}'] + .badge""",
     )
     assert soup.text == "3"
+
+
+def test_get_employer_dashboard_counters():
+    company = CompanyFactory()
+    for state in [
+        JobApplicationState.NEW,
+        JobApplicationState.NEW,
+        JobApplicationState.PROCESSING,
+        JobApplicationState.POSTPONED,
+        JobApplicationState.REFUSED,
+    ]:
+        JobApplicationFactory(to_company=company, state=state)
+    JobApplicationFactory(state=JobApplicationState.NEW)
+    EmployeeRecordFactory(job_application__to_company=company, status=Status.REJECTED)
+
+    with assertNumQueries(1):
+        counters = get_employer_dashboard_counters(
+            company,
+            to_process=[JobApplicationState.NEW, JobApplicationState.PROCESSING],
+            postponed=[JobApplicationState.POSTPONED],
+            accepted=[JobApplicationState.ACCEPTED],
+        )
+    assert counters == {"rejected_employee_records": 1, "to_process": 3, "postponed": 1, "accepted": 1}
@@ -1,4 +1,5 @@
 from django.contrib.gis.geos import Point
+from django.core.cache import caches
 from django.template.defaultfilters import capfirst, urlencode as urlencode_filter
 from django.templatetags.static import static
 from django.test import override_settings
@@ -10,6 +11,7 @@ from itou.cities.models import City
 from itou.companies.enums import POLE_EMPLOI_SIRET, CompanyKind, ContractNature, ContractType, JobSource
 from itou.companies.models import Company
 from itou.jobs.models import Appellation, Rome
+from itou.www.search.cache import SEARCH_CACHE_VERSION_KEY
 from tests.cities.factories import create_city_guerande, create_city_saint_andre, create_city_vannes
 from tests.companies.factories import CompanyFactory, CompanyMembershipFactory, JobDescriptionFactory
 from tests.job_applications.factories import JobApplicationFactory
@@ -56,7 +58,7 @@ class SearchCompanyTest(TestCase):
             BASE_NUM_QUERIES
             + 1  # select the city
             + 1  # fetch initial companies (to extract the filters afterwards)
-            + 2  # two counts for the tab headers
+            + 2  # list the ids of companies & job descriptions, counted in the tab headers
             + 1  # refetch the city for widget rendering
             + 1  # actual select of the companies, with related objects and annotated distance
             + 1  # prefetch active job descriptions
@@ -204,8 +206,8 @@ class SearchCompanyTest(TestCase):
             BASE_NUM_QUERIES
             + 1  # find city
             + 1  # find companies
-            + 1  # count companies
-            + 1  # count job descriptions
+            + 1  # list companies ids
+            + 1  # list job descriptions ids
             + 1  # refetch the city for widget rendering
             + 1  # get companies infos
             + 1  # get job descriptions infos
@@ -299,9 +301,9 @@ class SearchCompanyTest(TestCase):
         with self.assertNumQueries(
             BASE_NUM_QUERIES
             + 1  # find city (city form field cleaning)
-            + 1  # find companies (add_form_choices)
-            + 1  # count companies (paginator)
-            + 1  # count job descriptions (job_descriptions_count from context)
+            + 1  # find companies (get_form_choices)
+            + 1  # list companies ids (paginator)
+            + 1  # list job descriptions ids (job_descriptions_count from context)
             + 1  # refetch the city for widget rendering
             + 1  # get companies infos for page
             + 1  # get job descriptions infos (prefetch with is_popular annotation)
@@ -316,9 +318,9 @@ class SearchCompanyTest(TestCase):
         with self.assertNumQueries(
             BASE_NUM_QUERIES
             + 1  # find city (city form field cleaning)
-            + 1  # find companies (add_form_choices)
-            + 1  # count companies (paginator)
-            + 1  # count job descriptions (job_descriptions_count from context)
+            # The companies choices of the same area are cached.
+            + 1  # list companies ids (paginator)
+            + 1  # list job descriptions ids (job_descriptions_count from context)
             + 1  # refetch the city for widget rendering
             + 1  # get companies infos for page
             + 1  # get job descriptions infos (prefetch with is_popular annotation)
@@ -355,6 +357,50 @@ class SearchCompanyTest(TestCase):
             count=1,
         )
 
+    def test_results_are_cached(self):
+        create_test_romes_and_appellations(["N1101"], appellations_per_rome=1)
+        city = create_city_saint_andre()
+        company = CompanyFactory(department="44", coords=city.coords, post_code="44117")
+        JobDescriptionFactory(company=company)
+        self.client.get(self.URL, {"city": city.slug})
+
+        with self.assertNumQueries(
+            BASE_NUM_QUERIES
+            + 1  # find city (city form field cleaning)
+            + 1  # refetch the city for widget rendering
+            + 1  # get companies infos for page
+            + 1  # get job descriptions infos (prefetch with is_popular annotation)
+        ):
+            response = self.client.get(self.URL, {"city": city.slug, "page": 2})
+        assert list(response.context["results_page"]) == [company]
+
+        # Switching tab reuses the results.
+        with self.assertNumQueries(
+            BASE_NUM_QUERIES
+            + 1  # find city (city form field cleaning)
+            + 1  # find job descriptions (get_form_choices)
+            + 1  # refetch the city for widget rendering
+            + 1  # get job descriptions infos for page
+            + 1  # prefetch job applications for the is_popular attribute
+        ):
+            response = self.client.get(self.URL_JOBS, {"city": city.slug})
+        assert response.context["siaes_count"] == 1
+        assert response.context["job_descriptions_count"] == 1
+
+        # Saving a company makes the cached results outdated.
+        CompanyFactory(department="44", coords=city.coords, post_code="44117")
+        response = self.client.get(self.URL, {"city": city.slug})
+        assert response.context["siaes_count"] == 2
+        assert len(response.context["form"].fields["company"].choices) == 2
+
+    def test_results_cached_before_commit_are_outdated(self):
+        cache = caches["failsafe"]
+        with self.captureOnCommitCallbacks(execute=True):
+            CompanyFactory()
+            # The version a concurrent request would use to cache the results it read before the commit.
+            version = cache.get(SEARCH_CACHE_VERSION_KEY)
+        assert cache.get(SEARCH_CACHE_VERSION_KEY) != version
+
     def test_htmx_reloads_departments(self):
         vannes = create_city_vannes()
         company_vannes = CompanyFactory(
@@ -488,7 +534,7 @@ class JobDescriptionSearchViewTest(TestCase):
             BASE_NUM_QUERIES
             + 1  # select the city
             + 1  # fetch initial job descriptions to add to the form fields
-            + 2  # count the number of results for companies & job descriptions
+            + 2  # list the ids of companies & job descriptions, counted in the tab headers
             + 1  # prefetch job applications for the is_popular attribute
             + 1  # refetch the city for widget rendering
             + 1  # select the job descriptions for the page
@@ -550,7 +596,7 @@ class JobDescriptionSearchViewTest(TestCase):
             BASE_NUM_QUERIES
             + 1  # select the city
             + 1  # fetch initial job descriptions to add to the form fields
-            + 2  # count the number of results for companies & job descriptions
+            + 2  # list the ids of companies & job descriptions, counted in the tab headers
             + 1  # prefetch job applications for the is_popular attribute
             + 1  # refetch the city for widget rendering
             + 1  # select the job descriptions for the page